@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import math
+import os
+import struct
+import zlib
+from array import array
+
+import SolutionRecall as recall
+
+# ======================================================================
+# Adaptive Kandidatenreihenfolge (UCB pro Kandidat und Ausgangs-Bucket)
+#
+# Bucket = Zahl der korrekten Steine des Zustands, auf den ein Kandidat
+# angewendet wird. Pro (Bucket, Kandidat) wird gezählt, wie oft eine
+# Kombination mit diesem Schritt zur Lösung führte bzw. mit ihm als letztem
+# Schritt in eine Sackgasse lief.
+# Bewertung:
+#   Mittelwert  (Erfolge + PRIOR_WEIGHT * Vorwissen) / (Versuche + PRIOR_WEIGHT)
+#   + Bonus     c * sqrt(ln(Versuche im Bucket + 1) / (Versuche + 1))
+# Vorwissen ist 0 oder (ORDERING_VALUE_PRIOR = 1) Value/max(Value) aus
+# Improvements.csv. Gleich bewertete Kandidaten behalten die Dateireihenfolge.
+# Ohne Statistik entspricht die Reihenfolge damit der Dateireihenfolge.
+#
+# Parameter.csv:
+#   ADAPTIVE_ORDERING     1 = an, 0 = Dateireihenfolge
+#   ORDERING_EXPLORATION  c in Prozent (z.B. 50 = 0,5)
+#   ORDERING_VALUE_PRIOR  1 = Spalte "Value" als Vorwissen (in Messungen schlechter
+#                         als die Dateireihenfolge, daher standardmäßig 0)
+#   ORDERING_STATS_FILE   Statistikdatei (wird nach jedem Run geschrieben)
+#
+# Statistikdatei: Kopf <Kennung, Version, CRC der Kandidatenliste, Einträge>,
+# danach je Eintrag <Bucket uint8, Index uint32, Erfolge uint32, Sackgassen uint32>
+# (nur Einträge mit Versuchen).
+# ======================================================================
+STATS_HEADER = struct.Struct("<4sHII")
+STATS_RECORD = struct.Struct("<BIII")
+STATS_VERSION = 1
+PRIOR_WEIGHT = 2.0
+REFRESH_EVERY = 16  # Aktualisierungen eines Buckets, nach denen seine Reihenfolge neu berechnet wird
+
+
+def library_crc(learned_moves):
+    crc = 0
+    for candidate in learned_moves:
+        crc = zlib.crc32(f"{candidate['Move Sequence']}|{candidate.get('Starting Positions') or ''}\n".encode("utf-8"), crc)
+    return crc
+
+
+class AdaptiveOrdering:
+    """
+    Liefert für einen Zustand die anwendbaren Kandidaten in gelernter Reihenfolge (order) und
+    nimmt das Ergebnis einer Kombination entgegen (record).
+    """
+
+    def __init__(self, learned_moves, exploration=0.5, value_prior=False, buckets=recall.TARGET_CORRECT + 1):
+        self.learned_moves = learned_moves
+        self.exploration = exploration
+        size = len(learned_moves)
+        if value_prior:
+            values = [candidate.get("Value") if isinstance(candidate.get("Value"), float) else 0.0 for candidate in learned_moves]
+            top = max(values) if values and max(values) > 0 else 1.0
+            self.prior = [value / top for value in values]
+        else:
+            self.prior = [0.0] * size
+        self.successes = [array("I", bytes(4 * size)) for _ in range(buckets)]
+        self.failures = [array("I", bytes(4 * size)) for _ in range(buckets)]
+        self.bucket_trials = [0] * buckets
+        self._ranks = [None] * buckets
+        self._pending = [0] * buckets
+
+    # ------------------------------------------------------------------
+    # Reihenfolge
+    # ------------------------------------------------------------------
+    def _compute_ranks(self, bucket):
+        successes = self.successes[bucket]
+        failures = self.failures[bucket]
+        log_total = math.log(self.bucket_trials[bucket] + 1)
+        scores = []
+        for index, prior in enumerate(self.prior):
+            trials = successes[index] + failures[index]
+            mean = (successes[index] + PRIOR_WEIGHT * prior) / (trials + PRIOR_WEIGHT)
+            scores.append(mean + self.exploration * math.sqrt(log_total / (trials + 1)))
+        ranks = [0] * len(scores)
+        for rank, index in enumerate(sorted(range(len(scores)), key=lambda i: -scores[i])):
+            ranks[index] = rank
+        return ranks
+
+    def order(self, applicable, correct_mask):
+        """
+        Sortiert applicable (Kandidatenindizes) für einen Zustand mit correct_mask um.
+        """
+        bucket = recall.mask_count(correct_mask)
+        ranks = self._ranks[bucket]
+        if ranks is None or self._pending[bucket] >= REFRESH_EVERY:
+            ranks = self._ranks[bucket] = self._compute_ranks(bucket)
+            self._pending[bucket] = 0
+        applicable.sort(key=ranks.__getitem__)
+        return applicable
+
+    # ------------------------------------------------------------------
+    # Rückmeldung
+    # ------------------------------------------------------------------
+    def record(self, indices, buckets, solved):
+        """
+        Ergebnis einer Kombination: indices (Kandidaten) mit den Buckets, in denen sie angewendet
+        wurden; solved True = Lösung, False = Sackgasse.
+        """
+        if solved:
+            steps = zip(indices, buckets)
+            counters = self.successes
+        else:
+            # Eine Sackgasse wird nur dem letzten Schritt angelastet: das Präfix war bis dahin
+            # verbessernd und kann mit einer anderen Fortsetzung noch zur Lösung führen.
+            steps = zip(indices[-1:], buckets[-1:])
+            counters = self.failures
+        for index, bucket in steps:
+            counters[bucket][index] += 1
+            self.bucket_trials[bucket] += 1
+            self._pending[bucket] += 1
+
+    # ------------------------------------------------------------------
+    # Statistikdatei
+    # ------------------------------------------------------------------
+    def save(self, path):
+        records = []
+        for bucket, (successes, failures) in enumerate(zip(self.successes, self.failures)):
+            for index in range(len(successes)):
+                if successes[index] or failures[index]:
+                    records.append(STATS_RECORD.pack(bucket, index, successes[index], failures[index]))
+        data = STATS_HEADER.pack(b"SRAO", STATS_VERSION, library_crc(self.learned_moves), len(records)) + b"".join(records)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def load(self, path):
+        """
+        Übernimmt gespeicherte Statistiken. Passt die Datei nicht zur Kandidatenliste, wird sie
+        ignoriert (Rückgabe False).
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        if len(data) < STATS_HEADER.size:
+            return False
+        magic, version, crc, count = STATS_HEADER.unpack_from(data, 0)
+        if magic != b"SRAO" or version != STATS_VERSION or crc != library_crc(self.learned_moves):
+            print("Statistikdatei passt nicht zu Improvements.csv und wird ignoriert:", path)
+            return False
+        for bucket, index, successes, failures in STATS_RECORD.iter_unpack(data[STATS_HEADER.size:STATS_HEADER.size + count * STATS_RECORD.size]):
+            self.successes[bucket][index] = successes
+            self.failures[bucket][index] = failures
+            self.bucket_trials[bucket] += successes + failures
+        self._ranks = [None] * len(self._ranks)
+        return True
+
+
+class FrozenOrdering(AdaptiveOrdering):
+    """
+    Nur lesend: record() ändert nichts. Für Pool-Worker, damit das Ergebnis eines Runs nicht davon
+    abhängt, welcher Worker welche Runs vorher bearbeitet hat.
+    """
+
+    def record(self, indices, buckets, solved):
+        pass
+
+
+def ordering_from_params(params, learned_moves, frozen=False):
+    """
+    AdaptiveOrdering mit geladenen Statistiken oder None, wenn ADAPTIVE_ORDERING aus ist.
+    frozen=True: FrozenOrdering (Statistiken werden nicht fortgeschrieben).
+    """
+    if not params.get("ADAPTIVE_ORDERING", 0):
+        return None
+    ordering = (FrozenOrdering if frozen else AdaptiveOrdering)(learned_moves, params.get("ORDERING_EXPLORATION", 50) / 100,
+                                bool(params.get("ORDERING_VALUE_PRIOR", 0)))
+    ordering.load(stats_path(params))
+    return ordering
+
+def stats_path(params):
+    return os.path.join(recall.SCRIPT_DIR, str(params.get("ORDERING_STATS_FILE", "ordering_stats.bin")))
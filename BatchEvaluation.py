@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+try:
+    import numpy as np
+except ImportError:  # NumPy ist optional; ohne NumPy bleibt nur die sequentielle Bewertung.
+    np = None
+
+
+# ======================================================================
+# Vektorisierte Bewertung vieler Kandidaten auf einmal (N×54-Gather)
+# ======================================================================
+def encode_state(cube_state):
+    """
+    Wandelt eine Liste von 54 Farbcodes ('w', 'g', ...) in ein uint8-Array um.
+    """
+    return np.fromiter((ord(color) for color in cube_state), dtype=np.uint8, count=len(cube_state))
+
+def decode_state(state_codes):
+    """
+    Umkehrung von encode_state: uint8-Array -> Liste von Farbcodes.
+    """
+    return [chr(code) for code in state_codes.tolist()]
+
+
+class BatchEvaluator:
+    """
+    Hält die Permutationen aller gelernten Zugfolgen als (C×54)-Matrix und die
+    Zielsteine als Positions-/Farbmatrizen, sodass beliebig viele Kandidaten mit
+    einem Gather angewendet und mit Array-Vergleichen bewertet werden können.
+
+    Die Reihenfolge der übergebenen Kandidaten wird beibehalten; "first" wählt
+    damit exakt denselben Kandidaten wie die sequentielle Schleife in optimize_cube.
+    """
+
+    def __init__(self, learned_moves, target_pieces, chunk_size=512):
+        if np is None:
+            raise RuntimeError("NumPy ist nicht installiert; EVALUATION_MODE 'batch' nicht verfügbar.")
+        arrays = getattr(learned_moves, "arrays", None)  # Kandidatenliste aus dem LibraryCache: Memory-Map nutzen
+        if arrays is not None:
+            self.perms = arrays["permutations"]
+        else:
+            self.perms = np.array([candidate["Permutation"] for candidate in learned_moves], dtype=np.uint8).reshape(len(learned_moves), -1)
+        # Steine mit 2 Stickern werden auf 3 Positionen aufgefüllt (Wiederholung der letzten Position).
+        positions, colors = [], []
+        for piece_positions, piece_colors in target_pieces.values():
+            pos = [p - 1 for p in piece_positions]
+            col = [ord(c) for c in piece_colors]
+            while len(pos) < 3:
+                pos.append(pos[-1])
+                col.append(col[-1])
+            positions.append(pos)
+            colors.append(col)
+        self.piece_positions = np.array(positions, dtype=np.intp)
+        self.piece_colors = np.array(colors, dtype=np.uint8)
+        # Quellpositionen der Stein-Sticker je Kandidat: (C, Steine*4) – für die Bewertung genügt
+        # es, nur diese Sticker statt aller 54 zu sammeln. Mit 4 Stickern pro Stein (letzte Position
+        # wiederholt) lassen sich die Farben eines Steins als ein uint32 vergleichen.
+        positions4 = np.concatenate([self.piece_positions, self.piece_positions[:, -1:]], axis=1)
+        colors4 = np.ascontiguousarray(np.concatenate([self.piece_colors, self.piece_colors[:, -1:]], axis=1))
+        self.piece_sources = self.perms[:, positions4.ravel()].astype(np.intp)
+        self.packed_colors = colors4.view(np.uint32).ravel()
+        self.chunk_size = chunk_size
+
+    def score(self, states):
+        """
+        Anzahl korrekt positionierter Steine für jede Zeile einer (N×54)-Zustandsmatrix.
+        """
+        stickers = states[:, self.piece_positions]  # (N, Steine, 3)
+        return (stickers == self.piece_colors).all(axis=2).sum(axis=1)
+
+    def correct_matrix(self, states):
+        """
+        (N×Steine)-Matrix: Stein korrekt positioniert ja/nein, für jede Zeile einer Zustandsmatrix.
+        """
+        return (states[:, self.piece_positions] == self.piece_colors).all(axis=2)
+
+    def score_candidates(self, states, candidate_indices):
+        """
+        (N×K)-Matrix der korrekten Steine, wenn Kandidat k auf Zustand n angewendet wird.
+        """
+        sources = self.piece_sources[candidate_indices]  # (K, Steine*4)
+        stickers = np.ascontiguousarray(states[:, sources]).view(np.uint32)  # (N, K, Steine)
+        return np.count_nonzero(stickers == self.packed_colors, axis=2)
+
+    def apply(self, state_codes, candidate_indices):
+        """
+        Wendet alle angegebenen Kandidaten auf einen Zustand an -> (N×54)-Matrix.
+        """
+        return state_codes[self.perms[candidate_indices]]
+
+    def select(self, state_codes, candidate_indices, current_count, best=False):
+        """
+        Liefert die Position (in candidate_indices) des ersten – bzw. bei best=True des
+        besten – verbessernden Kandidaten oder None.
+        Im Modus "first" wird in Blöcken von chunk_size bewertet, damit eine frühe
+        Verbesserung nicht die Bewertung aller übrigen Kandidaten kostet.
+        """
+        if len(candidate_indices) == 0:
+            return None
+        candidate_indices = np.asarray(candidate_indices, dtype=np.intp)
+        if best:
+            counts = self.score(self.apply(state_codes, candidate_indices))
+            winner = int(np.argmax(counts))
+            return winner if counts[winner] > current_count else None
+        for offset in range(0, len(candidate_indices), self.chunk_size):
+            counts = self.score(self.apply(state_codes, candidate_indices[offset:offset + self.chunk_size]))
+            improving = np.flatnonzero(counts > current_count)
+            if improving.size:
+                return offset + int(improving[0])
+        return None
+
+
+_evaluators = {}
+
+def get_batch_evaluator(learned_moves, target_pieces):
+    """
+    Liefert (und cached) den BatchEvaluator zu einer Liste gelernter Zugfolgen.
+    Voraussetzung: compile_learned_moves wurde auf learned_moves angewendet.
+    """
+    key = (id(learned_moves), id(target_pieces))
+    entry = _evaluators.get(key)
+    if entry is None or entry[0] is not learned_moves:
+        entry = (learned_moves, BatchEvaluator(learned_moves, target_pieces))
+        _evaluators[key] = entry
+    return entry[1]
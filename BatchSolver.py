@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+import time
+
+import SolutionRecall as recall
+from BatchEvaluation import encode_state, get_batch_evaluator, np
+
+
+# ======================================================================
+# Lockstep-Batch: M gemischte Würfel als (M×54)-Matrix, die gemeinsam
+# Iteration für Iteration durch die Kandidatenliste geführt werden.
+#
+# Jeder Würfel hat eigene Kombination, eigenen CombinationTrie und eigene
+# Iterationszähler; die Auswahl entspricht exakt execute_run mit
+# optimize_cube im Modus SEARCH_MODE "restart" (erste Verbesserung in
+# Dateireihenfolge, ohne Transpositionstabelle). Parameter anderer
+# Suchverfahren gelten hier nicht (unsupported_params, Hinweis in main).
+# ======================================================================
+UNSATISFIABLE = 1 << 62  # Vorbedingung mit unbekanntem Stein: nie erfüllt
+
+
+class _Scramble:
+    __slots__ = ("start_codes", "start_mask", "mask", "combination", "ids", "node", "history",
+                 "call_iterations", "run_iterations", "solutions", "solution_keys", "done")
+
+    def __init__(self, start_codes, start_mask, history):
+        self.start_codes = start_codes
+        self.start_mask = start_mask
+        self.history = history
+        self.solutions = []
+        self.solution_keys = set()
+        self.run_iterations = 0
+        self.done = False
+        self.restart()
+
+    def restart(self):
+        self.mask = self.start_mask
+        self.combination = []
+        self.ids = []
+        self.node = self.history.root
+        self.call_iterations = 0
+
+
+def solve_batch(params, start_states, learned_moves, moves_mapping, chunk_size=256):
+    """
+    Löst alle Startzustände im Gleichschritt. Rückgabe pro Startzustand eine Liste von Lösungen
+    {"iterations", "combination", "elapsed"} – wie execute_run ohne doppelte Zugfolgen.
+    """
+    if np is None:
+        raise RuntimeError("NumPy ist nicht installiert; BATCH_SCRAMBLES > 1 nicht verfügbar.")
+    if learned_moves and "Permutation" not in learned_moves[0]:
+        recall.compile_learned_moves(learned_moves, moves_mapping)
+    evaluator = get_batch_evaluator(learned_moves, recall.levels["E3"])
+    max_iterations = params["MAX_ITERATIONS E3"]
+    solutions_per_run = params["SOLUTIONS_PER_RUN"]
+    arrays = getattr(learned_moves, "arrays", None)
+    if arrays is not None:
+        required = np.where(arrays["required_masks"] < 0, UNSATISFIABLE, arrays["required_masks"])
+    else:
+        required = np.array([UNSATISFIABLE if candidate["Required Mask"] is None else candidate["Required Mask"]
+                             for candidate in learned_moves], dtype=np.int64)
+    sequence_ids = [candidate["Sequence ID"] for candidate in learned_moves]
+    solution_key = recall.solution_key_function(params, moves_mapping)
+    bit_values = np.array([1 << bit for bit in range(len(recall.PIECE_NAMES))], dtype=np.int64)
+    start_time = time.time()
+
+    states = np.stack([encode_state(state) for state in start_states])
+    start_masks = evaluator.correct_matrix(states).astype(np.int64) @ bit_values
+    scrambles = [_Scramble(states[i].copy(), int(start_masks[i]), recall.CombinationTrie(params.get("HISTORY_MAX_NODES", 0)))
+                 for i in range(len(start_states))]
+    for scramble in scrambles:
+        if recall.mask_count(scramble.start_mask) == recall.TARGET_CORRECT:
+            # Bereits gelöst: eine leere Lösung wie im seriellen Modus (optimize_cube mit 0 Iterationen).
+            scramble.solutions.append({"iterations": 0, "combination": [], "move_sequence": "",
+                                       "elapsed": time.time() - start_time})
+            scramble.done = True
+
+    while True:
+        pending = [i for i, scramble in enumerate(scrambles) if not scramble.done]
+        if not pending:
+            break
+        choice = {}
+        # Alle offenen Würfel gemeinsam blockweise gegen die Kandidaten bewerten; ein Würfel
+        # scheidet aus, sobald sein erster zulässiger, verbessernder Kandidat gefunden ist.
+        for offset in range(0, len(learned_moves), chunk_size):
+            if not pending:
+                break
+            block = np.arange(offset, min(offset + chunk_size, len(learned_moves)))
+            rows = np.array(pending)
+            masks = np.array([scrambles[i].mask for i in pending], dtype=np.int64)
+            counts = evaluator.score_candidates(states[rows], block)
+            current_counts = np.array([recall.mask_count(scrambles[i].mask) for i in pending])
+            applicable = (required[block][None, :] & ~masks[:, None]) == 0
+            improving = applicable & (counts > current_counts[:, None])
+            still_pending = []
+            for row, i in enumerate(pending):
+                node = scrambles[i].node
+                for k in np.flatnonzero(improving[row]).tolist():
+                    candidate_index = offset + k
+                    if node is None or node.is_viable(sequence_ids[candidate_index]):
+                        choice[i] = candidate_index
+                        break
+                else:
+                    still_pending.append(i)
+            pending = still_pending
+
+        for i, scramble in enumerate(scrambles):
+            if scramble.done:
+                continue
+            candidate_index = choice.get(i)
+            solved = False
+            if candidate_index is not None:
+                candidate = learned_moves[candidate_index]
+                states[i] = states[i][evaluator.perms[candidate_index]]
+                scramble.mask = int(evaluator.correct_matrix(states[i:i + 1]).astype(np.int64)[0] @ bit_values)
+                scramble.combination.append(candidate["Move Sequence"])
+                scramble.ids.append(candidate["Sequence ID"])
+                scramble.node = scramble.node.child(candidate["Sequence ID"]) if scramble.node is not None else None
+                solved = recall.mask_count(scramble.mask) == recall.TARGET_CORRECT
+                if solved:
+                    scramble.history.mark_exhausted(scramble.ids)
+                scramble.call_iterations += 1
+            elif scramble.combination:
+                scramble.history.mark_exhausted(scramble.ids)
+                states[i] = scramble.start_codes
+                call_iterations = scramble.call_iterations + 1
+                scramble.restart()
+                scramble.call_iterations = call_iterations
+            else:
+                # Keine Erweiterung vom Ausgangszustand aus: optimize_cube würde bis
+                # MAX_ITERATIONS E3 weiterzählen, ohne dass sich etwas ändert.
+                scramble.call_iterations = max_iterations
+
+            if solved:
+                scramble.run_iterations += scramble.call_iterations
+                total_move_sequence = " ".join(recall.combination_moves(scramble.combination))
+                key = solution_key(total_move_sequence)
+                if key not in scramble.solution_keys:
+                    scramble.solution_keys.add(key)
+                    scramble.solutions.append({"iterations": scramble.run_iterations,
+                                               "combination": list(scramble.combination),
+                                               "move_sequence": total_move_sequence,
+                                               "elapsed": time.time() - start_time})
+                states[i] = scramble.start_codes
+                scramble.restart()
+                if scramble.run_iterations >= max_iterations or len(scramble.solutions) >= solutions_per_run:
+                    scramble.done = True
+            elif scramble.call_iterations >= max_iterations:
+                scramble.run_iterations += scramble.call_iterations
+                scramble.done = True
+
+    return [scramble.solutions for scramble in scrambles]
+
+
+def unsupported_params(params):
+    """
+    Gesetzte Parameter, die im Lockstep-Batch nicht berücksichtigt werden.
+    """
+    unsupported = []
+    if params.get("SEARCH_MODE", "restart") != "restart":
+        unsupported.append(f"SEARCH_MODE {params['SEARCH_MODE']}")
+    for key in ("TRANSPOSITION_TABLE_SIZE", "ADAPTIVE_ORDERING", "LAST_LAYER_TABLE", "SCHEDULE_SECONDS"):
+        if params.get(key, 0):
+            unsupported.append(key)
+    if params.get("INTRA_RUN_WORKERS", 1) > 1:
+        unsupported.append("INTRA_RUN_WORKERS")
+    return unsupported
+
+def run_batches(params, original_state, master_seed, run_numbers, moves_mapping, learned_moves, write_row):
+    """
+    Verarbeitet die Runs in Gruppen von BATCH_SCRAMBLES Würfeln und schreibt die Ergebniszeilen
+    in RunID-Reihenfolge (Spalten wie save_results).
+    """
+    batch_size = params.get("BATCH_SCRAMBLES", 1)
+    for start in range(0, len(run_numbers), batch_size):
+        group = run_numbers[start:start + batch_size]
+        print(f"\n=== Starting Runs {group[0]}-{group[-1]} (Batch) ===")
+        batch_start_time = time.time()
+        run_datetime = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(batch_start_time))
+        start_states = [recall.scramble_start_state(original_state, params, recall.derive_run_seed(master_seed, run_number), moves_mapping)
+                        for run_number in group]
+        results = solve_batch(params, start_states, learned_moves, moves_mapping)
+        for run_number, start_state, solutions in zip(group, start_states, results):
+            for solution in solutions:
+                total_moves = len(solution["move_sequence"].split())
+                solution_time_str = time.strftime("%H:%M:%S", time.gmtime(solution["elapsed"]))
+                write_row([run_number, run_datetime, ";".join(start_state), solution_time_str,
+                           solution["iterations"], solution["move_sequence"], total_moves])
+            print(f"Run {run_number} abgeschlossen. Gefundene Lösungen: {len(solutions)}")
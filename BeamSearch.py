@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+import SolutionRecall as recall
+from BatchEvaluation import encode_state, get_batch_evaluator, np
+from TranspositionTable import state_key
+
+# ======================================================================
+# Beam-Suche über die gelernten Zugfolgen (SEARCH_MODE "beam")
+#
+# Statt der ersten Verbesserung wird Ebene für Ebene jeder Zustand des
+# Beams mit allen anwendbaren Kandidaten (Vorbedingung erfüllt) auf einmal
+# bewertet. Alle verbessernden Nachfolger einer Ebene werden nach
+# (korrekte Steine absteigend, aufsummierte Züge aufsteigend) geordnet,
+# doppelte Zustände verworfen und die besten BEAM_WIDTH behalten.
+#
+# Parameter.csv:
+#   BEAM_WIDTH       Zustände pro Ebene
+#   BEAM_MAX_STATES  Obergrenze der Tabelle bereits gesehener Zustände (0 = unbegrenzt);
+#                    ist sie voll, werden Duplikate nur noch innerhalb einer Ebene erkannt.
+# Eine Iteration ist die Expansion eines Zustands; MAX_ITERATIONS E3 begrenzt sie.
+# ======================================================================
+
+
+class _BeamNode:
+    __slots__ = ("state", "mask", "moves", "parent", "index")
+
+    def __init__(self, state, mask, moves, parent=None, index=None):
+        self.state = state
+        self.mask = mask
+        self.moves = moves
+        self.parent = parent
+        self.index = index
+
+    def path(self):
+        """
+        Kandidatenindizes vom Startzustand bis zu diesem Knoten.
+        """
+        indices = []
+        node = self
+        while node.parent is not None:
+            indices.append(node.index)
+            node = node.parent
+        return indices[::-1]
+
+
+def _improving_candidates(node, learned_moves, precondition_index, evaluator, telemetry):
+    """
+    Alle anwendbaren Kandidaten, die die Zahl korrekter Steine erhöhen: [(korrekte Steine, Index)].
+    """
+    applicable = recall.applicable_candidates(precondition_index, node.mask)
+    current_count = recall.mask_count(node.mask)
+    if telemetry is not None:
+        telemetry.precondition_rejections += len(learned_moves) - len(applicable)
+        telemetry.candidates_scanned += len(applicable)
+        telemetry.sequence_applications += len(applicable)
+    if not applicable:
+        return []
+    if evaluator is not None:
+        counts = evaluator.score_candidates(encode_state(node.state)[None, :], np.asarray(applicable, dtype=np.intp))[0]
+        return [(int(counts[k]), applicable[k]) for k in np.flatnonzero(counts > current_count).tolist()]
+    improving = []
+    for index in applicable:
+        count = recall.mask_count(recall.get_correct_mask(recall.apply_permutation(node.state, learned_moves[index]["Permutation"])))
+        if count > current_count:
+            improving.append((count, index))
+    return improving
+
+def beam_search(params, starting_state, learned_moves, telemetry=None, key_function=state_key):
+    """
+    Generator: liefert für jede gefundene Lösung (Kandidatenindizes, Iterationen bis dahin).
+    Innerhalb einer Ebene kommen Lösungen mit weniger Zügen zuerst.
+    key_function: Schlüssel für die Duplikaterkennung (z.B. kanonischer Schlüssel aus Symmetry).
+    """
+    # Mit NumPy werden alle Kandidaten eines Zustands in einem Schritt bewertet, sonst einzeln.
+    evaluator = get_batch_evaluator(learned_moves, recall.levels["E3"]) if np is not None else None
+    precondition_index = recall.get_precondition_index(learned_moves)
+    beam_width = max(1, params.get("BEAM_WIDTH", 64))
+    max_states = params.get("BEAM_MAX_STATES", 0)
+    max_iterations = params["MAX_ITERATIONS E3"]
+    move_counts = [len(candidate["Move Sequence"].split()) for candidate in learned_moves]
+
+    start_mask = recall.get_correct_mask(starting_state)
+    print("Startzahl korrekt positionierter Steine:", recall.mask_count(start_mask))
+    beam = [_BeamNode(starting_state, start_mask, 0)]
+    seen = {key_function(starting_state)}
+    iteration = 0
+    depth = 0
+    while beam and iteration < max_iterations:
+        depth += 1
+        children = []
+        for rank, node in enumerate(beam):
+            if iteration >= max_iterations:
+                break
+            for count, index in _improving_candidates(node, learned_moves, precondition_index, evaluator, telemetry):
+                children.append((-count, node.moves + move_counts[index], rank, index))
+            iteration += 1
+            if telemetry is not None:
+                telemetry.count_iteration()
+        children.sort()
+
+        next_beam = []
+        level_seen = set()
+        for negative_count, moves, rank, index in children:
+            solved = -negative_count == recall.TARGET_CORRECT
+            if not solved and len(next_beam) >= beam_width:
+                break  # Lösungen stehen in der Sortierung vorne
+            parent = beam[rank]
+            state = recall.apply_permutation(parent.state, learned_moves[index]["Permutation"])
+            child = _BeamNode(state, recall.get_correct_mask(state), moves, parent, index)
+            if solved:
+                yield child.path(), iteration
+                continue
+            key = key_function(state)
+            if key in seen or key in level_seen:
+                continue
+            level_seen.add(key)
+            if not max_states or len(seen) < max_states:
+                seen.add(key)
+            if telemetry is not None:
+                telemetry.improvements += 1
+            next_beam.append(child)
+        beam = next_beam
+        if depth % 5 == 0:
+            print(f"Beam-Ebene {depth}: {len(beam)} Zustände, {iteration} Iterationen")
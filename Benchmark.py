@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import SolutionRecall as recall
+from AdaptiveOrdering import library_crc, ordering_from_params
+from ResultsWriter import ResultsSink
+
+# ======================================================================
+# Benchmarks mit festen Seeds und festen Mischungen
+#
+# Micro: apply_move, apply_sequence, count_correct_pieces, get_correct_mask
+# Macro: execute_run je Mischung (Zeit/Iterationen bis zur ersten Lösung
+#        und bis SOLUTIONS_PER_RUN) sowie ein vollständiger Ablauf wie main
+#        (Bibliothek laden, Runs, Ergebnisse über ResultsSink in eine
+#        temporäre Datei).
+#
+# Aufruf:
+#   python Benchmark.py                         Messen und ausgeben
+#   python Benchmark.py --save-baseline         zusätzlich benchmark_baseline.json schreiben
+#   python Benchmark.py --compare               gegen benchmark_baseline.json vergleichen
+#
+# Exit-Code 1, wenn eine Lösung den Würfel nicht löst, sich die deterministischen
+# Ergebnisse (Iterationen, Zugfolgen) gegenüber der Baseline geändert haben oder
+# eine Messung langsamer ist als die Toleranz erlaubt.
+#
+# Die Baseline ist rechnerspezifisch und wird nicht eingecheckt (.gitignore):
+# vor Änderungen auf dem eigenen Rechner mit --save-baseline erzeugen. Zeiten
+# werden nur verglichen, wenn Plattform und Python-Version der Baseline
+# übereinstimmen; die deterministischen Werte nur bei gleichen Suchparametern
+# (SEARCH_PARAMS) und gleicher Bibliothek. ADAPTIVE_ORDERING wird mit den
+# gespeicherten Statistiken nur gelesen (FrozenOrdering).
+# ======================================================================
+BENCHMARK_VERSION = 1
+BASELINE_FILE = os.path.join(recall.SCRIPT_DIR, "benchmark_baseline.json")
+MASTER_SEED = 20240101
+SHUFFLE_DEPTHS = (5, 10, 20, 30)
+SCRAMBLES_PER_DEPTH = 3
+BENCH_PARAMS = {"MAX_ITERATIONS E3": 3000, "SOLUTIONS_PER_RUN": 3}
+# Parameter, die Suche oder Ergebnis beeinflussen (werden mit den Ergebnissen gespeichert)
+SEARCH_PARAMS = ("MAX_ITERATIONS E3", "SOLUTIONS_PER_RUN", "EVALUATION_MODE", "SEARCH_MODE", "HISTORY_MAX_NODES",
+                 "TRANSPOSITION_TABLE_SIZE", "SYMMETRY_GROUP", "BEAM_WIDTH", "BEAM_MAX_STATES", "ADAPTIVE_ORDERING",
+                 "ORDERING_EXPLORATION", "ORDERING_VALUE_PRIOR", "LAST_LAYER_TABLE", "BATCH_SCRAMBLES",
+                 "SIMPLIFY_SOLUTIONS")
+# Messungen mit höherem Wert sind besser (Durchsatz); alle anderen sind Zeiten.
+HIGHER_IS_BETTER = ("moves_per_s", "sequences_per_s", "evaluations_per_s")
+
+
+def _timed_rate(function, min_seconds):
+    """
+    Ruft function() wiederholt auf, bis min_seconds vergangen sind; function liefert die Anzahl
+    der erledigten Operationen. Rückgabe: Operationen pro Sekunde.
+    """
+    operations = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        operations += function()
+        elapsed = time.perf_counter() - start
+    return operations / elapsed
+
+def benchmark_scrambles(original_state, moves_mapping, scrambles_per_depth=SCRAMBLES_PER_DEPTH):
+    """
+    Feste Mischungen: pro Tiefe NO_MOVES_TO_SHUFFLE scrambles_per_depth Startzustände,
+    abgeleitet aus MASTER_SEED wie in main (derive_run_seed). Rückgabe: [(Name, Tiefe, Zustand)].
+    """
+    scrambles = []
+    for depth in SHUFFLE_DEPTHS:
+        for index in range(1, scrambles_per_depth + 1):
+            run_seed = recall.derive_run_seed(MASTER_SEED, depth * 1000 + index)
+            state = recall.scramble_start_state(original_state, {"NO_MOVES_TO_SHUFFLE": depth}, run_seed, moves_mapping)
+            scrambles.append((f"d{depth}_{index}", depth, state))
+    return scrambles
+
+
+# ======================================================================
+# Micro-Benchmarks
+# ======================================================================
+def run_micro(states, moves_mapping, learned_moves, min_seconds):
+    sequences = [candidate["Move Sequence"].split() for candidate in learned_moves[:200]]
+    moves = recall.allowed_moves_global
+    target_pieces = recall.levels["E3"]
+
+    def apply_moves_once():
+        for state in states:
+            for move in moves:
+                recall.apply_move(state, move, moves_mapping)
+        return len(states) * len(moves)
+
+    def apply_sequences_once():
+        for sequence in sequences:
+            recall.apply_sequence(states[0], sequence, moves_mapping)
+        return len(sequences)
+
+    def count_pieces_once():
+        for state in states:
+            recall.count_correct_pieces(state, target_pieces)
+        return len(states)
+
+    def correct_mask_once():
+        for state in states:
+            recall.get_correct_mask(state)
+        return len(states)
+
+    return {
+        "apply_move": {"moves_per_s": _timed_rate(apply_moves_once, min_seconds)},
+        "apply_sequence": {"sequences_per_s": _timed_rate(apply_sequences_once, min_seconds)},
+        "count_correct_pieces": {"evaluations_per_s": _timed_rate(count_pieces_once, min_seconds)},
+        "get_correct_mask": {"evaluations_per_s": _timed_rate(correct_mask_once, min_seconds)},
+    }
+
+
+# ======================================================================
+# Macro-Benchmarks und Korrektheitsprüfung
+# ======================================================================
+def verify_solution(start_state, move_sequence, moves_mapping):
+    """
+    Prüft, ob die Zugfolge den Startzustand tatsächlich löst (alle Steine aus Level E3 korrekt).
+    """
+    final_state = recall.apply_sequence(start_state, move_sequence.split(), moves_mapping)
+    return recall.count_correct_pieces(final_state, recall.levels["E3"]) == recall.TARGET_CORRECT
+
+def run_scramble(name, start_state, params, moves_mapping, learned_moves, ordering=None):
+    """
+    Ein Run auf einer festen Mischung. Die Mischung wird als Startzustand übergeben
+    (NO_MOVES_TO_SHUFFLE = 0), damit execute_run sie unverändert übernimmt.
+    """
+    solution_times = []
+    run_params = dict(params, NO_MOVES_TO_SHUFFLE=0)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = recall.execute_run(0, 0, run_params, start_state, moves_mapping, learned_moves,
+                                  on_solution=lambda row: solution_times.append(time.perf_counter() - start),
+                                  ordering=ordering)
+    total_time = time.perf_counter() - start
+    failures = [row[5] for row in rows if not verify_solution(start_state, row[5], moves_mapping)]
+    return {
+        "solutions": len(rows),
+        "first_solution_s": solution_times[0] if solution_times else None,
+        "first_solution_iterations": rows[0][4] if rows else None,
+        "all_solutions_s": solution_times[-1] if len(rows) >= params["SOLUTIONS_PER_RUN"] else None,
+        "total_s": total_time,
+        "iterations": [row[4] for row in rows],
+        "move_counts": [row[6] for row in rows],
+        "failed_solutions": failures,
+    }
+
+def run_pipeline(params, original_state, scrambles_per_depth):
+    """
+    Vollständiger Ablauf wie main im seriellen Modus: Mappings und Bibliothek laden, Runs
+    ausführen, Ergebnisse über ResultsSink schreiben (in eine temporäre Datei).
+    """
+    depth = max(SHUFFLE_DEPTHS)
+    run_params = dict(params, NO_MOVES_TO_SHUFFLE=depth)
+    run_numbers = [depth * 1000 + index for index in range(1, scrambles_per_depth + 1)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            moves_mapping = recall.MoveEngine(recall.load_mappings("mappings.json"))
+            learned_moves = recall.load_learned_library(run_params, os.path.join(recall.SCRIPT_DIR, "Improvements.csv"),
+                                                        moves_mapping)
+            load_time = time.perf_counter() - start
+            ordering = ordering_from_params(run_params, learned_moves, frozen=True)
+            with ResultsSink(os.path.join(temp_dir, "Results.csv"), flush_interval=run_params.get("RESULTS_FLUSH_SECONDS", 5)) as sink:
+                for run_number in run_numbers:
+                    recall.execute_run(run_number, recall.derive_run_seed(MASTER_SEED, run_number), run_params,
+                                       original_state, moves_mapping, learned_moves, on_solution=sink.write,
+                                       ordering=ordering)
+                    sink.flush()
+                rows_written = sink.rows_written
+        total_time = time.perf_counter() - start
+    return {"load_s": load_time, "total_s": total_time, "runs": len(run_numbers), "rows": rows_written}
+
+def run_benchmarks(min_seconds=1.0, scrambles_per_depth=SCRAMBLES_PER_DEPTH, params=None):
+    base_params = recall.load_parameters_from_csv()
+    base_params.update(BENCH_PARAMS)
+    base_params.update(params or {})
+    base_params.update(TELEMETRY_INTERVAL=0, PROFILE_RUNS=0)
+    original_state = recall.load_cube_from_csv()
+    moves_mapping = recall.MoveEngine(recall.load_mappings("mappings.json"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        learned_moves = recall.load_learned_library(base_params, os.path.join(recall.SCRIPT_DIR, "Improvements.csv"),
+                                                    moves_mapping)
+    scrambles = benchmark_scrambles(original_state, moves_mapping, scrambles_per_depth)
+    ordering = ordering_from_params(base_params, learned_moves, frozen=True)
+
+    results = {
+        "version": BENCHMARK_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": dict({key: base_params[key] for key in SEARCH_PARAMS if key in base_params},
+                       library=library_crc(learned_moves)),
+        "micro": run_micro([state for _, _, state in scrambles], moves_mapping, learned_moves, min_seconds),
+        "scrambles": {},
+    }
+    for name, depth, state in scrambles:
+        print(f"  {name} ...", file=sys.stderr)
+        results["scrambles"][name] = dict(run_scramble(name, state, base_params, moves_mapping, learned_moves, ordering),
+                                          depth=depth)
+    results["pipeline"] = run_pipeline(base_params, original_state, scrambles_per_depth)
+    return results
+
+
+# ======================================================================
+# Vergleich mit der Baseline
+# ======================================================================
+def correctness_problems(results):
+    return [f"{name}: Lösung löst den Würfel nicht: {sequence}"
+            for name, scramble in results["scrambles"].items() for sequence in scramble["failed_solutions"]]
+
+def same_machine(baseline, results):
+    return baseline.get("platform") == results["platform"] and baseline.get("python") == results["python"]
+
+def compare_results(baseline, results, tolerance):
+    """
+    Liefert (Regressionen, Abweichungen). Regression: Durchsatz mehr als tolerance (Anteil)
+    niedriger bzw. Zeit mehr als tolerance höher – nur auf demselben Rechner (same_machine).
+    Abweichung: deterministische Werte (Iterationen, Zuglängen) anders als in der Baseline –
+    nur bei gleichen Suchparametern.
+    """
+    regressions = []
+    mismatches = []
+    if not same_machine(baseline, results):
+        baseline = dict(baseline, micro={}, pipeline={},
+                        scrambles={name: {key: value for key, value in scramble.items() if not key.endswith("_s")}
+                                   for name, scramble in baseline.get("scrambles", {}).items()})
+    for group, measurements in results["micro"].items():
+        for key, value in measurements.items():
+            old = baseline.get("micro", {}).get(group, {}).get(key)
+            if old and value < old * (1 - tolerance):
+                regressions.append(f"micro {group} {key}: {old:.0f} -> {value:.0f} ({value / old - 1:+.1%})")
+    for name, scramble in results["scrambles"].items():
+        old = baseline.get("scrambles", {}).get(name)
+        if old is None:
+            continue
+        for key in ("first_solution_s", "all_solutions_s", "total_s"):
+            if old.get(key) and scramble.get(key) and scramble[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {old[key]:.3f}s -> {scramble[key]:.3f}s ({scramble[key] / old[key] - 1:+.1%})")
+        if baseline.get("params") == results["params"]:
+            for key in ("iterations", "move_counts"):
+                if old.get(key) != scramble[key]:
+                    mismatches.append(f"{name} {key}: {old.get(key)} -> {scramble[key]}")
+    old_total = baseline.get("pipeline", {}).get("total_s")
+    if old_total and results["pipeline"]["total_s"] > old_total * (1 + tolerance):
+        regressions.append(f"pipeline total_s: {old_total:.3f}s -> {results['pipeline']['total_s']:.3f}s")
+    return regressions, mismatches
+
+def print_results(results):
+    print("Micro-Benchmarks:")
+    for group, measurements in results["micro"].items():
+        for key, value in measurements.items():
+            print(f"  {group:22s} {value:14.0f} {key}")
+    print("Macro-Benchmarks (execute_run je Mischung):")
+    print(f"  {'Mischung':10s} {'Lösungen':>8s} {'1. Lösung s':>12s} {'Iter.':>7s} {'alle s':>9s} {'gesamt s':>9s}")
+    for name, scramble in results["scrambles"].items():
+        first = f"{scramble['first_solution_s']:.3f}" if scramble["first_solution_s"] is not None else "-"
+        first_iterations = scramble["first_solution_iterations"] if scramble["first_solution_iterations"] is not None else "-"
+        all_solutions = f"{scramble['all_solutions_s']:.3f}" if scramble["all_solutions_s"] is not None else "-"
+        print(f"  {name:10s} {scramble['solutions']:8d} {first:>12s} {first_iterations:>7} {all_solutions:>9s} {scramble['total_s']:9.3f}")
+    pipeline = results["pipeline"]
+    print(f"Gesamtablauf: {pipeline['runs']} Runs, {pipeline['rows']} Zeilen, Laden {pipeline['load_s']:.3f}s, gesamt {pipeline['total_s']:.3f}s")
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks für MoveEngine, Bewertung und Suche mit festen Mischungen.")
+    parser.add_argument("--save-baseline", action="store_true", help="Ergebnis als Baseline speichern")
+    parser.add_argument("--compare", action="store_true", help="mit der Baseline vergleichen")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Pfad der Baseline-Datei (JSON)")
+    parser.add_argument("--output", help="Ergebnis zusätzlich als JSON in diese Datei schreiben")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="erlaubte Verschlechterung als Anteil (Standard 0.10)")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="Mindestdauer je Micro-Benchmark")
+    parser.add_argument("--scrambles", type=int, default=SCRAMBLES_PER_DEPTH, help="Mischungen pro Tiefe")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    results = run_benchmarks(args.min_seconds, args.scrambles)
+    print_results(results)
+    failed = False
+
+    problems = correctness_problems(results)
+    for problem in problems:
+        print("FEHLER:", problem)
+    failed |= bool(problems)
+
+    if args.compare:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"Keine Baseline {args.baseline}: zuerst auf diesem Rechner mit --save-baseline erzeugen.")
+            return 1
+        if not same_machine(baseline, results):
+            print(f"Hinweis: Baseline von {baseline.get('platform')} / Python {baseline.get('python')}; "
+                  "Zeiten werden nicht verglichen.")
+        regressions, mismatches = compare_results(baseline, results, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION:", regression)
+        for mismatch in mismatches:
+            print("ABWEICHUNG:", mismatch)
+        if not regressions and not mismatches:
+            print(f"Keine Regression gegenüber {args.baseline} (Toleranz {args.tolerance:.0%}).")
+        failed |= bool(regressions or mismatches)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print("Baseline gespeichert:", args.baseline)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
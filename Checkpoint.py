@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+import json
+import os
+import shutil
+import struct
+import time
+import zlib
+from array import array
+
+import SolutionRecall as recall
+from ResultsWriter import decode_moves, encode_moves
+
+# ======================================================================
+# Checkpoints für lange Serien von Runs (serieller Modus)
+#
+# Verzeichnis .checkpoint/ mit zwei Dateien:
+#   state.bin        Zustand, bei jedem Checkpoint atomar ersetzt (tmp + fsync + replace):
+#                    Master-Seed, Run-Nummer/-Seed, Startzustand, Iterationszähler,
+#                    aktuelle Kombination (Kandidatenindizes), bisherige Lösungen und
+#                    die gültige Länge der History-Datei.
+#   history_<n>.bin  Folge der mark_exhausted-Aufrufe des CombinationTrie (Journal).
+#                    Pro Checkpoint wird nur angehängt, was seit dem letzten
+#                    hinzugekommen ist; wird das Journal deutlich länger als der
+#                    lebende Trie, wird eine neue Generation mit den verbliebenen
+#                    Pfaden geschrieben (Kosten pro Checkpoint bleiben begrenzt).
+#
+# Gesichert wird nur im Abstand CHECKPOINT_SECONDS und am Ende eines Runs.
+# Ergebniszeilen neuer Lösungen werden bis zum nächsten Checkpoint
+# zurückgehalten: Results.csv enthält so keine Lösung, die ein fortgesetzter
+# Run ein zweites Mal findet. Mit ADAPTIVE_ORDERING wird bei jedem Checkpoint
+# auch die Statistik (ORDERING_STATS_FILE) geschrieben.
+#
+# Parameter.csv: CHECKPOINT_SECONDS (Abstand zwischen zwei Checkpoints, 0 = aus).
+# Fortsetzen: python SolutionRecall.py --resume
+#
+# Die Transpositionstabelle wird nicht gesichert; mit TRANSPOSITION_TABLE_SIZE > 0
+# beginnt der fortgesetzte Run mit leerer Tabelle und kann andere Wege gehen.
+# ======================================================================
+CHECKPOINT_DIR = os.path.join(recall.SCRIPT_DIR, ".checkpoint")
+FORMAT_VERSION = 1
+DEFAULT_INTERVAL = 300  # Sekunden, wenn mit --resume fortgesetzt wird und CHECKPOINT_SECONDS 0 ist
+STATE_HEADER = struct.Struct("<4sHIqQIIBIIIdIQIHH19s")
+SOLUTION_HEADER = struct.Struct("<IdH")
+PATH_HEADER = struct.Struct("<H")
+CHECK_EVERY = 256  # Iterationen zwischen zwei Blicken auf die Uhr
+# Parameter, die eine Fortsetzung mit anderen Werten ungültig machen würden
+FINGERPRINT_PARAMS = ("NO_MOVES_TO_SHUFFLE", "MAX_ITERATIONS E3", "SOLUTIONS_PER_RUN", "EVALUATION_MODE",
+                      "SEARCH_MODE", "HISTORY_MAX_NODES", "TRANSPOSITION_TABLE_SIZE", "SYMMETRY_GROUP",
+                      "ADAPTIVE_ORDERING", "ORDERING_EXPLORATION", "ORDERING_VALUE_PRIOR", "LAST_LAYER_TABLE",
+                      "SIMPLIFY_SOLUTIONS")
+
+
+def fingerprint(params, learned_moves):
+    """
+    CRC32 über die suchrelevanten Parameter und die Kandidatenliste (Reihenfolge, Zugfolgen,
+    Vorbedingungen): Indizes und Sequenz-IDs im Checkpoint gelten nur für genau diese Daten.
+    """
+    crc = zlib.crc32(json.dumps([params.get(key) for key in FINGERPRINT_PARAMS]).encode("utf-8"))
+    for candidate in learned_moves:
+        crc = zlib.crc32(f"{candidate['Move Sequence']}|{candidate.get('Starting Positions') or ''}\n".encode("utf-8"), crc)
+    return crc
+
+def _write_atomic(path, data):
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+def encode_paths(paths):
+    chunks = []
+    for path in paths:
+        chunks.append(PATH_HEADER.pack(len(path)))
+        chunks.append(array("I", path).tobytes())
+    return b"".join(chunks)
+
+def decode_paths(data):
+    offset = 0
+    while offset + PATH_HEADER.size <= len(data):
+        (length,) = PATH_HEADER.unpack_from(data, offset)
+        offset += PATH_HEADER.size
+        path = array("I")
+        path.frombytes(data[offset:offset + 4 * length])
+        offset += 4 * length
+        yield tuple(path)
+
+
+class RunCheckpoint:
+    """
+    Schreibt und liest die Checkpoints einer Serie von Runs. execute_run meldet Run-Beginn
+    und -Ende, _search_run jede Lösung, optimize_cube ruft pro Iteration tick() auf.
+    output (write/flush) erhält die zurückgehaltenen Ergebniszeilen (write als on_solution),
+    ordering (optional, AdaptiveOrdering) wird nach ordering_path mitgesichert.
+    """
+
+    def __init__(self, params, learned_moves, master_seed, last_run, interval, output=None, directory=CHECKPOINT_DIR):
+        self.directory = directory
+        self.interval = interval
+        self.output = output
+        self.ordering = None
+        self.ordering_path = None
+        self._pending_rows = []
+        self.learned_moves = learned_moves
+        self.fingerprint = fingerprint(params, learned_moves)
+        self.master_seed = master_seed
+        self.last_run = last_run
+        self.run_number = 0
+        self.resume_state = None
+        self._call_resume = None
+        self._reset_run()
+
+    def _reset_run(self):
+        self.in_run = False
+        self.run_seed = 0
+        self.start_state = None
+        self.run_datetime = ""
+        self.run_start_time = 0.0
+        self.run_iterations = 0
+        self.solutions = []
+        self.history = None
+        self.call_state = ([], 0, 0)
+        self._generation = 0
+        self._history_length = 0
+        self._journal_records = 0
+        self._ticks = 0
+        self._next_save = time.monotonic() + self.interval
+
+    # ------------------------------------------------------------------
+    # Laden
+    # ------------------------------------------------------------------
+    @classmethod
+    def load(cls, params, learned_moves, interval, output=None, directory=CHECKPOINT_DIR):
+        """
+        Liest den letzten Checkpoint. Rückgabe None, wenn keiner existiert; ValueError, wenn er
+        nicht zu Parametern bzw. Improvements.csv passt oder beschädigt ist.
+        """
+        state_path = os.path.join(directory, "state.bin")
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path, "rb") as f:
+            data = f.read()
+        if len(data) < STATE_HEADER.size:
+            raise ValueError("Checkpoint ist unvollständig.")
+        (magic, version, crc, master_seed, run_seed, run_number, last_run, in_run, run_iterations, call_iteration,
+         cursor, elapsed, generation, history_length, evictions, index_count, solution_count,
+         run_datetime) = STATE_HEADER.unpack_from(data, 0)
+        if magic != b"SRCK" or version != FORMAT_VERSION:
+            raise ValueError("Unbekanntes Checkpoint-Format.")
+        checkpoint = cls(params, learned_moves, master_seed, last_run, interval, output, directory)
+        if crc != checkpoint.fingerprint:
+            raise ValueError("Checkpoint passt nicht zu Parameter.csv bzw. Improvements.csv.")
+        checkpoint.run_number = run_number
+        if not in_run:
+            return checkpoint
+        offset = STATE_HEADER.size
+        (state_length,) = PATH_HEADER.unpack_from(data, offset)
+        offset += PATH_HEADER.size
+        start_state = data[offset:offset + state_length].decode("utf-8").split(";")
+        offset += state_length
+        indices = array("I")
+        indices.frombytes(data[offset:offset + 4 * index_count])
+        offset += 4 * index_count
+        solutions = []
+        for _ in range(solution_count):
+            iterations, solution_elapsed, move_count = SOLUTION_HEADER.unpack_from(data, offset)
+            offset += SOLUTION_HEADER.size
+            move_sequence = " ".join(decode_moves(data[offset:offset + move_count]))
+            offset += move_count
+            solutions.append((iterations, solution_elapsed, move_sequence))
+        with open(os.path.join(directory, f"history_{generation}.bin"), "rb") as f:
+            history_data = f.read(history_length)
+        if len(history_data) != history_length:
+            raise ValueError("History-Datei des Checkpoints ist unvollständig.")
+        checkpoint.resume_state = {
+            "run_number": run_number, "run_seed": run_seed, "start_state": start_state,
+            "run_datetime": run_datetime.decode("ascii"), "elapsed": elapsed, "run_iterations": run_iterations,
+            "call_state": (list(indices), call_iteration, cursor), "solutions": solutions,
+            "history": history_data, "generation": generation, "evictions": evictions,
+        }
+        return checkpoint
+
+    def remaining_runs(self):
+        return list(range(self.run_number, self.last_run + 1))
+
+    # ------------------------------------------------------------------
+    # Ablauf eines Runs
+    # ------------------------------------------------------------------
+    def start_run(self, run_number, run_seed, start_state, run_datetime, run_start_time, history):
+        """
+        Beginnt (oder setzt fort) einen Run. Beim Fortsetzen wird history aus dem Journal
+        wiederhergestellt; Rückgabe dann {"run_datetime", "elapsed", "run_iterations", "solutions"}
+        mit den bisherigen Lösungen (Datensätze wie in _search_run), sonst None.
+        """
+        self._reset_run()
+        self.in_run = True
+        self.run_number = run_number
+        self.run_seed = run_seed
+        self.start_state = start_state
+        self.run_datetime = run_datetime
+        self.run_start_time = run_start_time
+        self.history = history
+        resume = self.resume_state
+        self.resume_state = None
+        if resume is None or resume["run_number"] != run_number:
+            self._remove_history_files()
+            self._start_generation(1, b"")
+            history.journal = []
+            return None
+        if resume["run_seed"] != run_seed or resume["start_state"] != start_state:
+            raise ValueError(f"Checkpoint von Run {run_number} passt nicht zur Startposition.")
+        for path in decode_paths(resume["history"]):
+            history.mark_exhausted(path)
+        history.evictions = resume["evictions"]
+        history.journal = []
+        self._generation = resume["generation"]
+        self._history_length = len(resume["history"])
+        self._journal_records = history.exhausted_count
+        with open(self._history_path(), "r+b") as f:
+            f.truncate(self._history_length)
+        self.run_datetime = resume["run_datetime"]
+        self.run_start_time = run_start_time - resume["elapsed"]
+        self.run_iterations = resume["run_iterations"]
+        self._call_resume = resume["call_state"]
+        start_state_str = ";".join(start_state)
+        self.solutions = [recall.solution_record(run_number, self.run_datetime, start_state_str, elapsed, iterations,
+                                                 move_sequence)
+                          for iterations, elapsed, move_sequence in resume["solutions"]]
+        print(f"Run {run_number} wird bei Iteration {self.run_iterations + resume['call_state'][1]} fortgesetzt "
+              f"({len(self.solutions)} Lösungen, {history.exhausted_count} erschöpfte Kombinationen).")
+        return {"run_datetime": self.run_datetime, "elapsed": resume["elapsed"],
+                "run_iterations": self.run_iterations, "solutions": self.solutions}
+
+    def begin_call(self, run_iterations, solutions):
+        """
+        Vor jedem Aufruf von optimize_cube: Stand des Runs und leere Kombination.
+        """
+        self.run_iterations = run_iterations
+        self.solutions = solutions
+        self.call_state = ([], 0, 0)
+
+    def take_call_state(self):
+        """
+        Zustand innerhalb von optimize_cube beim Fortsetzen: (Kandidatenindizes, Iteration, Cursor)
+        oder None. Wird nur einmal geliefert.
+        """
+        call_state = self._call_resume
+        self._call_resume = None
+        return call_state
+
+    def tick(self, iteration, indices, cursor=0):
+        self._ticks += 1
+        if self._ticks % CHECK_EVERY == 0 and time.monotonic() >= self._next_save:
+            self.call_state = (list(indices), iteration, cursor)
+            self.save()
+
+    def write(self, row):
+        """
+        Ergebniszeile einer Lösung; wird mit dem nächsten Checkpoint an output weitergegeben.
+        """
+        self._pending_rows.append(row)
+
+    def solution_found(self, run_iterations):
+        # Kein eigener Checkpoint: die Lösung wird mit dem nächsten (tick bzw. finish_run) gesichert.
+        self.run_iterations = run_iterations
+        self.call_state = ([], 0, 0)
+
+    def finish_run(self):
+        self._reset_run()
+        self.run_number += 1
+        self.save()
+        self._remove_history_files()
+
+    def discard(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Schreiben
+    # ------------------------------------------------------------------
+    def _history_path(self, generation=None):
+        return os.path.join(self.directory, f"history_{generation or self._generation}.bin")
+
+    def _remove_history_files(self):
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.startswith("history_"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def _start_generation(self, generation, data):
+        os.makedirs(self.directory, exist_ok=True)
+        _write_atomic(self._history_path(generation), data)
+        old_generation = self._generation
+        self._generation = generation
+        self._history_length = len(data)
+        return old_generation
+
+    def _sync_history(self):
+        """
+        Hängt das Journal seit dem letzten Checkpoint an; ist es mehr als doppelt so lang wie
+        der lebende Trie, wird stattdessen eine kompakte neue Generation geschrieben.
+        Rückgabe: abzulösende alte Generation oder None.
+        """
+        journal = self.history.journal
+        self._journal_records += len(journal)
+        if self._journal_records > 2 * self.history.exhausted_count + 1024:
+            journal.clear()
+            data = encode_paths(self.history.exhausted_paths())
+            self._journal_records = self.history.exhausted_count
+            return self._start_generation(self._generation + 1, data)
+        if journal:
+            data = encode_paths(journal)
+            journal.clear()
+            with open(self._history_path(), "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._history_length += len(data)
+        return None
+
+    def save(self):
+        """
+        Schreibt einen Checkpoint. Zuvor werden die zurückgehaltenen Ergebniszeilen geschrieben
+        (flush), damit keine Lösung im Checkpoint steht, die noch nicht in Results.csv ist.
+        """
+        if self.output is not None:
+            for row in self._pending_rows:
+                self.output.write(row)
+            self.output.flush()
+        self._pending_rows = []
+        if self.ordering is not None:
+            self.ordering.save(self.ordering_path)
+        os.makedirs(self.directory, exist_ok=True)
+        old_generation = self._sync_history() if self.in_run else None
+        indices, call_iteration, cursor = self.call_state
+        chunks = []
+        if self.in_run:
+            start_state = ";".join(self.start_state).encode("utf-8")
+            chunks.append(PATH_HEADER.pack(len(start_state)) + start_state)
+            chunks.append(array("I", indices).tobytes())
+            for solution in self.solutions:
+                moves = encode_moves(solution["move_sequence"])
+                chunks.append(SOLUTION_HEADER.pack(solution["iterations"], solution["elapsed"], len(moves)) + moves)
+        header = STATE_HEADER.pack(b"SRCK", FORMAT_VERSION, self.fingerprint, self.master_seed, self.run_seed,
+                                   self.run_number, self.last_run, self.in_run, self.run_iterations, call_iteration,
+                                   cursor, time.time() - self.run_start_time if self.in_run else 0.0,
+                                   self._generation, self._history_length,
+                                   self.history.evictions if self.in_run else 0,
+                                   len(indices) if self.in_run else 0, len(self.solutions) if self.in_run else 0,
+                                   self.run_datetime.encode("ascii"))
+        _write_atomic(os.path.join(self.directory, "state.bin"), header + b"".join(chunks))
+        if old_generation is not None and old_generation != self._generation:
+            try:
+                os.remove(self._history_path(old_generation))
+            except OSError:
+                pass
+        self._next_save = time.monotonic() + self.interval
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+from collections import deque
+
+
+# ======================================================================
+# Präfixbaum (Trie) der erschöpften Kombinationen
+# ======================================================================
+class TrieNode:
+    """
+    Knoten für eine Kombination (Pfad von Sequenz-IDs ab der Wurzel).
+    children: {Sequenz-ID: TrieNode} oder None, exhausted: Kombination ist erschöpft.
+    """
+    __slots__ = ("parent", "key", "children", "exhausted")
+
+    def __init__(self, parent=None, key=None):
+        self.parent = parent
+        self.key = key
+        self.children = None
+        self.exhausted = False
+
+    def child(self, sequence_id):
+        """
+        O(1)-Nachschlagen eines Kindknotens (None, falls nicht vorhanden).
+        """
+        children = self.children
+        return children.get(sequence_id) if children else None
+
+    def is_viable(self, sequence_id):
+        """
+        True, wenn die Erweiterung dieser Kombination um sequence_id noch nicht erschöpft ist.
+        """
+        children = self.children
+        if not children:
+            return True
+        child = children.get(sequence_id)
+        return child is None or not child.exhausted
+
+
+class CombinationTrie:
+    """
+    Ersatz für das combination_history-Set: speichert erschöpfte Kombinationen als Pfade
+    kompakter Sequenz-IDs (siehe compile_learned_moves, Schlüssel "Sequence ID").
+
+    - Prüfen einer Erweiterung kostet ein Dictionary-Lookup am aktuellen Knoten, ohne
+      Tupel- oder Listen-Allokation.
+    - Wird ein Knoten als erschöpft markiert, werden seine Nachfolger verworfen: Eine
+      erschöpfte Kombination wird nie mehr erweitert, ihre Unterbäume können also nie
+      mehr abgefragt werden (verlustfrei).
+    - Speicherobergrenze (max_nodes > 0): Wird sie überschritten, werden die ältesten
+      erschöpften Blätter zuerst entfernt (FIFO nach Zeitpunkt der Markierung); danach
+      leere, nicht erschöpfte Zwischenknoten. Eine so verdrängte Kombination kann später
+      erneut durchsucht werden – das kostet nur Iterationen, gefundene Lösungen bleiben
+      gültig (Duplikate filtert main). max_nodes = 0 bedeutet unbegrenzt.
+    - journal (optional, Liste): jeder Aufruf von mark_exhausted wird als Tupel angehängt.
+      Dieselben Aufrufe in derselben Reihenfolge erzeugen denselben Trie (siehe Checkpoint).
+    - Der leere Pfad sperrt keine Kombination; mark_exhausted(()) setzt nur root_finished
+      (Endfolge der letzten Ebene schon vom Ausgangszustand aus geliefert, siehe optimize_cube).
+    """
+
+    def __init__(self, max_nodes=0):
+        self.root = TrieNode()
+        self.max_nodes = max_nodes
+        self.node_count = 0
+        self.exhausted_count = 0
+        self.evictions = 0
+        self._exhausted_order = deque()
+        self.journal = None
+        self.root_finished = False
+
+    def __len__(self):
+        return self.exhausted_count
+
+    def find(self, path):
+        """
+        Knoten zu einer Kombination (Folge von Sequenz-IDs) oder None.
+        """
+        node = self.root
+        for sequence_id in path:
+            node = node.child(sequence_id)
+            if node is None:
+                return None
+        return node
+
+    def __contains__(self, path):
+        node = self.find(path)
+        return node is not None and node.exhausted
+
+    def mark_exhausted(self, path):
+        """
+        Markiert eine Kombination als erschöpft (Pfad wird bei Bedarf angelegt).
+        """
+        if self.journal is not None:
+            self.journal.append(tuple(path))
+        node = self.root
+        for sequence_id in path:
+            if node.exhausted:
+                return  # Vorgänger bereits erschöpft: Kombination ist ohnehin gesperrt.
+            child = node.child(sequence_id)
+            if child is None:
+                child = TrieNode(node, sequence_id)
+                if node.children is None:
+                    node.children = {}
+                node.children[sequence_id] = child
+                self.node_count += 1
+            node = child
+        if node is self.root:
+            self.root_finished = True
+            return
+        if node.exhausted:
+            return
+        if node.children:
+            for child in node.children.values():
+                self._detach(child)
+            node.children = None
+        node.exhausted = True
+        self.exhausted_count += 1
+        self._exhausted_order.append(node)
+        if self.max_nodes:
+            while self.node_count > self.max_nodes and self._exhausted_order:
+                self._evict(self._exhausted_order.popleft())
+
+    add = mark_exhausted
+
+    def exhausted_paths(self):
+        """
+        Alle noch gespeicherten erschöpften Kombinationen in Markierungsreihenfolge. Erneut mit
+        mark_exhausted eingetragen ergeben sie denselben Trie (inklusive Verdrängungsreihenfolge).
+        """
+        if self.root_finished:
+            yield ()
+        for node in self._exhausted_order:
+            path = []
+            current = node
+            while current.parent is not None:
+                path.append(current.key)
+                current = current.parent
+            if current is self.root and node.exhausted and node is not self.root:
+                yield tuple(reversed(path))
+
+    def _detach(self, node):
+        """
+        Entfernt einen Unterbaum aus der Zählung (Knoten werden als abgehängt markiert).
+        """
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            current.parent = None
+            self.node_count -= 1
+            if current.exhausted:
+                self.exhausted_count -= 1
+            if current.children:
+                stack.extend(current.children.values())
+                current.children = None
+
+    def _evict(self, node):
+        if node.parent is None or node.children:
+            return  # bereits verworfen oder kein Blatt mehr
+        self.evictions += 1
+        while node is not self.root and node.parent is not None and not node.children:
+            parent = node.parent
+            del parent.children[node.key]
+            if not parent.children:
+                parent.children = None
+            if node.exhausted:
+                self.exhausted_count -= 1
+            node.parent = None
+            self.node_count -= 1
+            if parent.exhausted:
+                break
+            node = parent
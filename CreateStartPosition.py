@@ -1,5 +1,24 @@
 #!/usr/bin/env python3
 import csv
+import re
+
+from CubeValidation import validate_cube_state
+
+# English wording for the (German) problem messages of CubeValidation.validate_cube_state.
+PROBLEM_MESSAGES = [
+    (r"Erwartet 54 Farbcodes, gefunden: (\S+)", "Expected 54 color codes, found: {0}"),
+    (r"Unbekannte Farbe (\S+) \((\d+)-mal\)", "Unknown color {0} ({1} times)"),
+    (r"Farbe (\S+) kommt (\d+)-mal statt 9-mal vor", "Color {0} occurs {1} times instead of 9"),
+    (r"Farbe (\S+) fehlt", "Color {0} is missing"),
+    (r"Mittelstein an Position (\d+) ist (\S+) statt (\S+)", "Center at cell {0} is {1} instead of {2}"),
+    (r"Ecke an den Positionen (.+) existiert nicht: (\S+)", "Corner at cells {0} does not exist: {1}"),
+    (r"Kante an den Positionen (.+) existiert nicht: (\S+)", "Edge at cells {0} does not exist: {1}"),
+    (r"Ecke (\S+) kommt (\d+)-mal vor", "Corner {0} occurs {1} times"),
+    (r"Kante (\S+) kommt (\d+)-mal vor", "Edge {0} occurs {1} times"),
+    (r"Eckverdrehung: Summe (\d+) .*", "Corner twist: sum {0} is not divisible by 3 (a corner is twisted)"),
+    (r"Kantenkippung: .*", "Edge flip: sum is odd (an edge is flipped)"),
+    (r"Permutationsparität: .*", "Permutation parity: corners and edges do not match (two pieces are swapped)"),
+]
 
 def print_cube(cube):
     """
@@ -82,6 +101,16 @@ def save_csv(cube, filename="csv_export-StartPos.csv"):
         writer.writerow(ordered)
     print(f"Cube configuration saved to {filename}")
 
+def translate_problem(problem):
+    """
+    Returns the English wording of a validation message (unknown messages are returned unchanged).
+    """
+    for pattern, template in PROBLEM_MESSAGES:
+        match = re.fullmatch(pattern, problem)
+        if match:
+            return template.format(*match.groups())
+    return problem
+
 def main():
     # Initialize the cube with numbered positions so you see which cell is which.
     cube = [str(i) for i in range(1, 55)]
@@ -140,10 +169,18 @@ def main():
     # Final review mode – allow further corrections before saving.
     print("Sequential entry complete.")
     print("You are now in review mode. Enter a cell number (1-54) to correct that position, or type 'save' to save the configuration.")
+    print("The configuration is checked for solvability (colors, pieces, twist, flip, parity) before saving.")
     while True:
         review_input = input("Review mode: Enter cell number to correct or 'save' to finish: ").strip().lower()
         if review_input == "save":
-            break
+            # Reject configurations that no sequence of moves can reach.
+            problems = validate_cube_state(cube)
+            if not problems:
+                break
+            print("This configuration cannot be solved and was not saved:")
+            for problem in problems:
+                print("  -", translate_problem(problem))
+            print("Please correct the listed cells.")
         elif review_input.isdigit():
             cell_num = int(review_input)
             if not (1 <= cell_num <= 54):
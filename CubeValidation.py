@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+from collections import Counter
+
+import SolutionRecall as recall
+from CubieState import CubieModel
+
+# ======================================================================
+# Lösbarkeitsprüfung einer Startposition (54 Farbcodes)
+#
+# Die Sticker werden über die Steindefinitionen aus pieces_level1/2/3
+# (levels["E3"]) in Ecken und Kanten zerlegt; geprüft werden:
+#   - Farbanzahlen (jede Farbe genau 9-mal) und Mittelsteine
+#   - Existenz jedes Steins (gültige Farbkombination, kein Stein doppelt)
+#   - Summe der Eckverdrehungen (mod 3) und der Kantenkippungen (mod 2)
+#   - Permutationsparität: Ecken und Kanten müssen gleich sein
+# Erreichbar durch Züge ist eine Position genau dann, wenn alles erfüllt ist.
+# ======================================================================
+_model_cache = {}
+
+
+def get_validation_model(moves_mapping=None):
+    """
+    CubieModel für levels["E3"] (einmal pro Mapping gebaut). Ohne moves_mapping wird mappings.json geladen.
+    """
+    if moves_mapping is None:
+        moves_mapping = _model_cache.get("mappings")
+        if moves_mapping is None:
+            moves_mapping = _model_cache["mappings"] = recall.load_mappings("mappings.json")
+    cached = _model_cache.get(id(moves_mapping))
+    if cached is None or cached[0] is not moves_mapping:
+        cached = (moves_mapping, CubieModel(recall.levels["E3"], moves_mapping))
+        _model_cache[id(moves_mapping)] = cached
+    return cached[1]
+
+def permutation_parity(pieces):
+    """
+    0 für gerade, 1 für ungerade Permutation (über die Zyklenzerlegung).
+    """
+    seen = [False] * len(pieces)
+    transpositions = 0
+    for start in range(len(pieces)):
+        length = 0
+        index = start
+        while not seen[index]:
+            seen[index] = True
+            index = pieces[index]
+            length += 1
+        if length:
+            transpositions += length - 1
+    return transpositions % 2
+
+def _read_pieces(cube_state, slots, lookup, piece_colors, kind, problems):
+    """
+    Steine und Orientierungen aller Slots einer Art; fehlerhafte Slots werden in problems gemeldet.
+    """
+    pieces = []
+    orientations = []
+    for positions in slots:
+        colors = tuple(cube_state[p - 1] for p in positions)
+        piece = lookup.get(frozenset(colors))
+        if piece is None or len(set(colors)) != len(colors):
+            problems.append(f"{kind} an den Positionen {positions} existiert nicht: {'/'.join(colors)}")
+            continue
+        pieces.append(piece)
+        orientations.append(colors.index(piece_colors[piece][0]))
+    for piece, count in Counter(pieces).items():
+        if count > 1:
+            problems.append(f"{kind} {'/'.join(piece_colors[piece])} kommt {count}-mal vor")
+    return pieces, orientations
+
+def validate_cube_state(cube_state, model=None):
+    """
+    Liefert die Liste der gefundenen Fehler (leer: Position ist lösbar).
+    """
+    if len(cube_state) != 54:
+        return [f"Erwartet 54 Farbcodes, gefunden: {len(cube_state)}"]
+    model = model or get_validation_model()
+    problems = []
+
+    expected_colors = set(model.center_colors.values())
+    for color, count in sorted(Counter(cube_state).items()):
+        if color not in expected_colors:
+            problems.append(f"Unbekannte Farbe {color!r} ({count}-mal)")
+        elif count != 9:
+            problems.append(f"Farbe {color!r} kommt {count}-mal statt 9-mal vor")
+    for color in sorted(expected_colors - set(cube_state)):
+        problems.append(f"Farbe {color!r} fehlt")
+    for pos, color in sorted(model.center_colors.items()):
+        if cube_state[pos - 1] != color:
+            problems.append(f"Mittelstein an Position {pos} ist {cube_state[pos - 1]!r} statt {color!r}")
+
+    corners, twists = _read_pieces(cube_state, model.corner_slots, model.corner_lookup, model.corner_colors,
+                                   "Ecke", problems)
+    edges, flips = _read_pieces(cube_state, model.edge_slots, model.edge_lookup, model.edge_colors,
+                                "Kante", problems)
+    if problems:
+        return problems  # Orientierung und Parität sind nur für vollständige Steinsätze definiert.
+
+    if sum(twists) % 3:
+        problems.append(f"Eckverdrehung: Summe {sum(twists)} ist nicht durch 3 teilbar (eine Ecke ist verdreht)")
+    if sum(flips) % 2:
+        problems.append("Kantenkippung: Summe ist ungerade (eine Kante ist gekippt)")
+    if permutation_parity(corners) != permutation_parity(edges):
+        problems.append("Permutationsparität: Ecken und Kanten passen nicht zusammen (zwei Steine vertauscht)")
+    return problems
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+from MoveEngine import get_move_engine
+
+
+# ======================================================================
+# Cubie-Darstellung: 8 Ecken + 12 Kanten statt 54 Sticker
+#
+# Ein Zustand ist ein bytes-Objekt mit 20 Einträgen:
+#   Ecken-Slot j (0-7):  Stein * 3 + Verdrehung (0-2)
+#   Kanten-Slot j (0-11): Stein * 2 + Kippung (0-1)
+# Gelöst ist Slot j, wenn dort Stein j mit Orientierung 0 sitzt.
+# Slots/Steine entsprechen den Ecken (3 Sticker) bzw. Kanten (2 Sticker)
+# aus pieces_level1/2/3 in deren Reihenfolge.
+# ======================================================================
+FACE_SIZE = 9
+
+
+def _face(pos):
+    return (pos - 1) // FACE_SIZE
+
+
+class CubieModel:
+    """
+    Baut aus den Steindefinitionen (z.B. levels["E3"]) und den Moves aus mappings.json
+    die Cubie-Darstellung samt Zugtabellen auf.
+
+    Orientierung: Jeder Slot hat einen Referenz-Sticker auf der Achse der Mittelsteine
+    von Position 5 und 50 (bei Mittelschicht-Kanten: Achse 23/41). Die Orientierung eines
+    Steins ist der Versatz seiner Referenzfarbe gegenüber diesem Sticker. Die Sticker
+    einer Ecke werden dazu mit Hilfe der Moves in einheitlichem Drehsinn geordnet, sodass
+    Verdrehungen additiv (mod 3) sind und die üblichen Invarianten gelten.
+    """
+
+    def __init__(self, target_pieces, moves_mapping):
+        self.engine = get_move_engine(moves_mapping)
+        corners = [(name, pos, col) for name, (pos, col) in target_pieces.items() if len(pos) == 3]
+        edges = [(name, pos, col) for name, (pos, col) in target_pieces.items() if len(pos) == 2]
+        self.corner_names = [name for name, _, _ in corners]
+        self.edge_names = [name for name, _, _ in edges]
+        self.piece_names = self.corner_names + self.edge_names
+        self.n_corners = len(corners)
+        self.n_edges = len(edges)
+
+        home_colors = {}
+        for _, positions, colors in corners + edges:
+            home_colors.update(zip(positions, colors))
+        # Mittelsteine: Farbe jeder Seite aus den Stickern der Steine in Grundstellung
+        self.center_colors = {}
+        for pos, col in home_colors.items():
+            self.center_colors[_face(pos) * FACE_SIZE + 5] = col
+        primary_faces = {_face(5), _face(50)}
+        secondary_faces = {_face(23), _face(41)}
+
+        corner_slots = self._consistent_corner_order([pos for _, pos, _ in corners])
+        self.corner_slots = [self._rotate_to_reference(slot, primary_faces) for slot in corner_slots]
+        self.edge_slots = []
+        for _, positions, _ in edges:
+            reference_faces = primary_faces if any(_face(p) in primary_faces for p in positions) else secondary_faces
+            self.edge_slots.append(self._rotate_to_reference(tuple(positions), reference_faces))
+        self.corner_colors = [tuple(home_colors[p] for p in slot) for slot in self.corner_slots]
+        self.edge_colors = [tuple(home_colors[p] for p in slot) for slot in self.edge_slots]
+        self.corner_lookup = {frozenset(colors): index for index, colors in enumerate(self.corner_colors)}
+        self.edge_lookup = {frozenset(colors): index for index, colors in enumerate(self.edge_colors)}
+
+        self.solved = bytes([j * 3 for j in range(self.n_corners)] + [j * 2 for j in range(self.n_edges)])
+        self.move_tables = {move: self._transform_from_permutation(perm) for move, perm in self.engine.move_perms.items()}
+        self._sequence_cache = {}
+
+    # ------------------------------------------------------------------
+    # Aufbau
+    # ------------------------------------------------------------------
+    def _consistent_corner_order(self, slots):
+        """
+        Ordnet die Sticker aller Ecken im selben Drehsinn wie die erste Ecke: Eine Vierteldrehung
+        bildet die Sticker einer Ecke als zyklische Rotation auf eine andere Ecke ab.
+        """
+        slot_of = {}
+        for index, positions in enumerate(slots):
+            for pos in positions:
+                slot_of[pos] = index
+        ordered = {0: tuple(slots[0])}
+        queue = [0]
+        while queue:
+            index = queue.pop()
+            for perm in self.engine.move_perms.values():
+                inverse = {src: tgt for tgt, src in enumerate(perm)}
+                images = tuple(inverse[p - 1] + 1 for p in ordered[index])
+                target = slot_of[images[0]]
+                if target not in ordered:
+                    ordered[target] = images
+                    queue.append(target)
+        return [ordered.get(index, tuple(slots[index])) for index in range(len(slots))]
+
+    @staticmethod
+    def _rotate_to_reference(positions, reference_faces):
+        for shift in range(len(positions)):
+            if _face(positions[shift]) in reference_faces:
+                return tuple(positions[shift:]) + tuple(positions[:shift])
+        return tuple(positions)
+
+    def _transform_from_permutation(self, perm):
+        """
+        Zugtabelle aus einer Sticker-Permutation: pro Ziel-Slot (Quell-Slot, Orientierungsänderung).
+        """
+        corner_home = {}
+        for slot, positions in enumerate(self.corner_slots):
+            for k, pos in enumerate(positions):
+                corner_home[pos - 1] = (slot, k)
+        edge_home = {}
+        for slot, positions in enumerate(self.edge_slots):
+            for k, pos in enumerate(positions):
+                edge_home[pos - 1] = (slot, k)
+        # Der Sticker an Index 0 eines Ziel-Slots stammt vom Sticker perm[...] (Index k im Quell-Slot).
+        corners = []
+        for positions in self.corner_slots:
+            source, k = corner_home[perm[positions[0] - 1]]
+            corners.append((source, (-k) % 3))
+        edges = []
+        for positions in self.edge_slots:
+            source, k = edge_home[perm[positions[0] - 1]]
+            edges.append((source, (-k) % 2))
+        return self._compile_transform(corners, edges)
+
+    def _compile_transform(self, corners, edges):
+        """
+        Wandelt [(Quell-Slot, Orientierungsänderung)] in Nachschlagetabellen für apply_transform um.
+        """
+        table = []
+        for source, twist in corners:
+            table.append((source, bytes(((v // 3) * 3 + (v % 3 + twist) % 3) for v in range(self.n_corners * 3))))
+        for source, flip in edges:
+            table.append((self.n_corners + source, bytes(((v // 2) * 2 + (v % 2 + flip) % 2) for v in range(self.n_edges * 2))))
+        return tuple(table)
+
+    # ------------------------------------------------------------------
+    # Zustände und Züge
+    # ------------------------------------------------------------------
+    def apply_transform(self, state, transform):
+        return bytes([lookup[state[source]] for source, lookup in transform])
+
+    def apply_move(self, state, move):
+        transform = self.move_tables.get(move)
+        return state if transform is None else self.apply_transform(state, transform)
+
+    def sequence_transform(self, sequence):
+        """
+        Zusammengesetzte Zugtabelle einer Zugfolge (aus der Sticker-Permutation der MoveEngine).
+        """
+        key = sequence if isinstance(sequence, str) else " ".join(sequence)
+        transform = self._sequence_cache.get(key)
+        if transform is None:
+            transform = self._transform_from_permutation(self.engine.sequence_permutation(key))
+            self._sequence_cache[key] = transform
+        return transform
+
+    def apply_sequence(self, state, sequence):
+        return self.apply_transform(state, self.sequence_transform(sequence))
+
+    # ------------------------------------------------------------------
+    # Umrechnung Sticker <-> Cubies
+    # ------------------------------------------------------------------
+    def from_stickers(self, cube_state):
+        """
+        54 Farbcodes -> Cubie-Zustand. ValueError, wenn ein Stein nicht existiert.
+        """
+        values = []
+        for slot, positions in enumerate(self.corner_slots):
+            colors = tuple(cube_state[p - 1] for p in positions)
+            piece = self.corner_lookup.get(frozenset(colors))
+            if piece is None or len(set(colors)) != 3:
+                raise ValueError(f"Ungültige Ecke an den Positionen {positions}: {colors}")
+            values.append(piece * 3 + colors.index(self.corner_colors[piece][0]))
+        for slot, positions in enumerate(self.edge_slots):
+            colors = tuple(cube_state[p - 1] for p in positions)
+            piece = self.edge_lookup.get(frozenset(colors))
+            if piece is None or len(set(colors)) != 2:
+                raise ValueError(f"Ungültige Kante an den Positionen {positions}: {colors}")
+            values.append(piece * 2 + colors.index(self.edge_colors[piece][0]))
+        return bytes(values)
+
+    def to_stickers(self, state):
+        """
+        Cubie-Zustand -> Liste von 54 Farbcodes.
+        """
+        cube_state = [None] * 54
+        for pos, col in self.center_colors.items():
+            cube_state[pos - 1] = col
+        for slot, positions in enumerate(self.corner_slots):
+            piece, twist = divmod(state[slot], 3)
+            for k, col in enumerate(self.corner_colors[piece]):
+                cube_state[positions[(k + twist) % 3] - 1] = col
+        for slot, positions in enumerate(self.edge_slots):
+            piece, flip = divmod(state[self.n_corners + slot], 2)
+            for k, col in enumerate(self.edge_colors[piece]):
+                cube_state[positions[(k + flip) % 2] - 1] = col
+        return cube_state
+
+    # ------------------------------------------------------------------
+    # Bewertung
+    # ------------------------------------------------------------------
+    def piece_correct(self, state, name):
+        """
+        True, wenn der Stein name (z.B. "E1", "K5") an seinem Platz korrekt orientiert ist.
+        """
+        if name in self.corner_names:
+            slot = self.corner_names.index(name)
+            return state[slot] == slot * 3
+        slot = self.edge_names.index(name)
+        return state[self.n_corners + slot] == slot * 2
+
+    def correct_pieces(self, state):
+        """
+        Menge der korrekt positionierten Steine (entspricht get_correct_pieces).
+        """
+        return {name for index, name in enumerate(self.piece_names) if state[index] == self.solved[index]}
+
+    def correct_mask(self, state, piece_bits):
+        """
+        Bitmaske der korrekten Steine in der Bit-Reihenfolge von piece_bits (z.B. PIECE_BITS).
+        """
+        mask = 0
+        for value, home, name in zip(state, self.solved, self.piece_names):
+            if value == home:
+                mask |= piece_bits[name]
+        return mask
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+import SolutionRecall as recall
+from MoveEngine import IDENTITY, apply_permutation, compose, get_move_engine
+
+# ======================================================================
+# Nachschlagetabelle für die letzte Ebene (pieces_level3)
+#
+# Sind alle Steine aus pieces_level1 und pieces_level2 korrekt, bestimmen
+# die 20 Sticker der 8 Steine aus pieces_level3 den Zustand vollständig
+# (62208 erreichbare Zustände). Die Tabelle enthält für jeden eine kurze
+# Endfolge; optimize_cube (SEARCH_MODE "restart") schlägt den Zustand nach,
+# sobald Ebene 1–2 gelöst sind, und beendet die Kombination damit.
+#
+# Erzeugung (offline, python LastLayerTable.py --build): Erzeuger sind alle
+# Einzelzüge und Zeilen aus Improvements.csv – jeweils auch invertiert –,
+# die Ebene 1–2 unverändert lassen; pro Wirkung auf die letzte Ebene die
+# kürzeste. Eine Dijkstra-Suche nach Zuganzahl (Buckets je Kosten) vom
+# gelösten Zustand aus liefert die Endfolgen; die Expansion eines Buckets
+# wird mit --workers auf mehrere Prozesse verteilt. Endfolgen werden mit
+# MoveSimplifier gekürzt.
+#
+# Index: (Rang Eckenpermutation * 27 + Eckdrehung) * 24 + Rang Kantenpermutation) * 8
+# + Kantenkippung; Drehung/Kippung der jeweils letzten Ecke/Kante ergeben sich aus den
+# übrigen. Datei (per mmap gelesen): Kopf <Kennung, Version, CRC von mappings.json,
+# Einträge>, je Index ein Offset uint32 (0xFFFFFFFF = kein Eintrag), danach je
+# Endfolge <Länge uint8, Zugindizes in allowed_moves_global uint8>.
+#
+# Parameter.csv: LAST_LAYER_TABLE (1 = nachschlagen, nur SEARCH_MODE "restart"), LAST_LAYER_FILE (Tabellendatei).
+# ======================================================================
+TABLE_HEADER = struct.Struct("<4sHII")
+TABLE_VERSION = 1
+MISSING = 0xFFFFFFFF
+DEFAULT_FILE = "last_layer.bin"
+
+CORNERS = [piece for piece, (positions, _) in recall.pieces_level3.items() if len(positions) == 3]
+EDGES = [piece for piece, (positions, _) in recall.pieces_level3.items() if len(positions) == 2]
+LAYER_POSITIONS = [pos - 1 for piece in CORNERS + EDGES for pos in recall.pieces_level3[piece][0]]
+SOLVED_LAYER = tuple(color for piece in CORNERS + EDGES for color in recall.pieces_level3[piece][1])
+LAYER_COLOR = set.intersection(*(set(colors) for _, colors in recall.pieces_level3.values())).pop()
+LOWER_MASK = recall.pieces_to_mask(list(recall.pieces_level1) + list(recall.pieces_level2))
+TABLE_ENTRIES = 24 * 27 * 24 * 8
+MOVE_CODES = {move: code for code, move in enumerate(recall.allowed_moves_global)}
+
+_CORNER_PIECES = {frozenset(recall.pieces_level3[piece][1]): number for number, piece in enumerate(CORNERS)}
+_EDGE_PIECES = {frozenset(recall.pieces_level3[piece][1]): number for number, piece in enumerate(EDGES)}
+_PERMUTATION_RANKS = {permutation: rank for rank, permutation in enumerate(itertools.permutations(range(4)))}
+_read_layer = itemgetter(*LAYER_POSITIONS)
+
+
+def layer_index(colors):
+    """
+    Tabellenindex für die Farben der Sticker in LAYER_POSITIONS (KeyError/ValueError bei
+    Farbkombinationen, die kein Stein der letzten Ebene sind).
+    """
+    corners = []
+    twist = 0
+    for k in range(4):
+        reading = colors[3 * k:3 * k + 3]
+        corners.append(_CORNER_PIECES[frozenset(reading)])
+        if k < 3:
+            twist = twist * 3 + reading.index(LAYER_COLOR)
+    edges = []
+    flip = 0
+    for k in range(4):
+        reading = colors[12 + 2 * k:14 + 2 * k]
+        edges.append(_EDGE_PIECES[frozenset(reading)])
+        if k < 3:
+            flip = flip * 2 + reading.index(LAYER_COLOR)
+    return ((_PERMUTATION_RANKS[tuple(corners)] * 27 + twist) * 24 + _PERMUTATION_RANKS[tuple(edges)]) * 8 + flip
+
+def inverse_moves(moves):
+    return [move[:-1] if move.endswith("b") else move + "b" for move in reversed(moves)]
+
+def moves_permutation(moves, engine):
+    """
+    Permutation einer Zugliste ohne den Zugfolgen-Cache der MoveEngine.
+    """
+    perm = IDENTITY
+    for move in moves:
+        perm = compose(perm, engine.move_permutation(move))
+    return perm
+
+
+# ======================================================================
+# Erzeugung
+# ======================================================================
+def layer_generators(moves_mapping, learned_moves):
+    """
+    Zugfolgen, die alle Sticker außerhalb der letzten Ebene festhalten, als Liste
+    (Züge, Permutation auf LAYER_POSITIONS) – je Wirkung die kürzeste.
+    """
+    engine = get_move_engine(moves_mapping)
+    layer = set(LAYER_POSITIONS)
+    sources = [[move] for move in recall.allowed_moves_global]
+    sources += [candidate["Move Sequence"].split() for candidate in learned_moves]
+    generators = {}
+    for source in sources:
+        for moves in (source, inverse_moves(source)):
+            perm = moves_permutation(moves, engine)
+            if any(perm[i] != i for i in range(len(perm)) if i not in layer):
+                continue
+            layer_perm = tuple(LAYER_POSITIONS.index(perm[i]) for i in LAYER_POSITIONS)
+            if layer_perm not in generators or len(moves) < len(generators[layer_perm]):
+                generators[layer_perm] = moves
+    return [(moves, layer_perm) for layer_perm, moves in generators.items()]
+
+_expand_context = {}
+
+def _init_expand(generators):
+    _expand_context["appliers"] = [itemgetter(*layer_perm) for _, layer_perm in generators]
+
+def _expand(states):
+    """
+    Nachfolger einer Liste von (Index, Farben): Liste (Nachfolgeindex, Index, Erzeuger).
+    """
+    appliers = _expand_context["appliers"]
+    children = []
+    for index, colors in states:
+        for number, applier in enumerate(appliers):
+            children.append((layer_index(applier(colors)), index, number))
+    return children
+
+def search_layer(generators, workers=1):
+    """
+    Dijkstra nach Zuganzahl vom gelösten Zustand aus. Rückgabe: dict Index -> Endfolge (Zugliste).
+    Die Endfolge eines Nachfolgers ist die invertierte Erzeugerfolge, gefolgt von der Endfolge des Vorgängers.
+    """
+    costs = [len(moves) for moves, _ in generators]
+    steps = [inverse_moves(moves) for moves, _ in generators]
+    solved_index = layer_index(SOLVED_LAYER)
+    states = {solved_index: SOLVED_LAYER}
+    distances = {solved_index: 0}
+    parents = {}
+    buckets = {0: [solved_index]}
+    executor = ProcessPoolExecutor(workers, initializer=_init_expand, initargs=(generators,)) if workers > 1 else None
+    if executor is None:
+        _init_expand(generators)
+    appliers = [itemgetter(*layer_perm) for _, layer_perm in generators]
+    cost = 0
+    try:
+        while buckets:
+            frontier = [(index, states[index]) for index in dict.fromkeys(buckets.pop(cost, ()))
+                        if distances[index] == cost]
+            if executor is None:
+                children = _expand(frontier)
+            else:
+                chunk = len(frontier) // (4 * workers) + 1
+                children = itertools.chain.from_iterable(
+                    executor.map(_expand, [frontier[i:i + chunk] for i in range(0, len(frontier), chunk)]))
+            for child, parent, number in children:
+                child_cost = cost + costs[number]
+                if child_cost < distances.get(child, child_cost + 1):
+                    distances[child] = child_cost
+                    parents[child] = (parent, number)
+                    states[child] = appliers[number](states[parent])
+                    buckets.setdefault(child_cost, []).append(child)
+            cost += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    sequences = {}
+    for index in distances:
+        moves = []
+        position = index
+        while position != solved_index:
+            position, number = parents[position]
+            moves.extend(steps[number])
+        sequences[index] = moves
+    return sequences
+
+def mappings_crc(path=None):
+    with open(path or os.path.join(recall.SCRIPT_DIR, "mappings.json"), "rb") as f:
+        return zlib.crc32(f.read())
+
+def write_table(sequences, path, crc):
+    offsets = array("I", [MISSING]) * TABLE_ENTRIES
+    blob = bytearray()
+    for index, moves in sorted(sequences.items()):
+        if len(moves) > 255:
+            raise ValueError(f"Endfolge für Index {index} zu lang ({len(moves)} Züge)")
+        offsets[index] = len(blob)
+        blob.append(len(moves))
+        blob.extend(MOVE_CODES[move] for move in moves)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    with open(path + ".tmp", "wb") as f:
+        f.write(TABLE_HEADER.pack(b"SRLL", TABLE_VERSION, crc, TABLE_ENTRIES))
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(path + ".tmp", path)
+
+
+# ======================================================================
+# Nachschlagen
+# ======================================================================
+class LastLayerTable:
+    """
+    Per mmap geöffnete Tabelle; finish(cube_state) liefert die Endfolge für einen Zustand
+    mit gelöster Ebene 1–2.
+    """
+
+    def __init__(self, path, moves_mapping):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, crc, entries = TABLE_HEADER.unpack_from(self._map, 0)
+        if magic != b"SRLL" or version != TABLE_VERSION or entries != TABLE_ENTRIES:
+            raise ValueError(f"{path} ist keine Tabelle im Format {TABLE_VERSION}")
+        if crc != mappings_crc():
+            raise ValueError(f"{path} wurde mit einer anderen mappings.json erzeugt")
+        self._offsets = TABLE_HEADER.size
+        self._blob = TABLE_HEADER.size + 4 * entries
+        self.engine = get_move_engine(moves_mapping)
+
+    def lookup(self, cube_state):
+        """
+        Endfolge als Zugliste oder None (Ebene 1–2 nicht gelöst bzw. Zustand nicht in der Tabelle).
+        """
+        if recall.get_correct_mask(cube_state) & LOWER_MASK != LOWER_MASK:
+            return None
+        try:
+            index = layer_index(_read_layer(cube_state))
+        except (KeyError, ValueError):
+            return None
+        offset, = struct.unpack_from("<I", self._map, self._offsets + 4 * index)
+        if offset == MISSING:
+            return None
+        start = self._blob + offset
+        return [recall.allowed_moves_global[code] for code in self._map[start + 1:start + 1 + self._map[start]]]
+
+    def finish(self, cube_state):
+        """
+        (Endfolge als String, Endzustand) oder None.
+        """
+        moves = self.lookup(cube_state)
+        if moves is None:
+            return None
+        for move in moves:
+            cube_state = apply_permutation(cube_state, self.engine.move_permutation(move))
+        return " ".join(moves), cube_state
+
+    def stats(self):
+        lengths = []
+        for index in range(TABLE_ENTRIES):
+            offset, = struct.unpack_from("<I", self._map, self._offsets + 4 * index)
+            if offset != MISSING:
+                lengths.append(self._map[self._blob + offset])
+        return {"states": len(lengths), "max_moves": max(lengths, default=0),
+                "mean_moves": round(sum(lengths) / len(lengths), 2) if lengths else 0}
+
+_tables = {}
+
+def last_layer_from_params(params, moves_mapping):
+    """
+    LastLayerTable (einmal pro Prozess geöffnet) oder None, wenn LAST_LAYER_TABLE aus ist oder die
+    Datei fehlt bzw. nicht passt (dann mit einmaligem Hinweis).
+    """
+    if not params.get("LAST_LAYER_TABLE", 0):
+        return None
+    path = os.path.join(recall.SCRIPT_DIR, str(params.get("LAST_LAYER_FILE", DEFAULT_FILE)))
+    if path not in _tables:
+        try:
+            _tables[path] = LastLayerTable(path, moves_mapping)
+        except (OSError, ValueError) as e:
+            print("Tabelle der letzten Ebene nicht verfügbar (python LastLayerTable.py --build):", e)
+            _tables[path] = None
+    return _tables[path]
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Nachschlagetabelle für die letzte Ebene erzeugen oder prüfen.")
+    parser.add_argument("--build", action="store_true", help="Tabelle neu erzeugen")
+    parser.add_argument("--input", default="Improvements.csv", help="Bibliothek für die Erzeuger (Standard Improvements.csv)")
+    parser.add_argument("--output", default=DEFAULT_FILE, help=f"Tabellendatei (Standard {DEFAULT_FILE})")
+    parser.add_argument("--workers", type=int, help="Prozesse für die Suche (Standard: Anzahl CPUs)")
+    parser.add_argument("--verify", type=int, default=1000, help="so viele zufällige Einträge prüfen (Standard 1000)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    moves_mapping = recall.MoveEngine(recall.load_mappings("mappings.json"))
+    path = os.path.join(recall.SCRIPT_DIR, args.output)
+    learned_moves = recall.compile_learned_moves(
+        recall.load_learned_moves(os.path.join(recall.SCRIPT_DIR, args.input)), moves_mapping)
+    generators = layer_generators(moves_mapping, learned_moves)
+    if args.build:
+        print(f"Erzeuger: {len(generators)}")
+        start_time = time.time()
+        sequences = search_layer(generators, args.workers if args.workers is not None else os.cpu_count() or 1)
+        from MoveSimplifier import MoveSimplifier
+        simplifier = MoveSimplifier(moves_mapping)
+        sequences = {index: simplifier.to_moves(simplifier.simplify(moves)) for index, moves in sequences.items()}
+        print(f"Zustände: {len(sequences)} ({time.time() - start_time:.1f} s)")
+        write_table(sequences, path, mappings_crc())
+        print("Geschrieben:", path)
+    table = LastLayerTable(path, moves_mapping)
+    print("Tabelle:", table.stats())
+    # Stichprobe: zufällige Zustände der letzten Ebene müssen mit der Endfolge gelöst werden.
+    solved = recall.load_cube_from_csv()
+    engine = get_move_engine(moves_mapping)
+    rng = random.Random(0)
+    failures = 0
+    for _ in range(args.verify):
+        state = solved
+        for moves, _ in rng.choices(generators, k=20):
+            state = apply_permutation(state, moves_permutation(moves, engine))
+        finish = table.finish(state)
+        if finish is None or recall.mask_count(recall.get_correct_mask(finish[1])) != recall.TARGET_CORRECT:
+            failures += 1
+    print(f"Stichprobe: {args.verify - failures}/{args.verify} gelöst")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
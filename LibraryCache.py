@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+import SolutionRecall as recall
+from BatchEvaluation import np
+
+try:
+    import fcntl
+except ImportError:  # Windows: ohne Dateisperre (dort gibt es keine geforkten Worker)
+    fcntl = None
+
+# ======================================================================
+# Binärer Cache der gelernten Zugfolgen (Improvements.csv + mappings.json)
+#
+# Ein Verzeichnis mit .npy-Dateien (per np.load(mmap_mode="r") von allen
+# Pool-Workern gemeinsam über den Page-Cache nutzbar) und meta.json mit
+# Format-Version, Steinreihenfolge der Masken, Größe/mtime und SHA-256
+# beider Quelldateien. meta.json wird zuletzt geschrieben und markiert
+# einen vollständigen Cache.
+#
+# Prüfen, Neubauen und Laden laufen unter einer Dateisperre (.library_cache.lock),
+# damit gleichzeitig startende Worker den Cache nicht zugleich neu schreiben
+# oder ein halb ersetztes Verzeichnis lesen; temporäre Dateien tragen die PID.
+# Die Kandidatenliste behält die Arrays (CachedLibrary.arrays): BatchEvaluator
+# und BatchSolver arbeiten direkt auf den Memory-Maps. Die "Permutation" eines
+# Kandidaten ist eine memoryview-Zeile von permutations.npy (keine Kopie): alle
+# Worker teilen sich die Permutationen über den Page-Cache.
+# ======================================================================
+CACHE_FORMAT_VERSION = 1
+CACHE_DIR = os.path.join(recall.SCRIPT_DIR, ".library_cache")
+ARRAYS = ("permutations", "required_masks", "start_counts", "end_counts", "improvement_counts",
+          "move_counts", "values", "sequences", "starting_positions")
+
+
+def _source_info(path):
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+def _source_unchanged(path, recorded):
+    """
+    Schnellprüfung über Größe und mtime; erst bei Abweichung wird der Inhalt gehasht.
+    """
+    stat = os.stat(path)
+    if stat.st_size == recorded["size"] and stat.st_mtime_ns == recorded["mtime_ns"]:
+        return True
+    return _source_info(path)["sha256"] == recorded["sha256"]
+
+def _write_array(cache_dir, name, array):
+    final_path = os.path.join(cache_dir, name + ".npy")
+    temp_path = f"{final_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(temp_path, final_path)
+
+def build_library_cache(improvements_path, mappings_path, cache_dir=CACHE_DIR):
+    """
+    Liest Improvements.csv wie load_learned_moves, setzt die Zugfolgen mit der MoveEngine zusammen
+    und schreibt den Cache. Rückgabe False, wenn Zeilen nicht typisiert werden konnten (dann bleibt
+    es beim CSV-Pfad). Aufruf unter _cache_lock.
+    """
+    moves_mapping = recall.MoveEngine(recall.load_mappings(mappings_path))
+    learned_moves = recall.load_learned_moves(improvements_path)
+    if not learned_moves:
+        return False
+    for row in learned_moves:
+        if not all(isinstance(row[key], int) for key in ("Start Count", "End Count", "Improvement Count", "Move Count")) \
+                or not isinstance(row["Value"], float):
+            return False
+    recall.compile_learned_moves(learned_moves, moves_mapping)
+    arrays = {
+        "permutations": np.array([row["Permutation"] for row in learned_moves], dtype=np.uint8),
+        "required_masks": np.array([-1 if row["Required Mask"] is None else row["Required Mask"] for row in learned_moves], dtype=np.int64),
+        "start_counts": np.array([row["Start Count"] for row in learned_moves], dtype=np.int16),
+        "end_counts": np.array([row["End Count"] for row in learned_moves], dtype=np.int16),
+        "improvement_counts": np.array([row["Improvement Count"] for row in learned_moves], dtype=np.int16),
+        "move_counts": np.array([row["Move Count"] for row in learned_moves], dtype=np.int16),
+        "values": np.array([row["Value"] for row in learned_moves], dtype=np.float64),
+        "sequences": np.array([row["Move Sequence"].encode("ascii") for row in learned_moves]),
+        "starting_positions": np.array([(row.get("Starting Positions") or "").encode("ascii") for row in learned_moves]),
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name, array in arrays.items():
+        _write_array(cache_dir, name, array)
+    meta = {"version": CACHE_FORMAT_VERSION, "rows": len(learned_moves), "pieces": recall.PIECE_NAMES,
+            "improvements": _source_info(improvements_path), "mappings": _source_info(mappings_path)}
+    temp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(temp_path, meta_path)
+    return True
+
+@contextmanager
+def _cache_lock(cache_dir):
+    """
+    Exklusive Sperre über eine Datei neben dem Cache-Verzeichnis (ohne fcntl: keine Sperre).
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(cache_dir.rstrip(os.sep) + ".lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def cache_is_current(improvements_path, mappings_path, cache_dir=CACHE_DIR):
+    meta_path = os.path.join(cache_dir, "meta.json")
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        return (meta.get("version") == CACHE_FORMAT_VERSION
+                and meta.get("pieces") == recall.PIECE_NAMES
+                and _source_unchanged(improvements_path, meta["improvements"])
+                and _source_unchanged(mappings_path, meta["mappings"])
+                and all(os.path.exists(os.path.join(cache_dir, name + ".npy")) for name in ARRAYS))
+    except (OSError, ValueError, KeyError):
+        return False
+
+def load_library_arrays(cache_dir=CACHE_DIR, mmap=True):
+    """
+    Lädt die Cache-Arrays (standardmäßig als schreibgeschützte Memory-Maps).
+    """
+    mode = "r" if mmap else None
+    return {name: np.load(os.path.join(cache_dir, name + ".npy"), mmap_mode=mode) for name in ARRAYS}
+
+class CachedLibrary(list):
+    """
+    Kandidatenliste aus dem Cache; arrays hält die (gemappten) Cache-Arrays in derselben Reihenfolge.
+    """
+
+    def __init__(self, candidates, arrays):
+        super().__init__(candidates)
+        self.arrays = arrays
+
+def learned_moves_from_arrays(arrays):
+    """
+    Baut die Kandidatenliste (Schlüssel wie load_learned_moves + compile_learned_moves) aus den Arrays.
+    "Permutation" ist eine schreibgeschützte memoryview auf die Zeile in permutations (wie ein Tupel
+    iterier- und indizierbar; für Vergleiche und Mengen tuple(...) verwenden); die Arrays selbst bleiben
+    an der Liste (CachedLibrary.arrays) und werden nicht erneut aus den Einträgen gestapelt.
+    """
+    permutations = memoryview(arrays["permutations"]).cast("B")
+    width = arrays["permutations"].shape[1]
+    columns = zip(arrays["required_masks"].tolist(), arrays["start_counts"].tolist(), arrays["end_counts"].tolist(),
+                  arrays["improvement_counts"].tolist(), arrays["move_counts"].tolist(), arrays["values"].tolist(),
+                  arrays["sequences"].tolist(), arrays["starting_positions"].tolist())
+    learned_moves = []
+    sequence_ids = {}
+    for index, (required_mask, start, end, improvement, move_count, value, sequence, starting) in enumerate(columns):
+        sequence = sequence.decode("ascii")
+        learned_moves.append({
+            "Start Count": start,
+            "End Count": end,
+            "Improvement Count": improvement,
+            "Starting Positions": starting.decode("ascii"),
+            "Move Sequence": sequence,
+            "Move Count": move_count,
+            "Value": value,
+            "Required Mask": None if required_mask < 0 else required_mask,
+            "Permutation": permutations[index * width:(index + 1) * width],
+            "Index": index,
+            "Sequence ID": sequence_ids.setdefault(sequence, len(sequence_ids)),
+        })
+    return CachedLibrary(learned_moves, arrays)
+
+def load_learned_library(improvements_path, mappings_path, moves_mapping, cache_dir=CACHE_DIR):
+    """
+    Liefert die kompilierte Kandidatenliste – aus dem Cache, der bei geänderten Quelldateien
+    automatisch neu gebaut wird. Ohne NumPy oder bei nicht cachebaren Daten: CSV-Pfad.
+    """
+    if np is not None:
+        try:
+            with _cache_lock(cache_dir):
+                if cache_is_current(improvements_path, mappings_path, cache_dir) \
+                        or build_library_cache(improvements_path, mappings_path, cache_dir):
+                    arrays = load_library_arrays(cache_dir)
+                else:
+                    arrays = None
+            if arrays is not None:
+                return learned_moves_from_arrays(arrays)
+        except OSError as e:
+            print("Bibliotheks-Cache nicht nutzbar:", e)
+    learned_moves = recall.load_learned_moves(improvements_path)
+    return recall.compile_learned_moves(learned_moves, moves_mapping)
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import SolutionRecall as recall
+from MoveEngine import CUBE_SIZE, IDENTITY
+from TranspositionTable import state_key
+
+# ======================================================================
+# Offline-Miner für Improvements.csv (kürzere Zugfolgen, gleiche Wirkung)
+#
+# Grundlage ist eine Zugtabelle: beschränkte Breitensuche über die 12 Züge
+# aus mappings.json bis --depth Züge, je Permutation die kürzeste Zugfolge.
+#
+# 1. Verkürzen (Meet-in-the-Middle): Für jede Zeile wird eine kürzere Zugfolge
+#    mit identischer Permutation gesucht (A·B mit A, B aus der Tabelle, also
+#    bis 2·depth Züge). Sie wirkt in jedem Zustand gleich und ersetzt die
+#    Zugfolge an derselben Stelle.
+# 2. Minen: Von gemischten Würfeln aus wird der Weg der Bibliothek verfolgt
+#    (zufällige verbessernde Kandidaten); in jedem Zwischenzustand werden alle
+#    Tabelleneinträge angewendet. Eine Zugfolge, die alle korrekten Steine
+#    erhält und mindestens so viele Steine erreicht wie der kürzeste passende
+#    Kandidat der Bibliothek, aber mit weniger Zügen, wird als neue Zeile mit
+#    denselben "Starting Positions" direkt vor dem Kandidaten eingefügt, den
+#    die Suche in diesem Zustand zuerst gewählt hätte.
+# 3. Bereinigen: Zeilen mit unerfüllbarer Vorbedingung oder ohne Wirkung
+#    entfallen, ebenso Zeilen, vor denen eine Zeile mit gleicher Permutation,
+#    schwächerer (oder gleicher) Vorbedingung und höchstens gleich vielen Zügen
+#    steht – die Suche würde sie nie mit anderem Ergebnis anwenden.
+#
+# Jede neue oder verkürzte Zeile wird vor dem Schreiben über die MoveEngine
+# geprüft. Ausgabe im Schema von Improvements.csv (Standard:
+# Improvements.mined.csv; Improvements.csv wird nie implizit überschrieben).
+#
+# Aufruf:
+#   python LibraryMiner.py [--depth 4] [--scrambles 50] [--workers N] [--output Datei]
+# ======================================================================
+FIELDNAMES = ["Start Count", "End Count", "Improvement Count", "Starting Positions", "Move Sequence", "Move Count", "Value"]
+DEFAULT_OUTPUT = "Improvements.mined.csv"
+MINER_SEED = 20240202
+_PAD = bytes(256 - CUBE_SIZE)  # bytes.translate erwartet eine Tabelle mit 256 Einträgen
+
+
+# ======================================================================
+# Zugtabelle (Permutationen als bytes; Verkettung wie MoveEngine.compose:
+# zweite.translate(erste + _PAD) = zuerst erste, danach zweite)
+# ======================================================================
+def _inverse(perm):
+    inverse = bytearray(CUBE_SIZE)
+    for target, source in enumerate(perm):
+        inverse[source] = target
+    return bytes(inverse)
+
+def _fixed_mask(perm):
+    """
+    Steine (Bitmaske wie get_correct_mask), deren Sticker die Permutation alle an ihrem Platz lässt.
+    """
+    mask = 0
+    for bit, stickers in recall.PIECE_CHECKS:
+        if all(perm[index] == index for index, _ in stickers):
+            mask |= bit
+    return mask
+
+def build_move_table(move_engine, depth):
+    """
+    Breitensuche bis depth Züge. Rückgabe: dict Permutation -> kürzeste Zugfolge (Tupel von Zügen),
+    in Breitensuch-Reihenfolge (aufsteigende Länge, Züge in der Reihenfolge von allowed_moves_global).
+    """
+    moves = [(move, bytes(move_engine.move_permutation(move))) for move in recall.allowed_moves_global]
+    identity = bytes(IDENTITY)
+    table = {identity: ()}
+    frontier = [(identity, ())]
+    for _ in range(depth):
+        next_frontier = []
+        for perm, sequence in frontier:
+            padded = perm + _PAD
+            for move, move_perm in moves:
+                successor = move_perm.translate(padded)
+                if successor not in table:
+                    table[successor] = sequence + (move,)
+                    next_frontier.append((successor, table[successor]))
+        frontier = next_frontier
+    return table
+
+def shortest_equivalent(perm, max_moves, table, inverse_entries):
+    """
+    Kürzeste Zugfolge A·B (A, B aus der Tabelle) mit Permutation perm und weniger als max_moves Zügen,
+    sonst None. inverse_entries: [(inverse Permutation von B, B)] aufsteigend nach Länge.
+    """
+    best = table.get(perm)
+    if best is not None:
+        return best if len(best) < max_moves else None
+    padded = perm + _PAD
+    limit = max_moves
+    for inverse, second in inverse_entries:
+        if len(second) + 1 >= limit:
+            break  # A ist nicht leer (sonst hätte table.get(perm) getroffen)
+        first = table.get(inverse.translate(padded))
+        if first is not None and len(first) + len(second) < limit:
+            best = first + second
+            limit = len(best)
+    return best
+
+
+# ======================================================================
+# Worker (Tabelle und Bibliothek einmal pro Prozess)
+# ======================================================================
+_worker_context = {}
+
+def _init_worker(improvements_path, depth):
+    move_engine = recall.MoveEngine(recall.load_mappings("mappings.json"))
+    learned_moves = recall.compile_learned_moves(recall.load_learned_moves(improvements_path), move_engine)
+    table = build_move_table(move_engine, depth)
+    entries = [(perm, sequence, _fixed_mask(perm)) for perm, sequence in table.items() if sequence]
+    _worker_context.update(
+        move_engine=move_engine, learned_moves=learned_moves, table=table, entries=entries,
+        inverse_entries=[(_inverse(perm), sequence) for perm, sequence, _ in entries],
+        precondition_index=recall.get_precondition_index(learned_moves),
+    )
+
+def _shorten_chunk(indices):
+    """
+    Rückgabe: [(Zeilenindex, kürzere Zugfolge)] für die Zeilen, die sich verkürzen lassen.
+    """
+    context = _worker_context
+    shortened = []
+    for index in indices:
+        candidate = context["learned_moves"][index]
+        moves = candidate["Move Sequence"].split()
+        sequence = shortest_equivalent(bytes(candidate["Permutation"]), len(moves), context["table"], context["inverse_entries"])
+        if sequence is not None:
+            shortened.append((index, sequence))
+    return shortened
+
+def _library_outcomes(state, correct_mask, context):
+    """
+    Anwendbare Kandidaten, die den Zustand verbessern: [(Index, korrekte Steine danach, Züge)] in Dateireihenfolge.
+    """
+    learned_moves = context["learned_moves"]
+    current_count = recall.mask_count(correct_mask)
+    outcomes = []
+    for index in recall.applicable_candidates(context["precondition_index"], correct_mask):
+        candidate = learned_moves[index]
+        count = recall.mask_count(recall.get_correct_mask(recall.apply_permutation(state, candidate["Permutation"])))
+        if count > current_count:
+            outcomes.append((index, count, len(candidate["Move Sequence"].split())))
+    return outcomes
+
+def _mine_state(state, correct_mask, outcomes, context):
+    """
+    Tabelleneinträge, die in state alle korrekten Steine erhalten und kürzer sind als jeder Kandidat
+    der Bibliothek, der mindestens gleich viele Steine erreicht. Rückgabe: [(korrekte Steine danach, Zugfolge)].
+    """
+    current_count = recall.mask_count(correct_mask)
+    padded_state = "".join(state).encode("ascii") + _PAD
+    shortest = {}
+    for perm, sequence, fixed_mask in context["entries"]:
+        if correct_mask & ~fixed_mask:
+            continue
+        count = recall.mask_count(recall.get_correct_mask(perm.translate(padded_state).decode("ascii")))
+        if count > current_count and count not in shortest:
+            shortest[count] = sequence
+    found = []
+    best_length = None  # kürzeste bereits übernommene Zugfolge mit mehr korrekten Steinen
+    for count in sorted(shortest, reverse=True):
+        sequence = shortest[count]
+        library_moves = min((moves for _, end_count, moves in outcomes if end_count >= count), default=None)
+        if library_moves is not None and len(sequence) >= library_moves:
+            continue
+        if best_length is not None and len(sequence) >= best_length:
+            continue
+        found.append((count, sequence))
+        best_length = len(sequence)
+    return found
+
+def _mine_scramble(seed, shuffle_moves):
+    """
+    Verfolgt von einer Mischung aus einen zufälligen Weg der Bibliothek und mint jeden Zwischenzustand.
+    Rückgabe: [(Anker-Index oder None, Zustand, Start-Maske, korrekte Steine danach, Zugfolge)].
+    """
+    context = _worker_context
+    rng = random.Random(seed)
+    state = recall.load_cube_from_csv()
+    state = recall.apply_sequence(state, [rng.choice(recall.allowed_moves_global) for _ in range(shuffle_moves)],
+                                  context["move_engine"])
+    rows = []
+    seen = set()
+    while state_key(state) not in seen:
+        seen.add(state_key(state))
+        correct_mask = recall.get_correct_mask(state)
+        if recall.mask_count(correct_mask) == recall.TARGET_CORRECT:
+            break
+        outcomes = _library_outcomes(state, correct_mask, context)
+        anchor = outcomes[0][0] if outcomes else None
+        for count, sequence in _mine_state(state, correct_mask, outcomes, context):
+            rows.append((anchor, state, correct_mask, count, sequence))
+        if not outcomes:
+            break
+        index = rng.choice(outcomes)[0]
+        state = recall.apply_permutation(state, context["learned_moves"][index]["Permutation"])
+    return rows
+
+
+# ======================================================================
+# Zusammenführen, Prüfen und Schreiben
+# ======================================================================
+def _row(start_count, end_count, starting_positions, sequence):
+    improvement = end_count - start_count
+    return {
+        "Start Count": start_count, "End Count": end_count, "Improvement Count": improvement,
+        "Starting Positions": starting_positions, "Move Sequence": " ".join(sequence),
+        "Move Count": len(sequence), "Value": improvement / len(sequence),
+    }
+
+def _mask_to_positions(mask):
+    return "-".join(sorted(name for name, bit in recall.PIECE_BITS.items() if mask & bit))
+
+def prune_rows(rows, move_engine):
+    """
+    Entfernt Zeilen mit unerfüllbarer Vorbedingung, ohne Wirkung oder dominiert durch eine frühere Zeile
+    (gleiche Permutation, Vorbedingung Teilmenge, höchstens gleich viele Züge). Rückgabe: (Zeilen, Anzahl entfernt).
+    """
+    kept = []
+    by_permutation = {}
+    for row in rows:
+        required_mask = recall.parse_starting_positions(row.get("Starting Positions"))
+        perm = move_engine.sequence_permutation(row["Move Sequence"])
+        if required_mask is None or perm == IDENTITY:
+            continue
+        move_count = len(row["Move Sequence"].split())
+        earlier = by_permutation.setdefault(perm, [])
+        if any(not (other_mask & ~required_mask) and other_moves <= move_count for other_mask, other_moves in earlier):
+            continue
+        earlier.append((required_mask, move_count))
+        kept.append(row)
+    return kept, len(rows) - len(kept)
+
+def write_library(rows, path):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile, delimiter=';')
+        writer.writerow(FIELDNAMES)
+        for row in rows:
+            value = row["Value"]
+            writer.writerow([row["Start Count"], row["End Count"], row["Improvement Count"], row["Starting Positions"],
+                             row["Move Sequence"], row["Move Count"], f"{value:.2f}" if isinstance(value, float) else value])
+    os.replace(temp_path, path)
+
+def _run_tasks(function, tasks, workers, initargs):
+    if workers <= 1:
+        if not _worker_context:
+            _init_worker(*initargs)
+        return [function(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        return list(executor.map(function, *zip(*tasks)))
+
+def mine_library(improvements_path, depth, scrambles, shuffle_moves, workers, seed=MINER_SEED):
+    """
+    Führt Verkürzen, Minen und Bereinigen aus. Rückgabe: (neue Zeilen, Statistik).
+    """
+    move_engine = recall.MoveEngine(recall.load_mappings("mappings.json"))
+    learned_moves = recall.compile_learned_moves(recall.load_learned_moves(improvements_path), move_engine)
+    initargs = (improvements_path, depth)
+    stats = {"rows_in": len(learned_moves), "moves_in": sum(len(c["Move Sequence"].split()) for c in learned_moves)}
+
+    # 1. Verkürzen
+    chunk = max(1, len(learned_moves) // (max(1, workers) * 8))
+    chunks = [(list(range(start, min(start + chunk, len(learned_moves)))),) for start in range(0, len(learned_moves), chunk)]
+    rows = [{key: candidate[key] for key in FIELDNAMES} for candidate in learned_moves]
+    shortened = 0
+    for results in _run_tasks(_shorten_chunk, chunks, workers, initargs):
+        for index, sequence in results:
+            if move_engine.sequence_permutation(sequence) != learned_moves[index]["Permutation"]:
+                raise RuntimeError(f"Verkürzte Zugfolge für Zeile {index + 2} hat eine andere Wirkung")
+            row = rows[index]
+            row["Move Sequence"] = " ".join(sequence)
+            row["Move Count"] = len(sequence)
+            if isinstance(row["Improvement Count"], int):
+                row["Value"] = row["Improvement Count"] / len(sequence)
+            shortened += 1
+    stats["shortened"] = shortened
+
+    # 2. Minen
+    tasks = [(recall.derive_run_seed(seed, number), shuffle_moves) for number in range(1, scrambles + 1)]
+    inserted = {}
+    seen = set()
+    mined = 0
+    for results in _run_tasks(_mine_scramble, tasks, workers, initargs):
+        for anchor, state, correct_mask, count, sequence in results:
+            starting_positions = _mask_to_positions(correct_mask)
+            key = (starting_positions, sequence)
+            if key in seen:
+                continue
+            seen.add(key)
+            after = recall.get_correct_mask(recall.apply_sequence(state, list(sequence), move_engine))
+            if correct_mask & ~after or recall.mask_count(after) != count:
+                raise RuntimeError(f"Gemintes Ergebnis nicht reproduzierbar: {' '.join(sequence)}")
+            inserted.setdefault(anchor, []).append(_row(recall.mask_count(correct_mask), count, starting_positions, sequence))
+            mined += 1
+    stats["mined"] = mined
+    merged = []
+    for index, row in enumerate(rows):
+        merged.extend(sorted(inserted.get(index, []), key=lambda r: (-r["End Count"], r["Move Count"])))
+        merged.append(row)
+    merged.extend(sorted(inserted.get(None, []), key=lambda r: (r["Start Count"], -r["End Count"], r["Move Count"])))
+
+    # 3. Bereinigen
+    result, stats["pruned"] = prune_rows(merged, move_engine)
+    stats["rows_out"] = len(result)
+    stats["moves_out"] = sum(len(row["Move Sequence"].split()) for row in result)
+    return result, stats
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Verkürzt und ergänzt Improvements.csv über eine beschränkte Breitensuche.")
+    parser.add_argument("--input", default="Improvements.csv", help="Eingabebibliothek (Standard Improvements.csv)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Ausgabedatei (Standard {DEFAULT_OUTPUT})")
+    parser.add_argument("--depth", type=int, default=4, help="Tiefe der Zugtabelle (Verkürzen bis 2·depth Züge)")
+    parser.add_argument("--scrambles", type=int, default=50, help="Anzahl gemischter Würfel für das Minen (0 = nur verkürzen)")
+    parser.add_argument("--shuffle", type=int, help="Mischzüge je Würfel (Standard NO_MOVES_TO_SHUFFLE)")
+    parser.add_argument("--workers", type=int, help="Anzahl Prozesse (Standard: CPU-Anzahl)")
+    parser.add_argument("--seed", type=int, default=MINER_SEED, help="Seed der Mischungen")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    params = recall.load_parameters_from_csv()
+    workers = args.workers if args.workers is not None else os.cpu_count() or 1
+    shuffle_moves = args.shuffle if args.shuffle is not None else params.get("NO_MOVES_TO_SHUFFLE", 20)
+    improvements_path = os.path.join(recall.SCRIPT_DIR, args.input)
+    output_path = os.path.join(recall.SCRIPT_DIR, args.output)
+
+    start = time.time()
+    rows, stats = mine_library(improvements_path, args.depth, args.scrambles, shuffle_moves, workers, args.seed)
+    write_library(rows, output_path)
+    print(f"Zeilen: {stats['rows_in']} -> {stats['rows_out']} (verkürzt {stats['shortened']}, neu {stats['mined']}, "
+          f"entfernt {stats['pruned']})")
+    print(f"Züge gesamt: {stats['moves_in']} -> {stats['moves_out']}, "
+          f"Mittel {stats['moves_in'] / max(1, stats['rows_in']):.2f} -> {stats['moves_out'] / max(1, stats['rows_out']):.2f}")
+    print(f"Geschrieben: {output_path} ({time.time() - start:.1f}s, {workers} Prozesse)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import json
+import os
+
+# Globales Skriptverzeichnis
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CUBE_SIZE = 54  # Anzahl der Sticker (Positionen 1-54)
+IDENTITY = tuple(range(CUBE_SIZE))
+SEQUENCE_CACHE_SIZE = 65536  # zusammengesetzte Zugfolgen im Cache (LRU), deutlich mehr als die Bibliothek
+
+
+# ======================================================================
+# Kompilieren der Moves aus mappings.json zu Index-Permutationen
+# ======================================================================
+def compile_move(move_mapping):
+    """
+    Wandelt das Mapping eines Zuges ({"Quelle": Ziel}, 1-basiert) in eine flache
+    Gather-Permutation mit 54 Einträgen (0-basiert) um:
+        neuer_zustand[i] = alter_zustand[perm[i]]
+    Nicht erwähnte Positionen bleiben unverändert.
+    """
+    perm = list(IDENTITY)
+    for src_str, tgt in move_mapping.items():
+        perm[int(tgt) - 1] = int(src_str) - 1
+    return tuple(perm)
+
+def compose(first, second):
+    """
+    Verkettet zwei Permutationen: zuerst first, danach second.
+    """
+    return tuple(first[i] for i in second)
+
+def apply_permutation(cube_state, perm):
+    """
+    Wendet eine kompilierte Permutation an (ein einziger Gather).
+    """
+    return [cube_state[i] for i in perm]
+
+
+class MoveEngine:
+    """
+    Hält die 12 Moves aus mappings.json als vorkompilierte Permutationen und
+    setzt Zugfolgen einmalig zu einer einzigen Permutation zusammen (LRU-Cache mit
+    SEQUENCE_CACHE_SIZE Einträgen; einmalige Folgen wie Mischzüge mit cache=False).
+    """
+
+    def __init__(self, moves_mapping):
+        self.moves_mapping = moves_mapping
+        self.move_perms = {move: compile_move(mapping) for move, mapping in moves_mapping.items()}
+        self._sequence_cache = {}
+
+    def move_permutation(self, move):
+        """
+        Permutation eines einzelnen Zuges; unbekannte Züge wirken (wie bisher) als Identität.
+        """
+        return self.move_perms.get(move, IDENTITY)
+
+    def sequence_permutation(self, sequence, cache=True):
+        """
+        Zusammengesetzte Permutation einer Zugfolge (Liste von Zügen oder String "R U Rb").
+        """
+        key = sequence if isinstance(sequence, str) else " ".join(sequence)
+        perm = self._sequence_cache.pop(key, None)
+        if perm is None:
+            perm = IDENTITY
+            for move in key.split():
+                perm = compose(perm, self.move_permutation(move))
+            if not cache:
+                return perm
+            if len(self._sequence_cache) >= SEQUENCE_CACHE_SIZE:
+                del self._sequence_cache[next(iter(self._sequence_cache))]
+        self._sequence_cache[key] = perm  # zuletzt benutzt: ans Ende
+        return perm
+
+    def apply_move(self, cube_state, move):
+        return apply_permutation(cube_state, self.move_permutation(move))
+
+    def apply_sequence(self, cube_state, sequence, cache=True):
+        return apply_permutation(cube_state, self.sequence_permutation(sequence, cache))
+
+
+_engines = {}
+
+def get_move_engine(moves_mapping):
+    """
+    Liefert die MoveEngine zu einem Mapping-Dictionary (wird pro Mapping nur einmal kompiliert).
+    Eine bereits erzeugte MoveEngine wird unverändert zurückgegeben.
+    """
+    if isinstance(moves_mapping, MoveEngine):
+        return moves_mapping
+    entry = _engines.get(id(moves_mapping))
+    if entry is None or entry.moves_mapping is not moves_mapping:
+        entry = MoveEngine(moves_mapping)
+        _engines[id(moves_mapping)] = entry
+    return entry
+
+def load_move_engine(filename="mappings.json"):
+    """
+    Liest mappings.json und kompiliert daraus eine MoveEngine.
+    """
+    filepath = os.path.join(SCRIPT_DIR, filename)
+    with open(filepath, "r", encoding="utf-8") as f:
+        return MoveEngine(json.load(f))
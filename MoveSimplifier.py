@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import csv
+import os
+
+import SolutionRecall as recall
+from MoveEngine import IDENTITY, compose, get_move_engine
+
+# ======================================================================
+# Vereinfachung von Zugfolgen und HTM/QTM-Auswertung der Lösungen
+#
+# Eine Lösung ist die Verkettung gelernter Zugfolgen und enthält an den
+# Nahtstellen oft "R Rb", "U U U" oder Züge, die sich über einen Zug auf
+# der Gegenseite hinweg aufheben ("U D Ub"). MoveSimplifier fasst Züge
+# derselben Seite zu einer Drehung (Viertel 1-3) zusammen – auch über einen
+# dazwischenliegenden vertauschbaren Zug – in einem Durchlauf mit Stapel.
+# Welche Züge zu einer Seite gehören ("X" / "Xb") und welche Seiten
+# vertauschbar sind, wird aus den Permutationen der MoveEngine bestimmt.
+#
+# Zählweise: HTM = Anzahl Drehungen (Halbdrehung = 1), QTM = Vierteldrehungen.
+# Ausgabe weiterhin mit den Zügen aus allowed_moves_global (Halbdrehung "U U").
+#
+# SolutionAnalytics sitzt vor dem ResultsSink (SIMPLIFY_SOLUTIONS = 1):
+# vereinfacht jede Lösung, prüft sie über die MoveEngine (gleiche
+# Permutation, sonst bleibt die Originalfolge) und schreibt fortlaufend
+#   Results.htm.csv   je Lösung: RunID, RunDateTime, HTM, QTM, Züge vorher
+#   Results.runs.csv  je Run: Anzahl Lösungen, min/Mittel/max HTM und QTM,
+#                     entfernte Züge
+# Lösungen, die erst nach der Vereinfachung gleich sind, zählen im Run nur
+# einmal (solution_key_function in SolutionRecall, vor dem Zählen).
+# Standard ist SIMPLIFY_SOLUTIONS = 0: Results.csv enthält die Originalfolgen.
+# ======================================================================
+ANALYSIS_HEADER = ["RunID", "RunDateTime", "Moves HTM Count", "Moves QTM Count", "Raw Moves"]
+SUMMARY_HEADER = ["RunID", "RunDateTime", "Solutions", "Min HTM", "Mean HTM", "Max HTM", "Min QTM", "Mean QTM", "Max QTM",
+                  "Moves Removed"]
+
+
+class MoveSimplifier:
+    """
+    Kürzt Zugfolgen (Liste oder String) in linearer Zeit; Ergebnis als Liste von (Seite, Viertel).
+    """
+
+    def __init__(self, moves_mapping, moves=recall.allowed_moves_global):
+        engine = get_move_engine(moves_mapping)
+        self.turns = {}
+        self.names = {}
+        for move in moves:
+            face = move[:-1] if move.endswith("b") else move
+            quarters = 3 if move.endswith("b") else 1
+            self.turns[move] = (face, quarters)
+            self.names[(face, quarters)] = move
+        for face in {face for face, _ in self.turns.values()}:
+            quarter = engine.move_permutation(self.names[(face, 1)])
+            inverse = compose(compose(quarter, quarter), quarter)
+            if (face, 3) in self.names and engine.move_permutation(self.names[(face, 3)]) != inverse:
+                raise ValueError(f"{self.names[(face, 3)]} ist nicht die Gegendrehung von {face}")
+        faces = sorted({face for face, _ in self.turns.values()})
+        face_perms = {face: engine.move_permutation(self.names[(face, 1)]) for face in faces}
+        self.commuting = {(a, b) for a in faces for b in faces
+                          if a != b and compose(face_perms[a], face_perms[b]) == compose(face_perms[b], face_perms[a])}
+        self.engine = engine
+
+    def simplify(self, moves):
+        """
+        Stapel ohne zwei benachbarte Drehungen derselben Seite und ohne "X Y X" mit vertauschbarem Y.
+        Jeder Zug wird mit der obersten Drehung oder – bei vertauschbarer oberster Drehung – mit der
+        darunter zusammengefasst; heben sie sich auf, fällt die Drehung weg.
+        """
+        stack = []
+        for move in moves.split() if isinstance(moves, str) else moves:
+            face, quarters = self.turns[move]
+            if stack and stack[-1][0] == face:
+                position = len(stack) - 1
+            elif len(stack) > 1 and stack[-2][0] == face and (stack[-1][0], face) in self.commuting:
+                position = len(stack) - 2
+            else:
+                stack.append((face, quarters))
+                continue
+            quarters = (stack[position][1] + quarters) % 4
+            if quarters:
+                stack[position] = (face, quarters)
+            else:
+                del stack[position]
+        return stack
+
+    def to_moves(self, turns):
+        moves = []
+        for face, quarters in turns:
+            if quarters == 2:
+                moves.extend((self.names[(face, 1)],) * 2)
+            else:
+                moves.append(self.names[(face, quarters)])
+        return moves
+
+    @staticmethod
+    def htm(turns):
+        return len(turns)
+
+    @staticmethod
+    def qtm(turns):
+        return sum(2 if quarters == 2 else 1 for _, quarters in turns)
+
+    def permutation(self, moves):
+        """
+        Permutation einer Zugliste (ohne den Zugfolgen-Cache der MoveEngine, da jede Lösung einmalig ist).
+        """
+        perm = IDENTITY
+        for move in moves:
+            perm = compose(perm, self.engine.move_permutation(move))
+        return perm
+
+    def simplify_sequence(self, sequence):
+        """
+        Vereinfachte Zugfolge als String (gleiche Schreibweise wie die Eingabe).
+        """
+        return " ".join(self.to_moves(self.simplify(sequence)))
+
+
+class SolutionAnalytics:
+    """
+    Vorstufe des ResultsSink: write(row) vereinfacht die Zugfolge (Spalte 5) und die Zugzahl (Spalte 6),
+    schreibt die Auswertung und reicht die Zeile an sink.write weiter.
+    Zeilen eines Runs kommen zusammenhängend an (seriell, parallel und im Gleichschritt in RunID-Reihenfolge);
+    die Run-Zusammenfassung wird beim Wechsel der RunID bzw. bei close() geschrieben.
+    """
+
+    def __init__(self, sink, moves_mapping, analysis_filename="Results.htm.csv", summary_filename="Results.runs.csv"):
+        self.sink = sink
+        self.simplifier = MoveSimplifier(moves_mapping)
+        self.verification_failures = 0
+        self._analysis_file, self._analysis = self._open(analysis_filename, ANALYSIS_HEADER)
+        self._summary_file, self._summary = self._open(summary_filename, SUMMARY_HEADER)
+        self._run = None
+
+    @staticmethod
+    def _open(filename, header):
+        filepath = os.path.join(recall.SCRIPT_DIR, filename)
+        write_header = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
+        f = open(filepath, "a", newline="", encoding="utf-8")
+        writer = csv.writer(f, delimiter=';')
+        if write_header:
+            writer.writerow(header)
+        return f, writer
+
+    def write(self, row):
+        raw_moves = row[5].split()
+        turns = self.simplifier.simplify(raw_moves)
+        moves = self.simplifier.to_moves(turns)
+        if self.simplifier.permutation(moves) != self.simplifier.permutation(raw_moves):
+            self.verification_failures += 1
+            print(f"Run {row[0]}: vereinfachte Lösung weicht ab, Originalfolge bleibt erhalten")
+            moves = raw_moves
+            turns = [self.simplifier.turns[move] for move in raw_moves]
+        htm = self.simplifier.htm(turns)
+        qtm = self.simplifier.qtm(turns)
+        if self._run is not None and self._run["id"] != row[0]:
+            self._write_summary()
+        if self._run is None:
+            self._run = {"id": row[0], "datetime": row[1], "htm": [], "qtm": [], "removed": 0}
+        self._run["htm"].append(htm)
+        self._run["qtm"].append(qtm)
+        self._run["removed"] += len(raw_moves) - len(moves)
+        self._analysis.writerow([row[0], row[1], htm, qtm, len(raw_moves)])
+        self.sink.write(row[:5] + [" ".join(moves), len(moves)] + row[7:])
+
+    def _write_summary(self):
+        run = self._run
+        self._summary.writerow([run["id"], run["datetime"], len(run["htm"]),
+                                min(run["htm"]), f"{sum(run['htm']) / len(run['htm']):.2f}", max(run["htm"]),
+                                min(run["qtm"]), f"{sum(run['qtm']) / len(run['qtm']):.2f}", max(run["qtm"]),
+                                run["removed"]])
+        self._run = None
+
+    def flush(self):
+        self._analysis_file.flush()
+        self._summary_file.flush()
+        self.sink.flush()
+
+    def close(self):
+        if self._run is not None:
+            self._write_summary()
+        self._analysis_file.close()
+        self._summary_file.close()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import SolutionRecall as recall
+
+
+# ======================================================================
+# Parallele Runs über einen Prozess-Pool
+# Jeder Worker lädt Mappings und gelernte Zugfolgen einmal beim Start;
+# die Runs erhalten ihren Seed über derive_run_seed, die Ergebnisse
+# werden vom Hauptprozess in RunID-Reihenfolge geschrieben.
+# ======================================================================
+_worker_context = {}
+
+def _init_worker(params, original_state):
+    moves_mapping = recall.MoveEngine(recall.load_mappings("mappings.json"))
+    learned_moves = recall.load_learned_library(params, os.path.join(recall.SCRIPT_DIR, "Improvements.csv"), moves_mapping)
+    # Adaptive Reihenfolge: Workers nutzen die gespeicherten Statistiken nur lesend (FrozenOrdering),
+    # jeder Run hängt damit nur von seinem Seed und der Statistikdatei ab.
+    from AdaptiveOrdering import ordering_from_params
+    _worker_context.update(params=params, original_state=original_state,
+                           moves_mapping=moves_mapping, learned_moves=learned_moves,
+                           ordering=ordering_from_params(params, learned_moves, frozen=True))
+
+def _run_worker(run_number, run_seed):
+    context = _worker_context
+    rows = recall.execute_run(run_number, run_seed, context["params"], context["original_state"],
+                              context["moves_mapping"], context["learned_moves"], ordering=context["ordering"])
+    return run_number, rows
+
+def run_parallel(params, original_state, master_seed, run_numbers, workers, write_row):
+    """
+    Verteilt die Runs auf einen Pool mit workers Prozessen. Fertige Runs werden gepuffert,
+    bis alle vorherigen RunIDs geschrieben sind; write_row erhält die Zeilen daher in
+    derselben Reihenfolge wie bei einem seriellen Lauf mit denselben Seeds.
+    """
+    pending = {}
+    next_position = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(params, original_state)) as executor:
+        futures = [executor.submit(_run_worker, run_number, recall.derive_run_seed(master_seed, run_number))
+                   for run_number in run_numbers]
+        for future in as_completed(futures):
+            run_number, rows = future.result()
+            pending[run_number] = rows
+            while next_position < len(run_numbers) and run_numbers[next_position] in pending:
+                for row in pending.pop(run_numbers[next_position]):
+                    write_row(row)
+                next_position += 1
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+import multiprocessing
+import os
+import queue
+import sys
+
+import SolutionRecall as recall
+from CombinationTrie import CombinationTrie
+from TranspositionTable import TranspositionTable
+
+# ======================================================================
+# Parallele Suche innerhalb eines Runs (INTRA_RUN_WORKERS > 1)
+#
+# Jede Kombination beginnt mit genau einer Zugfolge, die den Startzustand
+# verbessert; die Teilbäume dieser Wurzeln sind unabhängig. Die Worker
+# holen sich die Wurzeln nacheinander über einen gemeinsamen Zähler (in
+# Dateireihenfolge wie die serielle Suche) und durchsuchen jede Wurzel mit
+# optimize_cube und einem eigenen CombinationTrie, in dem alle anderen
+# Wurzeln als erschöpft markiert sind. Erschöpfte Kombinationen liegen so in
+# getrennten Teilbäumen und bleiben beim Worker (mit HISTORY_MAX_NODES
+# können die Sperren verdrängt werden – das kostet nur doppelte Arbeit).
+#
+# Der Koordinator im Hauptprozess
+#   - nimmt Lösungen entgegen, verwirft Duplikate wie _search_run und stoppt
+#     alle Worker nach SOLUTIONS_PER_RUN verschiedenen Lösungen,
+#   - verteilt neue Sackgassen-Zustände (TRANSPOSITION_TABLE_SIZE > 0) an die
+#     übrigen Worker, die sie in ihre Transpositionstabelle übernehmen.
+# MAX_ITERATIONS E3 gilt für alle Worker zusammen (gemeinsamer Zähler).
+# Welche Lösungen zuerst gefunden werden, hängt vom zeitlichen Ablauf ab.
+# Nicht kombinierbar mit SEARCH_MODE "beam", Checkpoints und ADAPTIVE_ORDERING
+# (main weist darauf hin). LAST_LAYER_TABLE gilt in jedem Worker (optimize_cube).
+# ======================================================================
+SYNC_EVERY = 32  # Iterationen eines Workers zwischen zwei Abgleichen mit Zähler, Stoppsignal und Sackgassen
+
+
+class _SharedDeadEnds(TranspositionTable):
+    """
+    Transpositionstabelle eines Workers: sammelt neue Sackgassen für den Koordinator und
+    übernimmt die der anderen Worker.
+    """
+
+    def __init__(self, max_entries, key_function):
+        super().__init__(max_entries, key_function)
+        self.outbox = []
+
+    def mark_dead(self, cube_state):
+        key = self.key_function(cube_state)
+        self._store(key, self.DEAD)
+        self.outbox.append(key)
+
+    def add_dead_keys(self, keys):
+        for key in keys:
+            self._store(key, self.DEAD)
+
+
+def root_sequence_ids(starting_state, learned_moves):
+    """
+    Sequenz-IDs der Zugfolgen, die den Startzustand verbessern (in Dateireihenfolge, ohne Duplikate).
+    """
+    correct_mask = recall.get_correct_mask(starting_state)
+    current_count = recall.mask_count(correct_mask)
+    roots = []
+    seen = set()
+    for index in recall.applicable_candidates(recall.get_precondition_index(learned_moves), correct_mask):
+        candidate = learned_moves[index]
+        if candidate["Sequence ID"] in seen:
+            continue
+        candidate_state = recall.apply_permutation(starting_state, candidate["Permutation"])
+        if recall.mask_count(recall.get_correct_mask(candidate_state)) > current_count:
+            seen.add(candidate["Sequence ID"])
+            roots.append(candidate["Sequence ID"])
+    return roots
+
+
+# ======================================================================
+# Worker-Prozess
+# ======================================================================
+def _worker_main(worker_id, params, tasks, inbox, results, shared):
+    sys.stdout = open(os.devnull, "w")  # Fortschrittsausgaben von optimize_cube nur im seriellen Modus
+    moves_mapping = recall.MoveEngine(recall.load_mappings("mappings.json"))
+    learned_moves = recall.load_learned_library(params, os.path.join(recall.SCRIPT_DIR, "Improvements.csv"), moves_mapping)
+    from Symmetry import key_function_from_params
+    key_function = key_function_from_params(params, moves_mapping, learned_moves)
+    for run_number, starting_state, roots in iter(tasks.get, None):
+        _search_roots(worker_id, params, moves_mapping, learned_moves, key_function, run_number, starting_state, roots,
+                      inbox, results, shared)
+        results.put(("idle", worker_id, run_number))
+
+def _search_roots(worker_id, params, moves_mapping, learned_moves, key_function, run_number, starting_state, roots,
+                  inbox, results, shared):
+    stop, iterations, next_root = shared
+    max_iterations = params["MAX_ITERATIONS E3"]
+    table_size = params.get("TRANSPOSITION_TABLE_SIZE", 0)
+    transpositions = _SharedDeadEnds(table_size, key_function) if table_size else None
+    pending = 0
+
+    def sync():
+        """
+        Meldet die eigenen Iterationen, tauscht Sackgassen aus; Rückgabe: Iterationen aller Worker.
+        """
+        nonlocal pending
+        with iterations.get_lock():
+            iterations.value += pending
+            total = iterations.value
+        pending = 0
+        if total >= max_iterations:
+            stop.set()
+        if transpositions is not None:
+            if transpositions.outbox:
+                results.put(("dead", worker_id, run_number, transpositions.outbox))
+                transpositions.outbox = []
+            while True:
+                try:
+                    message_run, keys = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if message_run == run_number:
+                    transpositions.add_dead_keys(keys)
+        return total
+
+    def should_stop():
+        nonlocal pending
+        pending += 1
+        if pending >= SYNC_EVERY:
+            sync()
+        return stop.is_set()
+
+    while not stop.is_set():
+        with next_root.get_lock():
+            position = next_root.value
+            next_root.value += 1
+        if position >= len(roots):
+            break
+        combination_history = CombinationTrie(params.get("HISTORY_MAX_NODES", 0))
+        for sequence_id in roots:
+            if sequence_id != roots[position]:
+                combination_history.mark_exhausted([sequence_id])
+        while not stop.is_set():
+            _, combination, solved, _ = recall.optimize_cube(params, starting_state, moves_mapping, learned_moves,
+                                                             combination_history, transpositions,
+                                                             should_stop=should_stop)
+            if not solved:
+                break  # Wurzel erschöpft (oder Stopp)
+            results.put(("solution", worker_id, run_number, combination, sync()))
+    sync()
+
+
+# ======================================================================
+# Koordinator
+# ======================================================================
+class SubtreePool:
+    """
+    Hält workers Prozesse für die Dauer von main; search() verteilt einen Run auf sie.
+    """
+
+    def __init__(self, params, workers):
+        context = multiprocessing.get_context()
+        self.results = context.Queue()
+        self.shared = (context.Event(), context.Value("q", 0), context.Value("q", 0))
+        self.tasks = [context.Queue() for _ in range(workers)]
+        self.inboxes = [context.Queue() for _ in range(workers)]
+        self.processes = [context.Process(target=_worker_main, name=f"SubtreeWorker-{worker_id}", daemon=True,
+                                          args=(worker_id, params, self.tasks[worker_id], self.inboxes[worker_id],
+                                                self.results, self.shared))
+                          for worker_id in range(workers)]
+        for process in self.processes:
+            process.start()
+
+    def search(self, run_number, starting_state, learned_moves, record_solution, enough_solutions):
+        """
+        Durchsucht einen Run. record_solution(combination, iterations) wie in _search_run;
+        enough_solutions() True -> alle Worker anhalten. Rückgabe: Iterationen aller Worker.
+        """
+        stop, iterations, next_root = self.shared
+        roots = root_sequence_ids(starting_state, learned_moves)
+        print(f"Run {run_number}: {len(roots)} Teilbäume auf {len(self.processes)} Prozesse verteilt")
+        stop.clear()
+        iterations.value = 0
+        next_root.value = 0
+        for tasks in self.tasks:
+            tasks.put((run_number, starting_state, roots))
+        idle = 0
+        while idle < len(self.processes):
+            try:
+                kind, worker_id, message_run, *payload = self.results.get(timeout=1.0)
+            except queue.Empty:
+                if not all(process.is_alive() for process in self.processes):
+                    raise RuntimeError("Ein Worker der parallelen Teilbaumsuche wurde beendet")
+                continue
+            if message_run != run_number:
+                continue
+            if kind == "solution":
+                combination, solution_iterations = payload
+                if not enough_solutions():
+                    record_solution(combination, solution_iterations)
+                    if enough_solutions():
+                        stop.set()
+            elif kind == "dead":
+                for other_id, inbox in enumerate(self.inboxes):
+                    if other_id != worker_id:
+                        inbox.put((run_number, payload[0]))
+            elif kind == "idle":
+                idle += 1
+        return iterations.value
+
+    def close(self):
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import csv
+import os
+import queue
+import struct
+import threading
+import time
+
+import SolutionRecall as recall
+
+# ======================================================================
+# Gepufferte Ergebnisausgabe: eine offene Datei, ein Schreib-Thread.
+#
+# Results.csv (Semikolon-CSV wie save_results) und optional eine binäre
+# Datei mit einem Zugindex-Array pro Lösung:
+#   Datensatz = <RunID uint32><Iterationen uint32><Anzahl Züge uint16>
+#               + Anzahl Züge × uint8 (Index in allowed_moves_global)
+# ======================================================================
+RESULTS_HEADER = ["RunID", "RunDateTime", "Start State", "Solution Time", "Solution Iterations", "Solution Move Sequence", "Total Moves"]
+RECORD_HEADER = struct.Struct("<IIH")
+MOVE_INDEX = {move: index for index, move in enumerate(recall.allowed_moves_global)}
+
+
+def encode_moves(move_sequence):
+    return bytes(MOVE_INDEX[move] for move in move_sequence.split())
+
+def decode_moves(move_indices):
+    return [recall.allowed_moves_global[index] for index in move_indices]
+
+def read_binary_results(filename):
+    """
+    Liest die binäre Ergebnisdatei: liefert (RunID, Iterationen, Zugindizes als bytes).
+    Die HTM-Zugzahl einer Lösung ist len(Zugindizes).
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        run_id, iterations, count = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        yield run_id, iterations, data[offset:offset + count]
+        offset += count
+
+
+class ResultsSink:
+    """
+    Nimmt Ergebniszeilen (Spalten wie save_results) entgegen und schreibt sie in einem
+    Hintergrund-Thread gesammelt: spätestens alle flush_interval Sekunden, bei flush()
+    (z.B. am Run-Ende) und bei close(). Die Dateien bleiben dazwischen geöffnet.
+    Bricht der Thread mit einem Fehler ab (z.B. Platte voll), lösen write/flush/close ihn erneut aus.
+    """
+
+    def __init__(self, results_filename="Results.csv", flush_interval=5.0, binary_filename=None):
+        filepath = os.path.join(recall.SCRIPT_DIR, results_filename)
+        write_header = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
+        self._csvfile = open(filepath, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._csvfile, delimiter=';')
+        if write_header:
+            self._writer.writerow(RESULTS_HEADER)
+        self._binfile = open(os.path.join(recall.SCRIPT_DIR, binary_filename), "ab") if binary_filename else None
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ResultsSink", daemon=True)
+        self._thread.start()
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def write(self, row):
+        self._check()
+        self._queue.put(row)
+
+    def flush(self):
+        """
+        Wartet, bis alle bisher übergebenen Zeilen geschrieben sind.
+        """
+        self._check()
+        done = threading.Event()
+        self._queue.put(done)
+        while not done.wait(1.0) and self._thread.is_alive():
+            pass
+        self._check()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._csvfile.close()
+        if self._binfile is not None:
+            self._binfile.close()
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_pending(self, pending):
+        if pending:
+            self._writer.writerows(pending)
+            if self._binfile is not None:
+                for row in pending:
+                    moves = encode_moves(row[5])
+                    self._binfile.write(RECORD_HEADER.pack(int(row[0]), int(row[4]), len(moves)) + moves)
+            self.rows_written += len(pending)
+            pending.clear()
+        self._csvfile.flush()
+        if self._binfile is not None:
+            self._binfile.flush()
+
+    def _run(self):
+        try:
+            self._write_loop()
+        except BaseException as e:  # für write/flush/close aufheben, sonst wartet flush() ewig
+            self._error = e
+
+    def _write_loop(self):
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+            if isinstance(item, list):
+                pending.append(item)
+                if time.monotonic() < deadline:
+                    continue
+            self._write_pending(pending)
+            deadline = time.monotonic() + self.flush_interval
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+import csv
+import os
+import sys
+import time
+
+import SolutionRecall as recall
+from CombinationTrie import CombinationTrie
+from Telemetry import Telemetry, telemetry_from_params
+from TranspositionTable import TranspositionTable
+
+# ======================================================================
+# Zeitbudget für alle Runs (SCHEDULE_SECONDS > 0, serieller Modus)
+#
+# Statt jedem Run MAX_ITERATIONS E3 zu geben, teilt der Scheduler ein
+# gemeinsames Budget (Wand- oder CPU-Zeit, SCHEDULE_CLOCK) in Zeitscheiben
+# von SLICE_SECONDS auf. Jeder Run behält zwischen seinen Scheiben Zustand,
+# CombinationTrie und Transpositionstabelle; optimize_cube wird über
+# should_stop am Ende einer Scheibe angehalten (die angefangene Kombination
+# wird in der nächsten Scheibe erneut aufgebaut).
+#
+# Fortschritt einer Scheibe = neue Lösungen * TARGET_CORRECT + Zuwachs der
+# höchsten erreichten Zahl korrekter Steine. Die Rate (gleitender Mittelwert
+# pro Sekunde) bestimmt, welcher Run die nächste Scheibe erhält; neue Runs
+# kommen zuerst an die Reihe (in RunID-Reihenfolge). Ein Run ohne Fortschritt
+# in STALL_SLICES Scheiben wird zurückgestellt und erst wieder aufgenommen,
+# wenn kein aktiver Run mehr übrig ist; bleibt er auch dann STALL_SLICES
+# Scheiben ohne Fortschritt, wird er abgebrochen.
+#
+# Ein Run endet mit SOLUTIONS_PER_RUN Lösungen oder wenn vom Ausgangszustand
+# aus nichts mehr offen ist. Seine Ergebniszeilen werden geschrieben, sobald
+# er endet, abgebrochen wird oder das Budget verbraucht ist (Zeilen eines
+# Runs bleiben zusammen, wie bei SolutionAnalytics erwartet).
+#
+# Results.schedule.csv: je Run Status, Lösungen, Iterationen, Sekunden,
+# Scheiben, beste Zahl korrekter Steine und Startposition (Teilstand nicht
+# beendeter Runs); am Ende wird zusammengefasst, wofür das Budget verwendet wurde.
+#
+# Parameter.csv: SCHEDULE_SECONDS (0 = aus), SCHEDULE_CLOCK ("wall" oder "cpu").
+# ======================================================================
+SLICE_SECONDS = 0.5
+STALL_SLICES = 4
+RATE_DECAY = 0.5
+SCHEDULE_HEADER = ["RunID", "RunDateTime", "Status", "Solutions", "Iterations", "Seconds", "Slices", "Best Correct",
+                   "Start Position"]
+CLOCKS = {"wall": time.perf_counter, "cpu": time.process_time}
+
+
+class ScheduledRun:
+    """
+    Ein Run mit Zustand über mehrere Zeitscheiben.
+    Status: "new", "active", "suspended", "solved" (SOLUTIONS_PER_RUN erreicht), "exhausted",
+    "abandoned" (ohne Fortschritt abgebrochen), "unfinished" (Budget verbraucht).
+    """
+
+    def __init__(self, run_number, run_seed, params, original_state, moves_mapping, learned_moves):
+        self.run_number = run_number
+        self.start_time = time.time()
+        self.run_datetime = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.start_time))
+        self.state = recall.scramble_start_state(original_state, params, run_seed, moves_mapping)
+        self.start_state_str = ";".join(self.state)
+        self.history = CombinationTrie(params.get("HISTORY_MAX_NODES", 0))
+        table_size = params.get("TRANSPOSITION_TABLE_SIZE", 0)
+        self.transpositions = None
+        if table_size:
+            from Symmetry import key_function_from_params
+            self.transpositions = TranspositionTable(table_size,
+                                                     key_function_from_params(params, moves_mapping, learned_moves))
+        # Ohne TELEMETRY_INTERVAL eine stille Telemetry: best_correct wird für die Fortschrittsrate gebraucht.
+        self.telemetry = telemetry_from_params(params, run_number) or Telemetry(run_number, float("inf"), None)
+        self.telemetry.best_correct = recall.mask_count(recall.get_correct_mask(self.state))
+        self.solutions = []
+        self.solution_key = recall.solution_key_function(params, moves_mapping)
+        self.solution_keys = set()
+        self.iterations = 0
+        self.seconds = 0.0
+        self.slices = 0
+        self.stalled = 0
+        self.rate = float("inf")
+        self.status = "new"
+        self.resumed = False
+
+    def record_solution(self, combination):
+        total_move_sequence = " ".join(recall.combination_moves(combination))
+        key = self.solution_key(total_move_sequence)
+        if key in self.solution_keys:
+            return
+        self.solution_keys.add(key)
+        solution = recall.solution_record(self.run_number, self.run_datetime, self.start_state_str, self.seconds,
+                                          self.iterations, total_move_sequence)
+        self.solutions.append(solution)
+        self.telemetry.solutions += 1
+        print(f"Run {self.run_number}: Lösung gefunden bei Iteration {self.iterations}, Zeit {solution['time']}, "
+              f"Total moves: {solution['total_moves']}")
+
+    def run_slice(self, params, moves_mapping, learned_moves, ordering, clock, seconds):
+        """
+        Sucht höchstens seconds lang weiter. Rückgabe: Fortschritt der Scheibe (siehe Kopfkommentar).
+        """
+        solutions_before = len(self.solutions)
+        best_before = self.telemetry.best_correct
+        started = clock()
+        deadline = started + seconds
+        stopped = False
+
+        def should_stop():
+            nonlocal stopped
+            stopped = clock() >= deadline
+            return stopped
+
+        while len(self.solutions) < params["SOLUTIONS_PER_RUN"]:
+            # Auch zwischen zwei Aufrufen prüfen: optimize_cube fragt should_stop nur in seiner Iterationsschleife ab.
+            if should_stop():
+                break
+            _, combination, solved, iterations = recall.optimize_cube(params, self.state, moves_mapping, learned_moves,
+                                                                     self.history, self.transpositions, self.telemetry,
+                                                                     ordering=ordering, should_stop=should_stop)
+            self.iterations += iterations
+            self.seconds += clock() - started
+            started = clock()
+            if solved:
+                self.record_solution(combination)
+                if iterations == 0:
+                    # Bereits gelöster Startzustand: weitere Aufrufe liefern nur wieder die leere Lösung.
+                    self.status = "exhausted"
+                    break
+            elif stopped:
+                break
+            else:
+                self.status = "exhausted"
+                break
+        else:
+            self.status = "solved"
+        self.slices += 1
+        return (len(self.solutions) - solutions_before) * recall.TARGET_CORRECT + self.telemetry.best_correct - best_before
+
+    def summary_row(self):
+        return [self.run_number, self.run_datetime, self.status, len(self.solutions), self.iterations,
+                round(self.seconds, 3), self.slices, self.telemetry.best_correct, self.start_state_str]
+
+
+def _next_run(runs):
+    """
+    Aktiver Run mit der höchsten Fortschrittsrate (bei Gleichstand der mit der wenigsten Zeit);
+    ohne aktive Runs wird der am längsten zurückgestellte Run wieder aufgenommen.
+    """
+    active = [run for run in runs if run.status in ("new", "active")]
+    if active:
+        return max(active, key=lambda run: (run.rate, -run.seconds))
+    for run in runs:
+        if run.status == "suspended":
+            run.status = "active"
+            run.resumed = True
+            run.stalled = 0
+            return run
+    return None
+
+def run_scheduled(params, original_state, master_seed, run_numbers, moves_mapping, learned_moves, write_row,
+                  ordering=None, summary_filename="Results.schedule.csv"):
+    """
+    Führt die Runs im Zeitbudget SCHEDULE_SECONDS aus. Die Ergebniszeilen gehen an write_row (je Run
+    zusammenhängend), die Run-Übersicht nach summary_filename. Rückgabe: Liste der ScheduledRun.
+    """
+    clock = CLOCKS.get(str(params.get("SCHEDULE_CLOCK", "wall")), time.perf_counter)
+    budget = params["SCHEDULE_SECONDS"]
+    # Pro Aufruf von optimize_cube gibt es keine feste Iterationsgrenze mehr: begrenzt wird über die Zeitscheiben.
+    slice_params = dict(params)
+    slice_params["MAX_ITERATIONS E3"] = sys.maxsize
+    schedule_start = clock()
+    deadline = schedule_start + budget
+    runs = []
+    pending = list(run_numbers)
+    print(f"\n=== Zeitbudget {budget} s ({params.get('SCHEDULE_CLOCK', 'wall')}) für {len(run_numbers)} Runs ===")
+
+    def finish(run):
+        for solution in run.solutions:
+            write_row(solution["row"])
+        print(f"Run {run.run_number} {run.status}: {len(run.solutions)} Lösungen, {run.iterations} Iterationen, "
+              f"{run.seconds:.1f} s")
+
+    while clock() < deadline:
+        # Neue Runs werden erst angelegt, wenn sie an der Reihe sind (Mischen, Tabellen).
+        if pending and not any(run.status == "new" for run in runs):
+            run_number = pending.pop(0)
+            runs.append(ScheduledRun(run_number, recall.derive_run_seed(master_seed, run_number), params,
+                                     original_state, moves_mapping, learned_moves))
+        run = _next_run(runs)
+        if run is None:
+            break
+        if run.status == "new":
+            run.status = "active"
+        progress = run.run_slice(slice_params, moves_mapping, learned_moves, ordering, clock,
+                                 min(SLICE_SECONDS, max(0.0, deadline - clock())))
+        if run.status in ("solved", "exhausted"):
+            finish(run)
+            continue
+        run.rate = RATE_DECAY * (run.rate if run.rate != float("inf") else 0.0) \
+            + (1 - RATE_DECAY) * progress / SLICE_SECONDS
+        if progress:
+            run.stalled = 0
+            run.resumed = False
+            continue
+        run.stalled += 1
+        if run.stalled < STALL_SLICES:
+            continue
+        if run.resumed:
+            run.status = "abandoned"
+            finish(run)
+        else:
+            run.status = "suspended"
+    for run in runs:
+        if run.status in ("active", "suspended"):
+            run.status = "unfinished"
+            finish(run)
+    _write_summary(runs, pending, clock() - schedule_start, budget, summary_filename)
+    return runs
+
+def _write_summary(runs, not_started, elapsed, budget, summary_filename):
+    filepath = os.path.join(recall.SCRIPT_DIR, summary_filename)
+    write_header = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
+    with open(filepath, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=';')
+        if write_header:
+            writer.writerow(SCHEDULE_HEADER)
+        for run in sorted(runs, key=lambda run: run.run_number):
+            writer.writerow(run.summary_row())
+    print(f"\nZeitbudget: {elapsed:.1f} von {budget} s verwendet")
+    for status in ("solved", "exhausted", "abandoned", "unfinished"):
+        selected = [run for run in runs if run.status == status]
+        if selected:
+            print(f"  {status:<10} {len(selected):>5} Runs, {sum(run.seconds for run in selected):8.1f} s, "
+                  f"{sum(len(run.solutions) for run in selected):>5} Lösungen")
+    if not_started:
+        print(f"  nicht begonnen {len(not_started)} Runs")
+    print("Übersicht je Run:", filepath)
@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
+import argparse
 import csv
+import hashlib
 import json
 import random
 import time
 import os
 import copy
 
+from MoveEngine import MoveEngine, apply_permutation, get_move_engine
+from BatchEvaluation import encode_state, get_batch_evaluator
+from CombinationTrie import CombinationTrie
+from TranspositionTable import TranspositionTable
+from Telemetry import profile_run, telemetry_from_params
+
 # Globales Skriptverzeichnis
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -73,20 +81,17 @@ def load_mappings(filename="mappings.json"):
 # ======================================================================
 def apply_move(cube_state, move, moves_mapping):
     """
-    Wendet einen Zug an. moves_mapping enthält die Transformationen.
+    Wendet einen Zug an. moves_mapping enthält die Transformationen
+    (Dictionary aus mappings.json oder bereits kompilierte MoveEngine).
     """
-    new_state = cube_state.copy()
-    for src_str, tgt in moves_mapping.get(move, {}).items():
-        new_state[int(tgt) - 1] = cube_state[int(src_str) - 1]
-    return new_state
+    return get_move_engine(moves_mapping).apply_move(cube_state, move)
 
-def apply_sequence(cube_state, sequence, moves_mapping):
+def apply_sequence(cube_state, sequence, moves_mapping, cache=True):
     """
-    Wendet eine Liste von Zügen (Sequenz) nacheinander an.
+    Wendet eine Liste von Zügen (Sequenz) an – als eine einzige, vorab zusammengesetzte Permutation.
+    cache=False für einmalige Folgen (Mischzüge), die den Sequenz-Cache nicht füllen sollen.
     """
-    for move in sequence:
-        cube_state = apply_move(cube_state, move, moves_mapping)
-    return cube_state
+    return get_move_engine(moves_mapping).apply_sequence(cube_state, sequence, cache)
 
 def cube_to_string(cube_state):
     """
@@ -166,6 +171,55 @@ TARGET_CORRECT = 20  # Cube gelöst, wenn 20 Steine korrekt sind.
 allowed_moves_global = ["F", "Fb", "U", "Ub", "L", "Lb", "R", "Rb", "B", "Bb", "D", "Db"]
 
 
+# ======================================================================
+# Bitmasken-Darstellung der 20 Steine (Bit i = i-ter Stein aus levels["E3"])
+# ======================================================================
+PIECE_NAMES = list(levels["E3"])
+PIECE_BITS = {piece: 1 << bit for bit, piece in enumerate(PIECE_NAMES)}
+PIECE_CHECKS = tuple(
+    (PIECE_BITS[piece], tuple((pos - 1, col) for pos, col in zip(positions, colors)))
+    for piece, (positions, colors) in levels["E3"].items()
+)
+
+def get_correct_mask(cube_state):
+    """
+    Liefert die korrekt positionierten Steine als 20-Bit-Maske.
+    """
+    mask = 0
+    for bit, stickers in PIECE_CHECKS:
+        for index, col in stickers:
+            if cube_state[index] != col:
+                break
+        else:
+            mask |= bit
+    return mask
+
+def mask_count(mask):
+    """
+    Anzahl gesetzter Bits (= Anzahl korrekter Steine).
+    """
+    return bin(mask).count("1")
+
+def pieces_to_mask(pieces):
+    """
+    Wandelt Steinnamen (z.B. aus "E1-K2-K4".split("-")) in eine Maske um.
+    Unbekannte Steinnamen können nie erfüllt sein -> None.
+    """
+    mask = 0
+    for piece in pieces:
+        if piece not in PIECE_BITS:
+            return None
+        mask |= PIECE_BITS[piece]
+    return mask
+
+def parse_starting_positions(start_positions):
+    """
+    "Starting Positions" aus Improvements.csv (z.B. "E1-K2-K4") -> geforderte Maske (leer -> 0).
+    """
+    start_positions = (start_positions or "").strip()
+    return pieces_to_mask(start_positions.split("-")) if start_positions else 0
+
+
 # ======================================================================
 # Laden der gelernten Zugfolgen aus Improvements.csv
 # ======================================================================
@@ -187,14 +241,192 @@ def load_learned_moves(filename):
                 row["Value"] = float(row["Value"])
             except Exception:
                 pass
+            row["Required Mask"] = parse_starting_positions(row.get("Starting Positions"))
             learned.append(row)
     return learned
 
+def compile_learned_moves(learned_moves, moves_mapping):
+    """
+    Setzt jede "Move Sequence" einmalig zu einer Permutation zusammen (Schlüssel "Permutation"),
+    damit ein Kandidat im Suchlauf mit einem einzigen Gather angewendet werden kann.
+    "Index" ist die Zeilennummer des Kandidaten (Zeile in der Batch-Permutationsmatrix),
+    "Sequence ID" eine kompakte Ganzzahl je unterschiedlicher Zugfolge (Schlüssel im CombinationTrie).
+    """
+    engine = get_move_engine(moves_mapping)
+    sequence_ids = {}
+    for index, candidate in enumerate(learned_moves):
+        candidate["Permutation"] = engine.sequence_permutation(candidate["Move Sequence"])
+        candidate["Index"] = index
+        candidate["Sequence ID"] = sequence_ids.setdefault(candidate["Move Sequence"], len(sequence_ids))
+    return learned_moves
+
+class PreconditionIndex:
+    """
+    Vorbedingungs-Index: binärer Entscheidungsbaum über die geforderten Steine. Jeder innere Knoten
+    teilt die Gruppen nach einem Stein-Bit; fehlt dieser Stein in correct_mask, wird der Teilbaum
+    der Gruppen, die ihn verlangen, übersprungen, ohne ihn anzusehen. Selten geforderte Steine
+    werden zuerst geprüft (ergibt die wenigsten besuchten Knoten). Blätter enthalten die Gruppen
+    (Start Count, Required Mask, Kandidatenindizes) und prüfen die restlichen Bits.
+    """
+
+    def __init__(self, groups):
+        self.groups = groups
+        frequency = {}
+        for _, required_mask, _ in groups:
+            for bit in PIECE_BITS.values():
+                if required_mask & bit:
+                    frequency[bit] = frequency.get(bit, 0) + 1
+        self.root = self._build(groups, sorted(frequency, key=lambda bit: (frequency[bit], bit)))
+
+    def _build(self, groups, bits):
+        """
+        Knoten (Bit, Teilbaum ohne den Stein, Teilbaum mit dem Stein); Blatt: (0, Gruppen, None).
+        """
+        for position, bit in enumerate(bits):
+            requiring = [group for group in groups if group[1] & bit]
+            if requiring and len(requiring) < len(groups):
+                rest = bits[position + 1:]
+                return (bit, self._build([group for group in groups if not group[1] & bit], rest),
+                        self._build(requiring, rest))
+        return (0, groups, None)
+
+    def applicable(self, correct_mask, start_count=None):
+        result = []
+        stack = [self.root]
+        while stack:
+            bit, without, requiring = stack.pop()
+            if bit:
+                stack.append(without)
+                if correct_mask & bit:
+                    stack.append(requiring)
+                continue
+            for group_start_count, required_mask, indices in without:
+                if not required_mask & ~correct_mask and (start_count is None or group_start_count == start_count):
+                    result.extend(indices)
+        result.sort()
+        return result
+
+def build_precondition_index(learned_moves):
+    """
+    Gruppiert die Kandidaten nach ("Start Count", "Required Mask") und baut daraus den PreconditionIndex.
+    Kandidaten mit unerfüllbarer Vorbedingung (unbekannter Stein) werden nicht aufgenommen.
+    """
+    groups = {}
+    for index, candidate in enumerate(learned_moves):
+        if "Required Mask" in candidate:
+            required_mask = candidate["Required Mask"]
+        else:
+            required_mask = parse_starting_positions(candidate.get("Starting Positions"))
+        if required_mask is None:
+            continue
+        groups.setdefault((candidate.get("Start Count"), required_mask), []).append(index)
+    return PreconditionIndex([(start_count, required_mask, indices)
+                              for (start_count, required_mask), indices in groups.items()])
+
+def applicable_candidates(precondition_index, correct_mask, start_count=None):
+    """
+    Indizes (in Dateireihenfolge) aller Kandidaten, deren geforderte Steine eine Teilmenge
+    von correct_mask sind; optional zusätzlich gefiltert nach "Start Count".
+    """
+    return precondition_index.applicable(correct_mask, start_count)
+
+_precondition_indices = {}
+
+def get_precondition_index(learned_moves):
+    """
+    Liefert (und cached) den Vorbedingungs-Index zu einer Liste gelernter Zugfolgen.
+    """
+    entry = _precondition_indices.get(id(learned_moves))
+    if entry is None or entry[0] is not learned_moves:
+        entry = (learned_moves, build_precondition_index(learned_moves))
+        _precondition_indices[id(learned_moves)] = entry
+    return entry[1]
+
+
+def load_learned_library(params, improvements_filename, moves_mapping):
+    """
+    Lädt und kompiliert die gelernten Zugfolgen – bei LIBRARY_CACHE = 1 (Standard) über den
+    automatisch aktualisierten Binär-Cache, sonst direkt aus der CSV-Datei.
+    """
+    if params.get("LIBRARY_CACHE", 1):
+        from LibraryCache import load_learned_library as load_cached
+        return load_cached(improvements_filename, os.path.join(SCRIPT_DIR, "mappings.json"), moves_mapping)
+    return compile_learned_moves(load_learned_moves(improvements_filename), moves_mapping)
+
+
+# ======================================================================
+# Auswahl des nächsten Kandidaten (gemeinsam für alle Suchmodi)
+# ======================================================================
+def is_transposition(transpositions, candidate_state, candidate_mask, depth):
+    """
+    True, wenn der Kandidatenzustand laut Transpositionstabelle nicht erneut durchsucht werden muss.
+    Gelöste Zustände werden nie abgeschnitten (alle Lösungen enden dort).
+    """
+    if transpositions is None or mask_count(candidate_mask) == TARGET_CORRECT:
+        return False
+    return transpositions.should_prune(candidate_state, depth)
+
+def select_candidate(learned_moves, applicable, start, current_state, current_count, node, evaluator=None, best=False,
+                     transpositions=None, depth=0, telemetry=None):
+    """
+    Sucht ab Position start in applicable (Kandidatenindizes in Dateireihenfolge) den ersten
+    nicht erschöpften Kandidaten, der die Zahl korrekter Steine erhöht – bzw. mit evaluator
+    und best=True den Kandidaten mit den meisten korrekten Steinen.
+    node ist der Trie-Knoten der aktuellen Kombination (None: keine erschöpften Erweiterungen),
+    depth die Tiefe des Kandidatenzustands für die optionale Transpositionstabelle.
+    Rückgabe: (Position in applicable, Kandidatenzustand, Kandidatenmaske) oder None.
+    """
+    if evaluator is None:
+        selection = None
+        applications = 0
+        for position in range(start, len(applicable)):
+            candidate = learned_moves[applicable[position]]
+            if node is not None and not node.is_viable(candidate["Sequence ID"]):
+                continue
+            applications += 1
+            candidate_state = apply_permutation(current_state, candidate["Permutation"])
+            candidate_mask = get_correct_mask(candidate_state)
+            if mask_count(candidate_mask) > current_count:
+                if is_transposition(transpositions, candidate_state, candidate_mask, depth):
+                    continue
+                selection = position, candidate_state, candidate_mask
+                break
+        if telemetry is not None:
+            scanned = (selection[0] + 1 if selection is not None else len(applicable)) - start
+            telemetry.candidates_scanned += scanned
+            telemetry.history_hits += scanned - applications
+            telemetry.sequence_applications += applications
+        return selection
+    positions = [position for position in range(start, len(applicable))
+                 if node is None or node.is_viable(learned_moves[applicable[position]]["Sequence ID"])]
+    if telemetry is not None:
+        telemetry.candidates_scanned += len(applicable) - start
+        telemetry.history_hits += len(applicable) - start - len(positions)
+    state_codes = encode_state(current_state)
+    while positions:
+        chosen = evaluator.select(state_codes, [applicable[position] for position in positions],
+                                  current_count, best=best)
+        if telemetry is not None:
+            # Im Modus "first" wird blockweise bewertet; gezählt wird bis zum Ende des Treffer-Blocks.
+            evaluated = len(positions) if chosen is None or best else min(len(positions), (chosen // evaluator.chunk_size + 1) * evaluator.chunk_size)
+            telemetry.sequence_applications += evaluated
+        if chosen is None:
+            return None
+        position = positions[chosen]
+        candidate_state = apply_permutation(current_state, learned_moves[applicable[position]]["Permutation"])
+        candidate_mask = get_correct_mask(candidate_state)
+        if not is_transposition(transpositions, candidate_state, candidate_mask, depth):
+            return position, candidate_state, candidate_mask
+        # Abgeschnittenen Kandidaten entfernen; im Modus "first" geht es dahinter weiter.
+        positions = positions[chosen + 1:] if not best else positions[:chosen] + positions[chosen + 1:]
+    return None
+
 
 # ======================================================================
 # Optimierungsalgorithmus (ohne parallele Suche)
 # ======================================================================
-def optimize_cube(params, starting_state, moves_mapping, learned_moves, combination_history):
+def optimize_cube(params, starting_state, moves_mapping, learned_moves, combination_history, transpositions=None,
+                  telemetry=None, checkpoint=None, ordering=None, should_stop=None):
     """
     Optimiert den Würfel vom gegebenen Ausgangszustand, indem Zugfolgen iterativ angewendet werden,
     bis der Cube gelöst ist oder die maximale Iterationszahl erreicht wird.
@@ -203,74 +435,258 @@ def optimize_cube(params, starting_state, moves_mapping, learned_moves, combinat
     Eine Kombination wird als "erschöpft" markiert (und in combination_history gespeichert),
     wenn alle möglichen Erweiterungen für diese Kombination ausprobiert wurden oder sie bereits zur Lösung geführt hat.
     
-    Die combination_history gilt für den gesamten Run (oder Versuch) und wird nicht zurückgesetzt.
+    Die combination_history (CombinationTrie, Pfade aus Sequenz-IDs) gilt für den gesamten Run
+    (oder Versuch) und wird nicht zurückgesetzt.
+    
+    SEARCH_MODE: "restart" (Standard) beginnt nach jeder erschöpften Kombination wieder beim
+    Ausgangszustand; "backtrack" geht nur eine Ebene zurück (siehe optimize_cube_backtracking).
+    "beam" wird nicht hier, sondern in _search_run über BeamSearch.beam_search ausgeführt.
+    
+    transpositions (optional, TranspositionTable des Runs): Zustände, die bereits als Sackgasse
+    bekannt sind oder in geringerer Tiefe erreicht wurden, werden nicht erneut durchsucht.
+    telemetry (optional, Telemetry des Runs) zählt Kandidaten, Anwendungen, Neustarts usw.
+    checkpoint (optional, RunCheckpoint des Runs) sichert regelmäßig die aktuelle Kombination
+    und setzt beim Fortsetzen an der gesicherten Stelle wieder ein.
+    ordering (optional, AdaptiveOrdering) ersetzt die Dateireihenfolge der Kandidaten durch eine
+    aus Lösungen und Sackgassen gelernte Reihenfolge.
+    should_stop (optional, Funktion ohne Argumente) wird vor jeder Iteration aufgerufen; True beendet
+    die Suche (z.B. wenn ein anderer Prozess genug Lösungen gefunden hat, siehe ParallelSubtrees).
+    
+    Ist bereits die leere Kombination erschöpft, endet die Suche sofort (keine Verbesserung mehr möglich).
+    
+    LAST_LAYER_TABLE = 1 (nur SEARCH_MODE "restart"): Sobald Ebene 1–2 gelöst sind, wird die Endfolge für die letzte Ebene
+    nachgeschlagen und als letztes Element an die Kombination angehängt (siehe LastLayerTable);
+    das Präfix bis dahin gilt danach als erschöpft. Sind Ebene 1–2 schon im Ausgangszustand gelöst,
+    wird die Endfolge nur beim ersten Aufruf geliefert; weitere Lösungen sucht die normale Suche.
     
     Rückgabe: finaler Zustand, die aktuell angewandte (unvollständige) Kombination, ob der Cube gelöst ist,
     und die Anzahl der Iterationen.
     """
     level_targets = levels["E3"]
+    engine = get_move_engine(moves_mapping)
+    if learned_moves and "Permutation" not in learned_moves[0]:
+        compile_learned_moves(learned_moves, engine)
+    # EVALUATION_MODE: "sequential" (Standard), "batch" (erste Verbesserung, vektorisiert)
+    # oder "batch-best" (Kandidat mit den meisten korrekten Steinen, vektorisiert).
+    evaluation_mode = params.get("EVALUATION_MODE", "sequential")
+    evaluator = None
+    if evaluation_mode in ("batch", "batch-best"):
+        evaluator = get_batch_evaluator(learned_moves, level_targets)
+    best = (evaluation_mode == "batch-best")
+    if params.get("SEARCH_MODE", "restart") == "backtrack":
+        return optimize_cube_backtracking(params, starting_state, learned_moves, combination_history, evaluator, best,
+                                          transpositions, telemetry, checkpoint, ordering, should_stop)
+    precondition_index = get_precondition_index(learned_moves)
+    last_layer = None
+    if params.get("LAST_LAYER_TABLE", 0):
+        from LastLayerTable import last_layer_from_params
+        last_layer = last_layer_from_params(params, engine)
     current_state = starting_state.copy()
     starting_state_saved = starting_state.copy()
-    print("Startzahl korrekt positionierter Steine:", count_correct_pieces(current_state, level_targets))
+    current_mask = get_correct_mask(current_state)
+    print("Startzahl korrekt positionierter Steine:", mask_count(current_mask))
     
     current_combination = []  # Aktuelle Verkettung von Zugfolgen
+    current_ids = []          # dieselbe Kombination als Sequenz-IDs (Pfad im CombinationTrie)
+    current_indices = []      # dieselbe Kombination als Kandidatenindizes (für Checkpoints)
+    current_buckets = []      # korrekte Steine vor jedem Schritt (für die adaptive Reihenfolge)
+    current_node = combination_history.root  # Trie-Knoten der aktuellen Kombination (None: nicht gespeichert)
     max_iterations = params["MAX_ITERATIONS E3"]
     iteration = 0
-    while count_correct_pieces(current_state, level_targets) < TARGET_CORRECT and iteration < max_iterations:
-        improvement_found = False
-        
-        # Erstelle Liste der Kandidaten, deren Erweiterung (als Kombination) noch nicht erschöpft ist.
-        viable_candidates = []
-        for candidate in learned_moves:
-            candidate_sequence = candidate["Move Sequence"]
-            candidate_key = tuple(current_combination + [candidate_sequence])
-            if candidate_key not in combination_history:
-                viable_candidates.append(candidate)
-                
-        # Wenn keine viable Kandidaten mehr vorhanden sind, gilt die aktuelle Kombination als erschöpft.
-        if not viable_candidates:
-            if current_combination:
-                combination_history.add(tuple(current_combination))
-            current_state = starting_state_saved.copy()
-            current_combination = []
+    resume = checkpoint.take_call_state() if checkpoint is not None else None
+    if resume is not None:
+        current_indices, iteration, _ = resume
+        states = replay_combination(starting_state, learned_moves, current_indices)
+        current_buckets = [mask_count(get_correct_mask(state)) for state in states[:-1]]
+        current_state = states[-1]
+        current_mask = get_correct_mask(current_state)
+        current_combination = [learned_moves[index]["Move Sequence"] for index in current_indices]
+        current_ids = [learned_moves[index]["Sequence ID"] for index in current_indices]
+        current_node = combination_history.find(current_ids)
+    while mask_count(current_mask) < TARGET_CORRECT and iteration < max_iterations:
+        if should_stop is not None and should_stop():
+            break
+        finish = None
+        if last_layer is not None and (current_combination or not combination_history.root_finished):
+            # Vom Ausgangszustand aus nur einmal nachschlagen (root_finished), danach wird normal gesucht.
+            finish = last_layer.finish(current_state)
+        if finish is not None:
+            # Letzte Ebene aus der Tabelle statt weiterer Suche; die Kombination ist damit gelöst.
+            finish_sequence, current_state = finish
+            current_mask = get_correct_mask(current_state)
+            current_combination.append(finish_sequence)
+            combination_history.mark_exhausted(current_ids)
+            if ordering is not None:
+                ordering.record(current_indices, current_buckets, True)
             iteration += 1
-            if iteration % 1000 == 0:
-                print(iteration)
+            if telemetry is not None:
+                telemetry.best_correct = TARGET_CORRECT
+                telemetry.count_iteration()
             continue
+        # Versuche, die aktuelle Kombination zu erweitern: Kandidaten, deren Vorbedingung erfüllt ist
+        # (Teilmengentest der Masken) und deren Erweiterung noch nicht erschöpft ist, in Dateireihenfolge.
+        applicable = applicable_candidates(precondition_index, current_mask)
+        if ordering is not None:
+            ordering.order(applicable, current_mask)
+        current_count = mask_count(current_mask)
+        selection = select_candidate(learned_moves, applicable, 0, current_state, current_count,
+                                     current_node, evaluator, best, transpositions, len(current_combination) + 1,
+                                     telemetry)
+        if telemetry is not None:
+            telemetry.precondition_rejections += len(learned_moves) - len(applicable)
+            if selection is not None:
+                telemetry.improvements += 1
+                telemetry.best_correct = max(telemetry.best_correct, mask_count(selection[2]))
+            elif current_combination:
+                telemetry.resets += 1
         
-        # Versuche, die aktuelle Kombination zu erweitern.
-        for candidate in viable_candidates:
-            candidate_sequence = candidate["Move Sequence"]
-            candidate_key = tuple(current_combination + [candidate_sequence])
-            start_positions = candidate.get("Starting Positions", "").strip()
-            if start_positions:
-                required_pieces = start_positions.split("-")
-                current_correct = get_correct_pieces(current_state, level_targets)
-                if not all(piece in current_correct for piece in required_pieces):
-                    continue
-            candidate_moves = candidate_sequence.split()
-            candidate_state = apply_sequence(current_state.copy(), candidate_moves, moves_mapping)
-            current_count = count_correct_pieces(current_state, level_targets)
-            candidate_count = count_correct_pieces(candidate_state, level_targets)
-            if candidate_count > current_count:
-                current_state = candidate_state
-                current_combination.append(candidate_sequence)
-                # Wenn der Cube gelöst ist, markiere diese Kombination als erschöpft.
-                if count_correct_pieces(current_state, level_targets) == TARGET_CORRECT:
-                    combination_history.add(tuple(current_combination))
-                improvement_found = True
-                break
-        
-        if not improvement_found:
-            if current_combination:
-                combination_history.add(tuple(current_combination))
+        if selection is not None:
+            position, current_state, current_mask = selection
+            chosen = learned_moves[applicable[position]]
+            current_combination.append(chosen["Move Sequence"])
+            current_ids.append(chosen["Sequence ID"])
+            current_indices.append(applicable[position])
+            current_buckets.append(current_count)
+            current_node = current_node.child(chosen["Sequence ID"]) if current_node is not None else None
+            # Wenn der Cube gelöst ist, markiere diese Kombination als erschöpft.
+            if mask_count(current_mask) == TARGET_CORRECT:
+                combination_history.mark_exhausted(current_ids)
+                if ordering is not None:
+                    ordering.record(current_indices, current_buckets, True)
+            elif transpositions is not None:
+                transpositions.record_expanded(current_state, len(current_combination))
+        else:
+            # Keine (viable) Erweiterung möglich: Kombination ist erschöpft, Neustart vom Ausgangszustand.
+            if not current_combination:
+                break  # Auch vom Ausgangszustand aus ist nichts mehr offen.
+            combination_history.mark_exhausted(current_ids)
+            if transpositions is not None:
+                transpositions.mark_dead(current_state)
+            if ordering is not None:
+                ordering.record(current_indices, current_buckets, False)
             current_state = starting_state_saved.copy()
+            current_mask = get_correct_mask(current_state)
             current_combination = []
+            current_ids = []
+            current_indices = []
+            current_buckets = []
+            current_node = combination_history.root
+        iteration += 1
+        if iteration % 1000 == 0:
+            print(iteration)
+        if telemetry is not None:
+            telemetry.count_iteration()
+        if checkpoint is not None:
+            checkpoint.tick(iteration, current_indices)
+    
+    solved = (mask_count(current_mask) == TARGET_CORRECT)
+    return current_state, current_combination, solved, iteration
+
+def optimize_cube_backtracking(params, starting_state, learned_moves, combination_history, evaluator=None, best=False,
+                               transpositions=None, telemetry=None, checkpoint=None, ordering=None, should_stop=None):
+    """
+    Tiefensuche mit Backtracking (SEARCH_MODE "backtrack"): Pro Tiefe wird (Zustand, Maske,
+    anwendbare Kandidaten, Cursor) auf einem Stack gehalten. In einer Sackgasse wird die
+    Kombination wie bisher als erschöpft markiert, aber nur eine Ebene zurückgegangen und
+    beim nächsten noch nicht versuchten Kandidaten dieser Ebene weitergesucht.
+    
+    Da alle Kandidaten vor dem Cursor im selben Zustand keine Verbesserung brachten, wählt
+    die Suche dieselben Kombinationen wie der Neustart-Modus, spart aber das erneute Anwenden
+    und Bewerten des bereits bekannten Präfixes. Eine Iteration ist weiterhin ein
+    Erweiterungsversuch (erfolgreich oder Sackgasse); ist bereits die leere Kombination
+    erschöpft, endet die Suche sofort.
+    Mit best=True wird nach dem Zurückgehen die ganze Ebene neu bewertet (Cursor 0).
+    Beim Fortsetzen aus einem Checkpoint wird der Stack aus den Kandidatenindizes neu aufgebaut.
+    """
+    precondition_index = get_precondition_index(learned_moves)
+    current_state = starting_state.copy()
+    current_mask = get_correct_mask(current_state)
+    print("Startzahl korrekt positionierter Steine:", mask_count(current_mask))
+    
+    stack = []                # pro Tiefe: (Zustand, Maske, anwendbare Kandidaten, gewählte Position)
+    current_combination = []
+    current_ids = []
+    current_indices = []
+    current_buckets = []
+    current_node = combination_history.root
+    applicable = applicable_candidates(precondition_index, current_mask)
+    if ordering is not None:
+        ordering.order(applicable, current_mask)
+    cursor = 0
+    max_iterations = params["MAX_ITERATIONS E3"]
+    iteration = 0
+    resume = checkpoint.take_call_state() if checkpoint is not None else None
+    if resume is not None:
+        current_indices, iteration, cursor = resume
+        for index, state in zip(current_indices, replay_combination(starting_state, learned_moves, current_indices)):
+            stack.append((state, current_mask, applicable, applicable.index(index)))
+            current_buckets.append(mask_count(current_mask))
+            current_state = apply_permutation(state, learned_moves[index]["Permutation"])
+            current_mask = get_correct_mask(current_state)
+            applicable = applicable_candidates(precondition_index, current_mask)
+            if ordering is not None:
+                ordering.order(applicable, current_mask)
+        current_combination = [learned_moves[index]["Move Sequence"] for index in current_indices]
+        current_ids = [learned_moves[index]["Sequence ID"] for index in current_indices]
+        current_node = combination_history.find(current_ids)
+    while mask_count(current_mask) < TARGET_CORRECT and iteration < max_iterations:
+        if should_stop is not None and should_stop():
+            break
+        selection = select_candidate(learned_moves, applicable, cursor, current_state, mask_count(current_mask),
+                                     current_node, evaluator, best, transpositions, len(current_combination) + 1,
+                                     telemetry)
         iteration += 1
         if iteration % 1000 == 0:
             print(iteration)
+        if telemetry is not None:
+            if cursor == 0:
+                telemetry.precondition_rejections += len(learned_moves) - len(applicable)
+            if selection is not None:
+                telemetry.improvements += 1
+                telemetry.best_correct = max(telemetry.best_correct, mask_count(selection[2]))
+            elif stack:
+                telemetry.resets += 1
+            telemetry.count_iteration()
+        if selection is not None:
+            position, candidate_state, candidate_mask = selection
+            chosen = learned_moves[applicable[position]]
+            stack.append((current_state, current_mask, applicable, position))
+            current_state, current_mask = candidate_state, candidate_mask
+            current_combination.append(chosen["Move Sequence"])
+            current_ids.append(chosen["Sequence ID"])
+            current_indices.append(applicable[position])
+            current_buckets.append(mask_count(stack[-1][1]))
+            current_node = current_node.child(chosen["Sequence ID"]) if current_node is not None else None
+            applicable = applicable_candidates(precondition_index, current_mask)
+            if ordering is not None:
+                ordering.order(applicable, current_mask)
+            cursor = 0
+            if mask_count(current_mask) == TARGET_CORRECT:
+                combination_history.mark_exhausted(current_ids)
+                if ordering is not None:
+                    ordering.record(current_indices, current_buckets, True)
+            elif transpositions is not None:
+                transpositions.record_expanded(current_state, len(current_combination))
+        elif stack:
+            # Sackgasse: Kombination als erschöpft markieren und eine Ebene zurückgehen.
+            combination_history.mark_exhausted(current_ids)
+            if transpositions is not None:
+                transpositions.mark_dead(current_state)
+            if ordering is not None:
+                ordering.record(current_indices, current_buckets, False)
+            current_state, current_mask, applicable, position = stack.pop()
+            current_combination.pop()
+            current_ids.pop()
+            current_indices.pop()
+            current_buckets.pop()
+            current_node = combination_history.find(current_ids)
+            cursor = 0 if best else position + 1
+        else:
+            break
+        if checkpoint is not None:
+            checkpoint.tick(iteration, current_indices, cursor)
     
-    solved = (count_correct_pieces(current_state, level_targets) == TARGET_CORRECT)
+    solved = (mask_count(current_mask) == TARGET_CORRECT)
     return current_state, current_combination, solved, iteration
 
 
@@ -296,14 +712,218 @@ def save_results(run_id, run_datetime, start_state_str, solution_time, solution_
         writer.writerow([run_id, run_datetime, start_state_str, solution_time, solution_iterations, solution_move_sequence, total_moves])
 
 
+# ======================================================================
+# Ein einzelner Run: Startposition einmal mischen, dann bis zu
+# SOLUTIONS_PER_RUN Lösungen suchen. Das combination_history-Sperrset
+# (CombinationTrie) gilt für alle Versuche in einem Run.
+# ======================================================================
+def derive_run_seed(master_seed, run_number):
+    """
+    Leitet den Seed eines Runs deterministisch aus dem Master-Seed ab, sodass jeder Run
+    (seriell, parallel oder einzeln mit --run) dieselbe Startposition erhält.
+    """
+    digest = hashlib.sha256(f"{master_seed}:{run_number}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def scramble_start_state(original_state, params, run_seed, moves_mapping):
+    """
+    Mischt die Startposition eines Runs mit NO_MOVES_TO_SHUFFLE Zufallszügen aus dem Run-Seed.
+    """
+    rng = random.Random(run_seed)
+    current_state = original_state.copy()
+    no_moves_to_shuffle = params.get("NO_MOVES_TO_SHUFFLE", 0)
+    if no_moves_to_shuffle > 0:
+        shuffle_sequence = [rng.choice(allowed_moves_global) for _ in range(no_moves_to_shuffle)]
+        current_state = apply_sequence(current_state, shuffle_sequence, moves_mapping, cache=False)
+    return current_state
+
+def combination_moves(combination):
+    """
+    Verkettet die Zugfolgen einer Kombination zu einer Liste einzelner Züge.
+    """
+    total_moves_list = []
+    for seq in combination:
+        total_moves_list.extend(seq.split())
+    return total_moves_list
+
+def replay_combination(starting_state, learned_moves, indices):
+    """
+    Wendet die Kandidaten (Indizes in learned_moves) nacheinander an; Rückgabe: alle Zwischenzustände
+    vom Startzustand bis zum Endzustand.
+    """
+    states = [starting_state]
+    for index in indices:
+        states.append(apply_permutation(states[-1], learned_moves[index]["Permutation"]))
+    return states
+
+def solution_record(run_number, run_datetime, start_state_str, elapsed, iterations, move_sequence):
+    """
+    Datensatz einer Lösung mit der Ergebniszeile (Spalten wie in save_results).
+    """
+    solution_time_str = time.strftime("%H:%M:%S", time.gmtime(elapsed))
+    total_moves = len(move_sequence.split())
+    return {
+        "iterations": iterations,
+        "elapsed": elapsed,
+        "time": solution_time_str,
+        "move_sequence": move_sequence,
+        "total_moves": total_moves,
+        "start_state": start_state_str,
+        "row": [run_number, run_datetime, start_state_str, solution_time_str, iterations, move_sequence, total_moves],
+    }
+
+def solution_key_function(params, moves_mapping):
+    """
+    Vergleichsschlüssel für Duplikate innerhalb eines Runs: bei SIMPLIFY_SOLUTIONS = 1 die vereinfachte
+    Zugfolge (so wie sie geschrieben wird, siehe MoveSimplifier), sonst die Zugfolge selbst.
+    """
+    if not params.get("SIMPLIFY_SOLUTIONS", 0):
+        return lambda move_sequence: move_sequence
+    from MoveSimplifier import MoveSimplifier
+    return MoveSimplifier(moves_mapping).simplify_sequence
+
+def execute_run(run_number, run_seed, params, original_state, moves_mapping, learned_moves, on_solution=None,
+                checkpoint=None, ordering=None, intra_run=None):
+    """
+    Führt einen Run aus und liefert die Ergebniszeilen (Spalten wie in save_results).
+    on_solution wird für jede neue Lösung sofort mit der Ergebniszeile aufgerufen.
+    checkpoint (optional, RunCheckpoint): sichert den Fortschritt bzw. setzt einen gesicherten Run fort;
+    die Ergebniszeilen enthalten dann auch die Lösungen von vor der Unterbrechung.
+    ordering (optional, AdaptiveOrdering): gelernte Kandidatenreihenfolge, wird während des Runs fortgeschrieben.
+    intra_run (optional, ParallelSubtrees.SubtreePool): verteilt die Suche des Runs auf mehrere Prozesse.
+    """
+    solutions_per_run = params["SOLUTIONS_PER_RUN"]
+    print(f"\n=== Starting Run {run_number} ===")
+    run_start_time = time.time()
+    run_datetime = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run_start_time))
+    # Erzeuge eine Startposition für diesen Run (einmaliges Mischen)
+    current_state = scramble_start_state(original_state, params, run_seed, moves_mapping)
+    run_start_state_str = ";".join(current_state)
+    
+    # Kombinationen (erschöpfte Kombinationen) werden pro Run in combination_history gespeichert
+    combination_history = CombinationTrie(params.get("HISTORY_MAX_NODES", 0))
+    # Optionale Transpositionstabelle (TRANSPOSITION_TABLE_SIZE Einträge, 0 = aus) für denselben Run
+    table_size = params.get("TRANSPOSITION_TABLE_SIZE", 0)
+    transpositions = None
+    if table_size:
+        # SYMMETRY_GROUP: zueinander symmetrische Zustände teilen sich einen Eintrag (siehe Symmetry)
+        from Symmetry import key_function_from_params
+        transpositions = TranspositionTable(table_size, key_function_from_params(params, moves_mapping, learned_moves))
+    telemetry = telemetry_from_params(params, run_number)
+    resumed = None
+    if checkpoint is not None:
+        resumed = checkpoint.start_run(run_number, run_seed, current_state, run_datetime, run_start_time,
+                                       combination_history)
+        if resumed is not None:
+            run_datetime = resumed["run_datetime"]
+            run_start_time -= resumed["elapsed"]
+    with profile_run(params, run_number):
+        run_solutions = _search_run(run_number, run_start_time, run_datetime, run_start_state_str, current_state, params,
+                                    moves_mapping, learned_moves, combination_history, transpositions, telemetry,
+                                    on_solution, checkpoint, resumed, ordering, intra_run)
+    if checkpoint is not None:
+        checkpoint.finish_run()
+    print(f"Run {run_number} abgeschlossen. Gefundene Lösungen: {len(run_solutions)}")
+    if transpositions is not None and intra_run is None:  # bei INTRA_RUN_WORKERS führt jeder Worker eine eigene Tabelle
+        print(f"Run {run_number} Transpositionstabelle:", transpositions.stats())
+    if telemetry is not None:
+        telemetry.emit("run_end")
+    return [solution["row"] for solution in run_solutions]
+
+def _search_run(run_number, run_start_time, run_datetime, run_start_state_str, current_state, params, moves_mapping,
+                learned_moves, combination_history, transpositions, telemetry, on_solution, checkpoint=None, resumed=None,
+                ordering=None, intra_run=None):
+    """
+    Suchschleife eines Runs: ruft optimize_cube auf, bis SOLUTIONS_PER_RUN Lösungen gefunden sind,
+    das Iterationsbudget verbraucht ist oder keine Verbesserung mehr möglich ist.
+    """
+    solutions_per_run = params["SOLUTIONS_PER_RUN"]
+    run_iterations = resumed["run_iterations"] if resumed is not None else 0
+    run_solutions = resumed["solutions"] if resumed is not None else []  # Liste der gefundenen Lösungen in diesem Run
+    solution_key = solution_key_function(params, moves_mapping)
+    solution_keys = {solution_key(solution["move_sequence"]) for solution in run_solutions}
+
+    def record_solution(combination, iterations):
+        total_move_sequence = " ".join(combination_moves(combination))
+        # Pro Run wird die Lösung einmalig gespeichert (Duplikate innerhalb des Runs verhindern,
+        # bei SIMPLIFY_SOLUTIONS = 1 nach der Vereinfachung verglichen)
+        key = solution_key(total_move_sequence)
+        if key in solution_keys:
+            print(f"Run {run_number}: Duplikat-Lösung ignoriert")
+            return
+        solution_keys.add(key)
+        solution = solution_record(run_number, run_datetime, run_start_state_str, time.time() - run_start_time,
+                                   iterations, total_move_sequence)
+        run_solutions.append(solution)
+        if telemetry is not None:
+            telemetry.solutions += 1
+        if on_solution is not None:
+            on_solution(solution["row"])
+        if checkpoint is not None:
+            checkpoint.solution_found(iterations)
+        print(f"Run {run_number}: Lösung gefunden bei Iteration {iterations}, Zeit {solution['time']}, Total moves: {solution['total_moves']}")
+
+    if params.get("SEARCH_MODE", "restart") == "beam":
+        # Beam-Suche: liefert die Lösungen nacheinander aus einer einzigen Suche (siehe BeamSearch).
+        from BeamSearch import beam_search
+        from Symmetry import key_function_from_params
+        for indices, iterations in beam_search(params, current_state, learned_moves, telemetry,
+                                               key_function_from_params(params, moves_mapping, learned_moves)):
+            record_solution([learned_moves[index]["Move Sequence"] for index in indices], iterations)
+            if len(run_solutions) >= solutions_per_run:
+                break
+        return run_solutions
+
+    if intra_run is not None:
+        # Teilbäume der ersten Ebene auf mehrere Prozesse verteilt (siehe ParallelSubtrees).
+        intra_run.search(run_number, current_state, learned_moves, record_solution,
+                         lambda: len(run_solutions) >= solutions_per_run)
+        return run_solutions
+
+    # Suche im Run: Verwende denselben gemischten Startzustand für alle Versuche.
+    while run_iterations < params["MAX_ITERATIONS E3"] and len(run_solutions) < solutions_per_run:
+        if checkpoint is not None:
+            checkpoint.begin_call(run_iterations, run_solutions)
+        final_state, combination, solved, iter_run = optimize_cube(params, current_state, moves_mapping, learned_moves,
+                                                                   combination_history, transpositions, telemetry,
+                                                                   checkpoint, ordering)
+        run_iterations += iter_run
+        if solved:
+            record_solution(combination, run_iterations)
+        else:
+            # Wenn keine Verbesserung mehr möglich ist, beenden wir den Run.
+            break
+        if iter_run == 0:
+            # Bereits gelöster Startzustand: weitere Aufrufe liefern nur wieder die leere Lösung.
+            break
+        if run_iterations % 1000 == 0:
+            print(run_iterations)
+    return run_solutions
+
+
 # ======================================================================
 # Hauptprogramm: Wiederholte Runs mit konstanter Startposition pro Run.
-# Das combination_history-Sperrset gilt für alle Versuche in einem Run.
+# Parameter.csv: RANDOM_SEED (0 = zufälliger Master-Seed), WORKERS (1 = seriell),
+# BATCH_SCRAMBLES (> 1: so viele Runs im Gleichschritt, siehe BatchSolver),
+# CHECKPOINT_SECONDS (serieller Modus, 0 = aus; Fortsetzen mit --resume, siehe Checkpoint),
+# ADAPTIVE_ORDERING (1 = gelernte Kandidatenreihenfolge, siehe AdaptiveOrdering),
+# SYMMETRY_GROUP (Zustandsvergleich über Würfelsymmetrien, siehe Symmetry),
+# SIMPLIFY_SOLUTIONS (1 = Lösungen kürzen, HTM/QTM-Auswertung, siehe MoveSimplifier; 0 = aus),
+# INTRA_RUN_WORKERS (> 1: Suche eines Runs auf mehrere Prozesse verteilt, siehe ParallelSubtrees),
+# SCHEDULE_SECONDS (> 0: Zeitbudget für alle Runs statt fester Iterationen je Run, siehe RunScheduler).
 # ======================================================================
-def main():
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Löst gemischte Würfel mit den gelernten Zugfolgen aus Improvements.csv.")
+    parser.add_argument("--workers", type=int, help="Anzahl paralleler Prozesse (überschreibt WORKERS)")
+    parser.add_argument("--seed", type=int, help="Master-Seed (überschreibt RANDOM_SEED)")
+    parser.add_argument("--run", type=int, help="nur diesen einen Run ausführen (reproduzierbar mit demselben Seed)")
+    parser.add_argument("--resume", action="store_true", help="beim letzten Checkpoint fortsetzen (siehe Checkpoint.py)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
     params = load_parameters_from_csv()
     total_runs = params["TOTAL_RUNS"]
-    solutions_per_run = params["SOLUTIONS_PER_RUN"]
     
     print("Verwendete Parameter:", params)
     
@@ -317,71 +937,147 @@ def main():
     print(cube_to_string(original_state))
     print("Anzahl korrekt positionierter Steine (Level E1):", count_correct_pieces(original_state, levels["E1"]))
     
-    # Mappings laden
+    # Mappings laden und einmalig zu Permutationen kompilieren
     try:
-        moves_mapping = load_mappings("mappings.json")
+        moves_mapping = MoveEngine(load_mappings("mappings.json"))
     except Exception as e:
         print("Fehler beim Laden der Mappings:", e)
         return
     
-    # Gelernte Zugfolgen laden
+    # Startposition auf Lösbarkeit prüfen (Farben, Steine, Orientierung, Parität, siehe CubeValidation),
+    # damit eine unmögliche Position nicht in jedem Run das volle Iterationsbudget verbraucht.
+    from CubeValidation import get_validation_model, validate_cube_state
+    problems = validate_cube_state(original_state, get_validation_model(moves_mapping))
+    if problems:
+        print("Die Startposition ist nicht lösbar:")
+        for problem in problems:
+            print("  -", problem)
+        return
+    
+    # Gelernte Zugfolgen laden (LIBRARY_CACHE = 1: kompilierter Binär-Cache, siehe LibraryCache)
     improvements_filename = os.path.join(SCRIPT_DIR, "Improvements.csv")
-    learned_moves = load_learned_moves(improvements_filename)
+    learned_moves = load_learned_library(params, improvements_filename, moves_mapping)
     if not learned_moves:
         print("Keine gelernten Zugfolgen in", improvements_filename, "gefunden.")
         return
+    if params.get("SYMMETRY_GROUP", "none") not in ("none", 0):
+        from Symmetry import get_symmetry_model
+        symmetry_model = get_symmetry_model(moves_mapping, params["SYMMETRY_GROUP"])
+        respected = symmetry_model.respected_count(learned_moves)
+        if respected < len(symmetry_model.symmetries):
+            print(f"Hinweis: Die Bibliothek ist unter SYMMETRY_GROUP {params['SYMMETRY_GROUP']} nicht abgeschlossen; "
+                  f"zusammengefasst wird nur über {respected} von {len(symmetry_model.symmetries)} Symmetrien "
+                  "(volle Gruppe: python Symmetry.py --expand).")
+    if params.get("LAST_LAYER_TABLE", 0) and params.get("SEARCH_MODE", "restart") != "restart":
+        print(f"Hinweis: LAST_LAYER_TABLE wird mit SEARCH_MODE {params['SEARCH_MODE']} nicht verwendet "
+              "(nur im Modus restart).")
+
+    workers = args.workers if args.workers is not None else params.get("WORKERS", 1)
+    serial = params.get("BATCH_SCRAMBLES", 1) <= 1 and workers <= 1
+    # INTRA_RUN_WORKERS > 1: jeder Run wird auf mehrere Prozesse verteilt (nur seriell über die Runs,
+    # nicht mit Beam-Suche und nicht beim Fortsetzen eines Checkpoints).
+    intra_run_workers = params.get("INTRA_RUN_WORKERS", 1) if params.get("SEARCH_MODE", "restart") != "beam" else 1
+    # SCHEDULE_SECONDS > 0: gemeinsames Zeitbudget für alle Runs (nur seriell, nicht mit Beam-Suche,
+    # hat Vorrang vor INTRA_RUN_WORKERS, siehe RunScheduler).
+    schedule_seconds = params.get("SCHEDULE_SECONDS", 0) if params.get("SEARCH_MODE", "restart") != "beam" else 0
+    checkpoint_interval = params.get("CHECKPOINT_SECONDS", 0)
+    checkpoint = None
+    if args.resume:
+        from Checkpoint import DEFAULT_INTERVAL, RunCheckpoint
+        try:
+            checkpoint = RunCheckpoint.load(params, learned_moves, checkpoint_interval or DEFAULT_INTERVAL)
+        except (OSError, ValueError) as e:
+            print("Checkpoint kann nicht fortgesetzt werden:", e)
+            return
+        if checkpoint is None:
+            print("Kein Checkpoint gefunden.")
+            return
+        master_seed = checkpoint.master_seed
+        run_numbers = checkpoint.remaining_runs()
+        serial = True
+        intra_run_workers = 1
+        schedule_seconds = 0
+        print(f"Fortsetzen ab Run {checkpoint.run_number} (Master-Seed {master_seed}).")
+    else:
+        master_seed = args.seed if args.seed is not None else params.get("RANDOM_SEED", 0)
+        if not master_seed:
+            master_seed = random.SystemRandom().randrange(1, 2**32)
+        print("Master-Seed:", master_seed)
+        run_numbers = [args.run] if args.run is not None else list(range(1, total_runs + 1))
+        if serial and schedule_seconds:
+            intra_run_workers = 1
+        if checkpoint_interval and serial and intra_run_workers <= 1 and not schedule_seconds:
+            from Checkpoint import RunCheckpoint
+            checkpoint = RunCheckpoint(params, learned_moves, master_seed, run_numbers[-1], checkpoint_interval)
+        elif checkpoint_interval:
+            print("Hinweis: Checkpoints werden nur im seriellen Modus (ohne INTRA_RUN_WORKERS und "
+                  "SCHEDULE_SECONDS) geschrieben.")
 
     overall_start_time = time.time()
     
-    # Pro Run: Eine neue Startposition wird einmal gemischt und danach beibehalten.
-    for run_number in range(1, total_runs + 1):
-        print(f"\n=== Starting Run {run_number} ===")
-        run_start_time = time.time()
-        # Erzeuge eine Startposition für diesen Run (einmaliges Mischen)
-        current_state = original_state.copy()
-        no_moves_to_shuffle = params.get("NO_MOVES_TO_SHUFFLE", 0)
-        if no_moves_to_shuffle > 0:
-            shuffle_sequence = [random.choice(allowed_moves_global) for _ in range(no_moves_to_shuffle)]
-            current_state = apply_sequence(current_state, shuffle_sequence, moves_mapping)
-        run_start_state_str = ";".join(current_state)
-        
-        # Kombinationen (erschöpfte Kombinationen) werden pro Run in combination_history gespeichert
-        combination_history = set()
-        run_iterations = 0
-        run_solutions = []  # Liste der gefundenen Lösungen in diesem Run
-        # Suche im Run: Verwende denselben gemischten Startzustand für alle Versuche.
-        while run_iterations < params["MAX_ITERATIONS E3"] and len(run_solutions) < solutions_per_run:
-            final_state, combination, solved, iter_run = optimize_cube(params, current_state, moves_mapping, learned_moves, combination_history)
-            run_iterations += iter_run
-            if solved:
-                sol_time = time.time() - run_start_time
-                solution_time_str = time.strftime("%H:%M:%S", time.gmtime(sol_time))
-                total_moves_list = []
-                for seq in combination:
-                    total_moves_list.extend(seq.split())
-                total_move_sequence = " ".join(total_moves_list)
-                total_moves = len(total_moves_list)
-                # Pro Run wird die Lösung einmalig gespeichert (Duplikate innerhalb des Runs verhindern)
-                if total_move_sequence not in [sol["move_sequence"] for sol in run_solutions]:
-                    solution = {
-                        "iterations": run_iterations,
-                        "time": solution_time_str,
-                        "move_sequence": total_move_sequence,
-                        "total_moves": total_moves,
-                        "start_state": run_start_state_str
-                    }
-                    run_solutions.append(solution)
-                    run_datetime = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run_start_time))
-                    save_results(run_number, run_datetime, run_start_state_str, solution_time_str, run_iterations, total_move_sequence, total_moves)
-                    print(f"Run {run_number}: Lösung gefunden bei Iteration {run_iterations}, Zeit {solution_time_str}, Total moves: {total_moves}")
-                else:
-                    print(f"Run {run_number}: Duplikat-Lösung ignoriert")
-            else:
-                # Wenn keine Verbesserung mehr möglich ist, beenden wir den Run.
-                break
-            if run_iterations % 1000 == 0:
-                print(run_iterations)
-        print(f"Run {run_number} abgeschlossen. Gefundene Lösungen: {len(run_solutions)}")
+    # Ergebnisse über einen gepufferten Schreib-Thread ausgeben (RESULTS_FLUSH_SECONDS,
+    # RESULTS_BINARY = 1: zusätzlich Results.moves.bin mit Zugindizes je Lösung).
+    from ResultsWriter import ResultsSink
+    sink = ResultsSink(flush_interval=params.get("RESULTS_FLUSH_SECONDS", 5),
+                       binary_filename="Results.moves.bin" if params.get("RESULTS_BINARY", 0) else None)
+    # SIMPLIFY_SOLUTIONS = 1: Lösungen vor dem Schreiben kürzen und HTM/QTM fortlaufend auswerten
+    # (Results.htm.csv, Results.runs.csv, siehe MoveSimplifier).
+    output = sink
+    if params.get("SIMPLIFY_SOLUTIONS", 0):
+        from MoveSimplifier import SolutionAnalytics
+        output = SolutionAnalytics(sink, moves_mapping)
+    from AdaptiveOrdering import ordering_from_params, stats_path
+    ordering = ordering_from_params(params, learned_moves)
+    if checkpoint is not None:
+        # Ergebniszeilen laufen über den Checkpoint (zurückgehalten bis zum nächsten Sichern).
+        checkpoint.output = output
+        checkpoint.ordering = ordering
+        checkpoint.ordering_path = stats_path(params)
+    intra_run = None
+    if serial and intra_run_workers > 1:
+        from ParallelSubtrees import SubtreePool
+        if params.get("ADAPTIVE_ORDERING", 0):
+            print("Hinweis: ADAPTIVE_ORDERING wird mit INTRA_RUN_WORKERS > 1 nicht verwendet.")
+        intra_run = SubtreePool(params, intra_run_workers)
+    try:
+        # Pro Run: Eine neue Startposition wird einmal gemischt und danach beibehalten.
+        if not serial and params.get("BATCH_SCRAMBLES", 1) > 1:
+            from BatchSolver import run_batches, unsupported_params
+            unsupported = unsupported_params(params)
+            if workers > 1:
+                unsupported.append("WORKERS")  # der Batch läuft in einem Prozess
+            if unsupported:
+                print(f"Hinweis: Mit BATCH_SCRAMBLES > 1 wird wie SEARCH_MODE restart gesucht; "
+                      f"nicht berücksichtigt: {', '.join(unsupported)}.")
+            run_batches(params, original_state, master_seed, run_numbers, moves_mapping, learned_moves, output.write)
+        elif not serial and len(run_numbers) > 1:
+            from ParallelRuns import run_parallel
+            if ordering is not None:
+                print("Hinweis: ADAPTIVE_ORDERING wird mit WORKERS > 1 nur gelesen; die Statistik wird nicht fortgeschrieben.")
+            run_parallel(params, original_state, master_seed, run_numbers, workers, output.write)
+        elif schedule_seconds:
+            from RunScheduler import run_scheduled
+            run_scheduled(params, original_state, master_seed, run_numbers, moves_mapping, learned_moves, output.write,
+                          ordering)
+            if ordering is not None:
+                ordering.save(stats_path(params))
+        else:
+            on_solution = checkpoint.write if checkpoint is not None else output.write
+            for run_number in run_numbers:
+                execute_run(run_number, derive_run_seed(master_seed, run_number), params, original_state,
+                            moves_mapping, learned_moves, on_solution=on_solution, checkpoint=checkpoint,
+                            ordering=ordering, intra_run=intra_run)
+                output.flush()
+                if ordering is not None:
+                    ordering.save(stats_path(params))
+            if checkpoint is not None:
+                checkpoint.discard()
+    finally:
+        if intra_run is not None:
+            intra_run.close()
+        if output is not sink:
+            output.close()
+        sink.close()
     
     overall_elapsed = time.time() - overall_start_time
     overall_runtime_str = time.strftime("%H:%M:%S", time.gmtime(overall_elapsed))
@@ -390,4 +1086,4 @@ def main():
     print("\nErgebnisse wurden in Results.csv gespeichert.")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+import SolutionRecall as recall
+from CombinationTrie import CombinationTrie
+from TranspositionTable import TranspositionTable
+
+# ======================================================================
+# Lösungsdienst: Anfragen als JSON-Zeilen, Ergebnisse als JSON-Zeilen
+#
+# Ein Pool von SERVICE_WORKERS Prozessen lädt Parameter.csv, mappings.json
+# und Improvements.csv einmal und bleibt für alle Anfragen bestehen. Jede
+# Anfrage wird von einem Worker wie ein Run gelöst (_search_run, gleiche
+# Parameter inkl. SEARCH_MODE, TRANSPOSITION_TABLE_SIZE, SYMMETRY_GROUP).
+#
+# Anfrage (eine Zeile):
+#   {"id": "a1", "state": "wwwwwwwwwrrr...", "max_iterations": 5000, "solutions": 3}
+#   {"id": "a2", "scramble": "R U Fb D", ...}
+#   state: 54 Farbcodes als Liste, String oder mit ";" getrennt;
+#   scramble: Züge aus allowed_moves_global, angewendet auf csv_export-StartPos.csv.
+#   max_iterations / solutions: optional, sonst MAX_ITERATIONS E3 / SOLUTIONS_PER_RUN.
+# Ausgabe (sobald vorhanden, Zeilen verschiedener Anfragen gemischt):
+#   {"id": "a1", "type": "solution", "moves": "...", "total_moves": 42, "htm": 40, "qtm": 44, "iterations": 881, "elapsed": 1.2}
+#   {"id": "a1", "type": "done", "solutions": 3, "elapsed": 3.4}
+#   {"id": "a2", "type": "error", "error": "..."}
+# SIMPLIFY_SOLUTIONS = 1: "moves" ist die vereinfachte Zugfolge (siehe MoveSimplifier).
+#
+# Gegendruck: Höchstens SERVICE_MAX_IN_FLIGHT Anfragen sind gleichzeitig
+# angenommen (wartend oder in Arbeit); danach liest der Dienst keine weitere
+# Zeile, bis eine Anfrage fertig ist (bei TCP greift die Flusskontrolle).
+#
+# Aufruf:
+#   python SolveService.py                    Anfragen von stdin, Ergebnisse auf stdout
+#   python SolveService.py --input a.jsonl    Anfragen aus Datei
+#   python SolveService.py --port 8765        TCP-Dienst auf 127.0.0.1, eine Anfrage pro Zeile
+# Statusmeldungen gehen nach stderr.
+#
+# Parameter.csv: SERVICE_WORKERS (0 = Anzahl CPUs), SERVICE_MAX_IN_FLIGHT.
+# ======================================================================
+
+
+class RequestError(ValueError):
+    """
+    Ungültige Anfrage (wird als "error"-Zeile beantwortet).
+    """
+
+
+# ======================================================================
+# Worker-Prozess
+# ======================================================================
+def _worker_main(params, tasks, results):
+    sys.stdout = open(os.devnull, "w")  # Fortschrittsausgaben von _search_run unterdrücken
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Strg+C behandelt nur der Hauptprozess (close)
+    moves_mapping = recall.MoveEngine(recall.load_mappings("mappings.json"))
+    learned_moves = recall.load_learned_library(params, os.path.join(recall.SCRIPT_DIR, "Improvements.csv"), moves_mapping)
+    from Symmetry import key_function_from_params
+    key_function = key_function_from_params(params, moves_mapping, learned_moves)
+    simplifier = None
+    if params.get("SIMPLIFY_SOLUTIONS", 0):
+        from MoveSimplifier import MoveSimplifier
+        simplifier = MoveSimplifier(moves_mapping)
+    for job, state, max_iterations, solutions in iter(tasks.get, None):
+        try:
+            count, elapsed = _solve(params, moves_mapping, learned_moves, key_function, simplifier, results,
+                                    job, state, max_iterations, solutions)
+        except Exception as e:
+            results.put(("error", job, {"error": f"{type(e).__name__}: {e}"}))
+        else:
+            results.put(("done", job, {"solutions": count, "elapsed": round(elapsed, 3)}))
+
+def _solve(params, moves_mapping, learned_moves, key_function, simplifier, results, job, state, max_iterations,
+           solutions):
+    """
+    Löst eine Anfrage; jede neue Lösung wird sofort als "solution" gemeldet. Rückgabe: (Anzahl Lösungen, Sekunden).
+    """
+    job_params = dict(params)
+    job_params["MAX_ITERATIONS E3"] = max_iterations
+    job_params["SOLUTIONS_PER_RUN"] = solutions
+    table_size = params.get("TRANSPOSITION_TABLE_SIZE", 0)
+    transpositions = TranspositionTable(table_size, key_function) if table_size else None
+    start_time = time.time()
+    run_datetime = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time))
+
+    def on_solution(row):
+        moves = row[5].split()
+        payload = {}
+        if simplifier is not None:
+            turns = simplifier.simplify(moves)
+            simplified = simplifier.to_moves(turns)
+            if simplifier.permutation(simplified) != simplifier.permutation(moves):
+                turns = [simplifier.turns[move] for move in moves]  # Abweichung: Originalfolge behalten
+            else:
+                moves = simplified
+            payload["htm"] = simplifier.htm(turns)
+            payload["qtm"] = simplifier.qtm(turns)
+        payload = {"moves": " ".join(moves), "total_moves": len(moves), **payload, "iterations": row[4],
+                   "elapsed": round(time.time() - start_time, 3)}
+        results.put(("solution", job, payload))
+
+    found = recall._search_run(job, start_time, run_datetime, ";".join(state), state, job_params, moves_mapping,
+                               learned_moves, CombinationTrie(params.get("HISTORY_MAX_NODES", 0)), transpositions,
+                               None, on_solution)
+    return len(found), time.time() - start_time
+
+
+# ======================================================================
+# Dienst im Hauptprozess
+# ======================================================================
+class SolveService:
+    """
+    Warmer Worker-Pool mit Obergrenze für gleichzeitig angenommene Anfragen.
+    submit(request, emit) blockiert, solange SERVICE_MAX_IN_FLIGHT Anfragen offen sind;
+    emit(dict) erhält die Antwortzeilen der Anfrage (aus dem Verteiler-Thread).
+    """
+
+    def __init__(self, params, workers, max_in_flight):
+        self.params = params
+        self.moves_mapping = recall.MoveEngine(recall.load_mappings("mappings.json"))
+        self.original_state = recall.load_cube_from_csv()
+        from CubeValidation import get_validation_model
+        self.validation_model = get_validation_model(self.moves_mapping)
+        context = multiprocessing.get_context()
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.processes = [context.Process(target=_worker_main, name=f"SolveWorker-{worker_id}", daemon=True,
+                                          args=(params, self.tasks, self.results))
+                          for worker_id in range(workers)]
+        for process in self.processes:
+            process.start()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._jobs = {}  # Auftragsnummer -> (Anfrage-ID, emit)
+        self._next_job = 0
+        self._broken = None
+        self._changed = threading.Condition()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="SolveDispatcher", daemon=True)
+        self._dispatcher.start()
+
+    # ------------------------------------------------------------------
+    # Anfragen
+    # ------------------------------------------------------------------
+    def parse_request(self, request):
+        """
+        Prüft eine Anfrage; Rückgabe: (Startzustand, max_iterations, solutions). Fehler: RequestError.
+        """
+        if not isinstance(request, dict):
+            raise RequestError("Anfrage muss ein JSON-Objekt sein")
+        if ("state" in request) == ("scramble" in request):
+            raise RequestError('genau eines von "state" und "scramble" angeben')
+        if "state" in request:
+            state = request["state"]
+            if isinstance(state, str):
+                state = state.split(";") if ";" in state else list(state)
+            if not isinstance(state, list) or not all(isinstance(color, str) for color in state):
+                raise RequestError('"state" muss eine Liste oder ein String von Farbcodes sein')
+        else:
+            scramble = request["scramble"]
+            moves = scramble.split() if isinstance(scramble, str) else scramble
+            if not isinstance(moves, list):
+                raise RequestError('"scramble" muss ein String oder eine Liste von Zügen sein')
+            unknown = [move for move in moves if move not in recall.allowed_moves_global]
+            if unknown:
+                raise RequestError(f"unbekannte Züge: {' '.join(map(str, unknown))}")
+            state = recall.apply_sequence(self.original_state, moves, self.moves_mapping, cache=False)
+        from CubeValidation import validate_cube_state
+        problems = validate_cube_state(state, self.validation_model)
+        if problems:
+            raise RequestError("; ".join(problems))
+        limits = []
+        for field, default in (("max_iterations", self.params["MAX_ITERATIONS E3"]),
+                               ("solutions", self.params["SOLUTIONS_PER_RUN"])):
+            value = request.get(field, default)
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                raise RequestError(f'"{field}" muss eine positive ganze Zahl sein')
+            limits.append(value)
+        return state, limits[0], limits[1]
+
+    def submit(self, request, emit):
+        """
+        Nimmt eine Anfrage (dict) an. Ungültige Anfragen werden sofort mit "error" beantwortet.
+        """
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            state, max_iterations, solutions = self.parse_request(request)
+        except RequestError as e:
+            emit({"id": request_id, "type": "error", "error": str(e)})
+            return
+        if recall.mask_count(recall.get_correct_mask(state)) == recall.TARGET_CORRECT:
+            # Bereits gelöst: leere Lösung, ohne einen Worker zu belegen.
+            solution = {"moves": "", "total_moves": 0, "iterations": 0, "elapsed": 0.0}
+            if self.params.get("SIMPLIFY_SOLUTIONS", 0):
+                solution.update(htm=0, qtm=0)
+            emit({"id": request_id, "type": "solution", **solution})
+            emit({"id": request_id, "type": "done", "solutions": 1, "elapsed": 0.0})
+            return
+        self._slots.acquire()  # Gegendruck: wartet auf einen freien Platz
+        with self._changed:
+            if self._broken is not None:
+                self._slots.release()
+                emit({"id": request_id, "type": "error", "error": self._broken})
+                return
+            job = self._next_job
+            self._next_job += 1
+            self._jobs[job] = (request_id, emit)
+        self.tasks.put((job, state, max_iterations, solutions))
+
+    def submit_line(self, line, emit):
+        """
+        Wie submit für eine JSON-Zeile; Leerzeilen werden übersprungen.
+        """
+        if not line.strip():
+            return
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            emit({"id": None, "type": "error", "error": f"kein gültiges JSON: {e}"})
+            return
+        self.submit(request, emit)
+
+    def drain(self, emit=None):
+        """
+        Wartet, bis alle angenommenen Anfragen (bzw. alle mit diesem emit) beantwortet sind.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: not any(emit is None or owner is emit for _, owner in self._jobs.values()))
+
+    # ------------------------------------------------------------------
+    # Verteiler: Ergebnisse der Worker an die Anfragenden
+    # ------------------------------------------------------------------
+    def _dispatch(self):
+        while True:
+            try:
+                message = self.results.get(timeout=1.0)
+            except queue.Empty:
+                if not all(process.is_alive() for process in self.processes):
+                    self._fail_all("ein Worker des Lösungsdienstes wurde beendet")
+                    return
+                continue
+            if message is None:
+                return
+            kind, job, payload = message
+            with self._changed:
+                request_id, emit = self._jobs[job]
+            emit({"id": request_id, "type": kind, **payload})
+            if kind != "solution":
+                with self._changed:
+                    del self._jobs[job]
+                    self._changed.notify_all()
+                self._slots.release()
+
+    def _fail_all(self, error):
+        with self._changed:
+            self._broken = error
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+            self._changed.notify_all()
+        for request_id, emit in jobs:
+            emit({"id": request_id, "type": "error", "error": error})
+            self._slots.release()
+
+    def close(self, wait=True):
+        """
+        Beendet den Pool; wait=False bricht laufende Anfragen ab (z.B. nach Strg+C).
+        """
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            if not wait:
+                process.terminate()
+            process.join()
+        self.results.put(None)
+        self._dispatcher.join()
+
+
+def line_writer(stream):
+    """
+    emit-Funktion, die JSON-Zeilen threadsicher auf stream schreibt.
+    """
+    lock = threading.Lock()
+
+    def emit(response):
+        line = json.dumps(response, ensure_ascii=False) + "\n"
+        with lock:
+            stream.write(line)
+            stream.flush()
+    return emit
+
+
+# ======================================================================
+# TCP-Modus: jede Verbindung sendet Zeilen und erhält die Antworten ihrer Anfragen
+# ======================================================================
+class _ConnectionHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        lock = threading.Lock()
+        closed = False
+
+        def emit(response):
+            nonlocal closed
+            with lock:
+                if closed:
+                    return
+                try:
+                    self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                except OSError:
+                    closed = True  # Gegenstelle weg: restliche Antworten verwerfen
+
+        for line in self.rfile:
+            service.submit_line(line.decode("utf-8", errors="replace"), emit)
+        service.drain(emit)
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Lösungsdienst: Anfragen und Ergebnisse als JSON-Zeilen.")
+    parser.add_argument("--input", default="-", help="Datei mit Anfragen (Standard: stdin)")
+    parser.add_argument("--port", type=int, help="statt --input als TCP-Dienst auf 127.0.0.1 lauschen")
+    parser.add_argument("--workers", type=int, help="Anzahl Worker-Prozesse (überschreibt SERVICE_WORKERS)")
+    parser.add_argument("--max-in-flight", type=int, help="offene Anfragen höchstens (überschreibt SERVICE_MAX_IN_FLIGHT)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    params = recall.load_parameters_from_csv()
+    workers = args.workers or params.get("SERVICE_WORKERS", 0) or os.cpu_count() or 1
+    max_in_flight = max(1, args.max_in_flight or params.get("SERVICE_MAX_IN_FLIGHT", 2 * workers))
+    service = SolveService(params, workers, max_in_flight)
+    print(f"Lösungsdienst: {workers} Worker, höchstens {max_in_flight} offene Anfragen", file=sys.stderr)
+    interrupted = False
+    try:
+        if args.port is not None:
+            with _ThreadingServer(("127.0.0.1", args.port), _ConnectionHandler) as server:
+                server.service = service
+                print(f"Lausche auf 127.0.0.1:{server.server_address[1]}", file=sys.stderr)
+                server.serve_forever()
+        else:
+            emit = line_writer(sys.stdout)
+            source = sys.stdin if args.input == "-" else open(os.path.join(recall.SCRIPT_DIR, args.input), encoding="utf-8")
+            with source:
+                for line in source:
+                    service.submit_line(line, emit)
+            service.drain()
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        service.close(wait=not interrupted)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
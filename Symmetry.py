@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import os
+import sys
+
+import SolutionRecall as recall
+from MoveEngine import CUBE_SIZE, get_move_engine
+from TranspositionTable import state_key
+
+# ======================================================================
+# Würfelsymmetrien (24 Drehungen des ganzen Würfels, mit Spiegelungen 48)
+#
+# Die Geometrie wird aus den Daten abgeleitet: Jede Seite (9 Positionen)
+# erhält eine Achse, jeder Sticker die Koordinate (Summe der Seitenachsen
+# seines Steins, Achse seiner Seite). Eine Symmetrie ist eine Matrix mit
+# Vorzeichen-Permutation; daraus folgen
+#   - die Sticker-Permutation (Gather wie MoveEngine) und die Umfärbung,
+#     damit Mittelsteine und gelöster Zustand gleich bleiben,
+#   - die konjugierten Züge: g(X(s)) = Y(g(s)); geprüft gegen mappings.json,
+#   - die Abbildung der Steine (für "Starting Positions").
+# Zu einander symmetrische Zustände haben denselben kanonischen Schlüssel
+# (kleinster Schlüssel über die Gruppe). Für die Suche werden nur die
+# Symmetrien verwendet, unter denen die geladene Bibliothek abgeschlossen
+# ist (library_key_function): Diese bilden eine Untergruppe, das
+# Zusammenfassen verwirft also keine Zustände, die nur ein nicht
+# symmetrischer Bibliothekseintrag lösen würde.
+#
+# Gruppen: "axis" (8 Symmetrien, die die Seite von Position 5 festhalten –
+# die Ebenenstruktur der Bibliothek bleibt erhalten), "rotations" (24),
+# "all" (48).
+#
+# Parameter.csv:
+#   SYMMETRY_GROUP  none | axis | rotations | all: Transpositionstabelle und
+#                   Beam-Suche vergleichen Zustände über den kanonischen
+#                   Schlüssel. Ist die Bibliothek unter der Gruppe nicht
+#                   abgeschlossen, nur über die Untergruppe, die sie
+#                   respektiert (volle Gruppe: --expand).
+#
+# Aufruf:
+#   python Symmetry.py --expand [--group axis] [--output Improvements.symmetric.csv]
+# ======================================================================
+GROUPS = ("axis", "rotations", "all")
+DEFAULT_OUTPUT = "Improvements.symmetric.csv"
+_PAD = bytes(256 - CUBE_SIZE)
+
+
+def _face(index):
+    return index // 9
+
+def _signed_permutations():
+    """
+    Alle 48 Matrizen mit Vorzeichen-Permutation als (Achsen, Vorzeichen, Determinante); Identität zuerst.
+    """
+    for axes in itertools.permutations(range(3)):
+        inversions = sum(1 for a, b in itertools.combinations(axes, 2) if a > b)
+        for signs in itertools.product((1, -1), repeat=3):
+            yield axes, signs, (-1) ** inversions * signs[0] * signs[1] * signs[2]
+
+
+class Symmetry:
+    """
+    Eine Würfelsymmetrie g: apply(s)[i] = Umfärbung(s[perm[i]]).
+    """
+    __slots__ = ("perm", "inverse", "perm_bytes", "color_table", "color_map", "move_map", "piece_bits", "proper",
+                 "fixes_reference")
+
+    def apply(self, cube_state):
+        color_map = self.color_map
+        return [color_map[cube_state[i]] for i in self.perm]
+
+    def key(self, key):
+        """
+        Zustandsschlüssel (state_key) des gespiegelten/gedrehten Zustands.
+        """
+        return self.perm_bytes.translate(key + _PAD).translate(self.color_table)
+
+    def map_mask(self, mask):
+        mapped = 0
+        for bit, target_bit in self.piece_bits:
+            if mask & bit:
+                mapped |= target_bit
+        return mapped
+
+    def conjugate_sequence(self, sequence):
+        return " ".join(self.move_map[move] for move in sequence.split())
+
+    def conjugate_permutation(self, perm):
+        """
+        Permutation von g·P·g⁻¹ (wirkt auf g(s) wie P auf s).
+        """
+        inverse = self.inverse
+        return tuple(inverse[perm[i]] for i in self.perm)
+
+
+class SymmetryModel:
+    """
+    Symmetrien einer Gruppe samt kanonischem Schlüssel. Baut aus den Steindefinitionen
+    (z.B. levels["E3"]) und den Moves aus mappings.json.
+    """
+
+    def __init__(self, target_pieces, moves_mapping, group="all"):
+        if group not in GROUPS:
+            raise ValueError(f"Unbekannte Symmetriegruppe {group!r} (erlaubt: {', '.join(GROUPS)})")
+        engine = get_move_engine(moves_mapping)
+        pieces = [tuple(pos - 1 for pos in positions) for positions, _ in target_pieces.values()]
+        home = {}
+        for positions, colors in target_pieces.values():
+            home.update((pos - 1, col) for pos, col in zip(positions, colors))
+        center_colors = {}
+        for index, col in home.items():
+            center_colors[_face(index)] = col
+
+        normals = self._face_normals(pieces)
+        coordinates = {}
+        for piece in pieces:
+            cubie = tuple(sum(normals[_face(i)][k] for i in piece) for k in range(3))
+            for i in piece:
+                coordinates[i] = (cubie, normals[_face(i)])
+        for face, normal in normals.items():
+            coordinates[face * 9 + 4] = (normal, normal)
+        index_of = {coordinate: i for i, coordinate in coordinates.items()}
+        if len(index_of) != CUBE_SIZE:
+            raise ValueError("Sticker-Geometrie ist nicht eindeutig (Steindefinitionen unvollständig)")
+
+        face_of_normal = {normal: face for face, normal in normals.items()}
+        move_names = {perm: move for move, perm in engine.move_perms.items()}
+        slot_of = {i: bit for bit, piece in zip(recall.PIECE_BITS.values(), pieces) for i in piece}
+        reference_face = _face(4)
+        self.group = group
+        self.symmetries = []
+        self._library_keys = {}
+        for axes, signs, determinant in _signed_permutations():
+            if group == "rotations" and determinant < 0:
+                continue
+            transform = lambda v: tuple(signs[k] * v[axes[k]] for k in range(3))
+            if group == "axis" and transform(normals[reference_face]) != normals[reference_face]:
+                continue
+            symmetry = Symmetry()
+            perm = [0] * CUBE_SIZE
+            for i, (cubie, normal) in coordinates.items():
+                perm[index_of[(transform(cubie), transform(normal))]] = i
+            symmetry.perm = tuple(perm)
+            symmetry.inverse = tuple(sorted(range(CUBE_SIZE), key=perm.__getitem__))
+            symmetry.perm_bytes = bytes(perm)
+            symmetry.color_map = {center_colors[face]: center_colors[face_of_normal[transform(normal)]]
+                                  for face, normal in normals.items()}
+            symmetry.color_table = bytes.maketrans(
+                "".join(symmetry.color_map).encode("ascii"), "".join(symmetry.color_map.values()).encode("ascii"))
+            symmetry.proper = determinant > 0
+            symmetry.fixes_reference = transform(normals[reference_face]) == normals[reference_face]
+            symmetry.move_map = {}
+            for move, move_perm in engine.move_perms.items():
+                conjugated = symmetry.conjugate_permutation(move_perm)
+                if conjugated not in move_names:
+                    raise ValueError(f"Konjugierter Zug zu {move} ist kein Zug aus mappings.json")
+                symmetry.move_map[move] = move_names[conjugated]
+            # Stein p in s korrekt <=> Stein q in g(s) korrekt, wenn perm die Sticker von q auf p abbildet.
+            symmetry.piece_bits = [(slot_of[perm[piece[0]]], slot_of[piece[0]]) for piece in pieces]
+            self.symmetries.append(symmetry)
+        solved = [home.get(i) or center_colors[_face(i)] for i in range(CUBE_SIZE)]
+        if any(symmetry.apply(solved) != solved for symmetry in self.symmetries):
+            raise ValueError("Symmetrie bildet den gelösten Zustand nicht auf sich ab")
+
+    @staticmethod
+    def _face_normals(pieces):
+        """
+        Achse je Seite: Seite 0 -> +z, ihre Gegenseite -> -z, die erste Nachbarseite -> +x usw.
+        (Gegenseiten teilen keinen Stein.) Die Händigkeit ist beliebig, da alle 48 Matrizen betrachtet werden.
+        """
+        neighbours = {face: set() for face in range(6)}
+        for piece in pieces:
+            for a, b in itertools.combinations({_face(i) for i in piece}, 2):
+                neighbours[a].add(b)
+                neighbours[b].add(a)
+        opposite = {face: next(other for other in range(6) if other != face and other not in neighbours[face])
+                    for face in range(6)}
+        normals = {}
+        for axis in range(3):
+            face = min(face for face in range(6) if face not in normals)
+            normal = tuple(1 if k == (2 - axis) else 0 for k in range(3))
+            normals[face] = normal
+            normals[opposite[face]] = tuple(-v for v in normal)
+        return normals
+
+    def canonical_key(self, cube_state):
+        """
+        Kleinster state_key über alle Symmetrien der Gruppe.
+        """
+        key = state_key(cube_state)
+        return min(symmetry.key(key) for symmetry in self.symmetries)
+
+    def respected_symmetries(self, learned_moves):
+        """
+        Symmetrien, unter denen die Bibliothek abgeschlossen ist (zu jeder Zeile ist die Konjugierte mit
+        gleicher Wirkung und Vorbedingung vorhanden). Da die Konjugation die endliche Menge der Zeilen
+        injektiv auf sich abbildet, ist das eine Untergruppe; die Identität ist immer dabei.
+        """
+        present = {(candidate["Required Mask"], tuple(candidate["Permutation"])) for candidate in learned_moves}
+        candidates = [candidate for candidate in learned_moves if candidate["Required Mask"] is not None]
+        return [symmetry for symmetry in self.symmetries
+                if all((symmetry.map_mask(candidate["Required Mask"]), symmetry.conjugate_permutation(candidate["Permutation"]))
+                       in present for candidate in candidates)]
+
+    def library_key_function(self, learned_moves):
+        """
+        Schlüsselfunktion für die Suche: kleinster state_key über die Symmetrien, die die Bibliothek respektiert
+        (nur die Identität: state_key). Pro Bibliothek einmal bestimmt.
+        """
+        cached = self._library_keys.get(id(learned_moves))
+        if cached is None or cached[0] is not learned_moves:
+            symmetries = self.respected_symmetries(learned_moves)
+            if len(symmetries) == len(self.symmetries):
+                key_function = self.canonical_key
+            elif len(symmetries) == 1:
+                key_function = state_key
+            else:
+                def key_function(cube_state):
+                    key = state_key(cube_state)
+                    return min(symmetry.key(key) for symmetry in symmetries)
+            cached = (learned_moves, key_function, len(symmetries))
+            self._library_keys[id(learned_moves)] = cached
+        return cached[1]
+
+    def respected_count(self, learned_moves):
+        """
+        Anzahl der Symmetrien, die library_key_function für diese Bibliothek verwendet.
+        """
+        self.library_key_function(learned_moves)
+        return self._library_keys[id(learned_moves)][2]
+
+    def conjugate_candidates(self, learned_moves):
+        """
+        Liefert für jede Zeile (in Dateireihenfolge) die Zeile selbst und ihre Konjugierten als Dictionaries
+        mit den Spalten von Improvements.csv; (Vorbedingung, Permutation) doppelt -> nur die erste.
+        """
+        seen = set()
+        for candidate in learned_moves:
+            required_mask = candidate["Required Mask"]
+            if required_mask is None:
+                continue
+            for symmetry in self.symmetries:
+                mask = symmetry.map_mask(required_mask)
+                key = (mask, symmetry.conjugate_permutation(candidate["Permutation"]))
+                if key in seen:
+                    continue
+                seen.add(key)
+                row = {name: candidate[name] for name in ("Start Count", "End Count", "Improvement Count",
+                                                          "Move Count", "Value")}
+                row["Starting Positions"] = "-".join(sorted(name for name, bit in recall.PIECE_BITS.items() if mask & bit))
+                row["Move Sequence"] = symmetry.conjugate_sequence(candidate["Move Sequence"])
+                yield row
+
+    def is_closed(self, learned_moves):
+        """
+        True, wenn zu jeder Zeile alle Konjugierten (gleiche Wirkung, gleiche Vorbedingung) vorhanden sind.
+        """
+        return self.respected_count(learned_moves) == len(self.symmetries)
+
+
+_model_cache = {}
+
+def get_symmetry_model(moves_mapping, group="all"):
+    """
+    SymmetryModel für levels["E3"] (einmal pro Mapping und Gruppe gebaut).
+    """
+    cached = _model_cache.get((id(moves_mapping), group))
+    if cached is None or cached[0] is not moves_mapping:
+        cached = (moves_mapping, SymmetryModel(recall.levels["E3"], moves_mapping, group))
+        _model_cache[(id(moves_mapping), group)] = cached
+    return cached[1]
+
+def key_function_from_params(params, moves_mapping, learned_moves):
+    """
+    Schlüsselfunktion für Zustandsvergleiche: state_key oder (SYMMETRY_GROUP) der kanonische Schlüssel
+    über die Symmetrien der Gruppe, die learned_moves respektiert.
+    """
+    group = params.get("SYMMETRY_GROUP", "none")
+    if not group or group == "none":
+        return state_key
+    return get_symmetry_model(moves_mapping, group).library_key_function(learned_moves)
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Würfelsymmetrien: Bibliothek um konjugierte Zugfolgen erweitern.")
+    parser.add_argument("--expand", action="store_true", help="erweiterte Bibliothek schreiben")
+    parser.add_argument("--group", choices=GROUPS, default="axis", help="Symmetriegruppe (Standard axis)")
+    parser.add_argument("--input", default="Improvements.csv", help="Eingabebibliothek (Standard Improvements.csv)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Ausgabedatei (Standard {DEFAULT_OUTPUT})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    moves_mapping = recall.MoveEngine(recall.load_mappings("mappings.json"))
+    model = get_symmetry_model(moves_mapping, args.group)
+    print(f"Gruppe {args.group}: {len(model.symmetries)} Symmetrien "
+          f"({sum(symmetry.proper for symmetry in model.symmetries)} Drehungen)")
+    learned_moves = recall.compile_learned_moves(
+        recall.load_learned_moves(os.path.join(recall.SCRIPT_DIR, args.input)), moves_mapping)
+    print("Bibliothek abgeschlossen unter der Gruppe:", "ja" if model.is_closed(learned_moves) else "nein")
+    if not args.expand:
+        return 0
+    from LibraryMiner import prune_rows, write_library
+    rows, pruned = prune_rows(list(model.conjugate_candidates(learned_moves)), moves_mapping)
+    output_path = os.path.join(recall.SCRIPT_DIR, args.output)
+    write_library(rows, output_path)
+    print(f"Zeilen: {len(learned_moves)} -> {len(rows)} (dominiert entfernt: {pruned})")
+    print("Geschrieben:", output_path)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ======================================================================
+# Laufzeit-Zähler und periodische JSON-Zeilen
+#
+# Parameter.csv:
+#   TELEMETRY_INTERVAL  Sekunden zwischen zwei Fortschrittszeilen (0 = aus)
+#   TELEMETRY_FILE      "stderr" oder Dateiname (wird angehängt)
+#   PROFILE_RUNS        1 = cProfile pro Run, Ausgabe profile_run_<RunID>.prof
+#
+# Ausgeschaltet wird kein Telemetry-Objekt erzeugt; die Suchfunktionen
+# prüfen dann nur "telemetry is not None".
+# ======================================================================
+COUNTERS = ("iterations", "candidates_scanned", "precondition_rejections", "history_hits",
+            "sequence_applications", "improvements", "resets", "solutions",
+            "best_correct")  # best_correct: höchste erreichte Zahl korrekter Steine (kein Zähler)
+CHECK_EVERY = 256  # Iterationen zwischen zwei Blicken auf die Uhr
+
+_streams = {}
+
+
+def open_telemetry_stream(target):
+    """
+    Liefert den Ausgabestrom ("stderr" oder eine im Skriptverzeichnis geöffnete Datei, einmal pro Prozess).
+    """
+    if target in ("", "stderr"):
+        return sys.stderr
+    stream = _streams.get(target)
+    if stream is None:
+        stream = open(os.path.join(SCRIPT_DIR, target), "a", encoding="utf-8", buffering=1)
+        _streams[target] = stream
+    return stream
+
+
+class Telemetry:
+    """
+    Zähler eines Runs. Die Zähler sind einfache int-Attribute und werden von optimize_cube
+    bzw. select_candidate direkt erhöht; count_iteration schreibt höchstens alle interval
+    Sekunden eine JSON-Zeile.
+    """
+
+    def __init__(self, run_number, interval, stream):
+        self.run_number = run_number
+        self.interval = interval
+        self.stream = stream
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.start_time = time.perf_counter()
+        self._next_emit = self.start_time + interval
+        self._last_time = self.start_time
+        self._last_iterations = 0
+
+    def count_iteration(self):
+        self.iterations += 1
+        if self.iterations % CHECK_EVERY == 0 and time.perf_counter() >= self._next_emit:
+            self.emit("progress")
+
+    def snapshot(self):
+        now = time.perf_counter()
+        elapsed = now - self._last_time
+        record = {"ts": round(time.time(), 3), "run": self.run_number,
+                  "elapsed_s": round(now - self.start_time, 3)}
+        record.update((name, getattr(self, name)) for name in COUNTERS)
+        record["iterations_per_s"] = round((self.iterations - self._last_iterations) / elapsed, 1) if elapsed > 0 else None
+        self._last_time = now
+        self._last_iterations = self.iterations
+        return record
+
+    def emit(self, event):
+        record = {"event": event}
+        record.update(self.snapshot())
+        self.stream.write(json.dumps(record) + "\n")
+        self._next_emit = time.perf_counter() + self.interval
+
+
+def telemetry_from_params(params, run_number):
+    """
+    Telemetry für einen Run oder None, wenn TELEMETRY_INTERVAL 0 ist.
+    """
+    interval = params.get("TELEMETRY_INTERVAL", 0)
+    if not interval:
+        return None
+    return Telemetry(run_number, interval, open_telemetry_stream(str(params.get("TELEMETRY_FILE", "stderr"))))
+
+
+@contextlib.contextmanager
+def profile_run(params, run_number):
+    """
+    Optionaler cProfile-Mitschnitt eines Runs (PROFILE_RUNS = 1).
+    """
+    if not params.get("PROFILE_RUNS", 0):
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(os.path.join(SCRIPT_DIR, f"profile_run_{run_number}.prof"))
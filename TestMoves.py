@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import json, csv, os
 
+from MoveEngine import get_move_engine
+
 def load_cube():
     path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "csv_export-StartPos.csv")
     cube = list(csv.reader(open(path, newline='', encoding='utf-8'), delimiter=';'))[1]
@@ -12,15 +14,10 @@ def load_mappings():
     return json.load(open("mappings.json", "r", encoding="utf-8"))
 
 def apply_move(cube, move, mapping):
-    new_cube = cube.copy()
-    for src, tgt in mapping.get(move, {}).items():
-        new_cube[int(tgt) - 1] = cube[int(src) - 1]
-    return new_cube
+    return get_move_engine(mapping).apply_move(cube, move)
 
 def apply_moves(cube, moves, mapping):
-    for move in moves:
-        cube = apply_move(cube, move, mapping)
-    return cube
+    return get_move_engine(mapping).apply_sequence(cube, moves)
 
 def cube_to_string(cube_state):
     def col(pos):
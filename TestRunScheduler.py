@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+import SolutionRecall as recall
+from RunScheduler import run_scheduled
+
+# ======================================================================
+# Zeitbudget-Scheduler mit bereits gelöster Startposition
+# (NO_MOVES_TO_SHUFFLE = 0 und die gelöste csv_export-StartPos.csv).
+# Aufruf: python -m unittest TestRunScheduler
+# ======================================================================
+TIMEOUT_SECONDS = 30
+
+
+class SolvedStartStateTest(unittest.TestCase):
+
+    def test_solved_start_state_ends_each_run(self):
+        params = recall.load_parameters_from_csv()
+        params.update({"NO_MOVES_TO_SHUFFLE": 0, "SCHEDULE_SECONDS": 5, "SOLUTIONS_PER_RUN": 3,
+                       "TELEMETRY_INTERVAL": 0, "ADAPTIVE_ORDERING": 0, "LAST_LAYER_TABLE": 0})
+        original_state = recall.load_cube_from_csv()
+        moves_mapping = recall.MoveEngine(recall.load_mappings("mappings.json"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            learned_moves = recall.load_learned_library(params, os.path.join(recall.SCRIPT_DIR, "Improvements.csv"),
+                                                        moves_mapping)
+        self.assertEqual(recall.mask_count(recall.get_correct_mask(original_state)), recall.TARGET_CORRECT)
+        rows = []
+        result = {}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def schedule():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result["runs"] = run_scheduled(params, original_state, 1, [1, 2], moves_mapping, learned_moves,
+                                                   rows.append,
+                                                   summary_filename=os.path.join(temp_dir, "Results.schedule.csv"))
+
+            thread = threading.Thread(target=schedule, daemon=True)
+            thread.start()
+            thread.join(TIMEOUT_SECONDS)
+            self.assertFalse(thread.is_alive(), "run_scheduled endet bei gelöster Startposition nicht")
+        self.assertEqual([run.status for run in result["runs"]], ["exhausted", "exhausted"])
+        # Je Run genau eine (leere) Lösung, wie im seriellen Modus.
+        self.assertEqual([(row[0], row[5]) for row in rows], [(1, ""), (2, "")])
+
+
+if __name__ == '__main__':
+    unittest.main()
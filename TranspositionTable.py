@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+from collections import OrderedDict
+
+
+# ======================================================================
+# Transpositionstabelle: Zustände, die innerhalb eines Runs über
+# verschiedene Kombinationen erreicht werden
+# ======================================================================
+def state_key(cube_state):
+    """
+    Kompakter Schlüssel eines Würfelzustands: die 54 Farbcodes als 54 Bytes.
+    """
+    return "".join(cube_state).encode("ascii")
+
+
+class TranspositionTable:
+    """
+    Begrenzter LRU-Cache Zustand -> Tiefe (Anzahl Zugfolgen in der Kombination).
+
+    - record_expanded(state, depth): Zustand wurde in dieser Tiefe erreicht und wird durchsucht
+      (die kleinste Tiefe bleibt gespeichert).
+    - mark_dead(state): Von diesem Zustand aus gibt es keine Erweiterung mehr (Sackgasse).
+    - should_prune(state, depth): True, wenn der Zustand als Sackgasse bekannt ist oder bereits
+      in geringerer Tiefe erreicht wurde. Derselbe Pfad (gleiche Tiefe, z.B. nach einem
+      Neustart) wird also nicht abgeschnitten; andere Pfade zum selben Zustand schon – auf
+      ihnen entstünden nur Lösungen, die sich im Präfix unterscheiden.
+
+    Gelöste Zustände werden vom Aufrufer nie eingetragen, da alle Lösungen dort enden.
+    Bei mehr als max_entries Einträgen wird der am längsten nicht benutzte verdrängt.
+    """
+    DEAD = -1
+
+    def __init__(self, max_entries, key_function=state_key):
+        self.max_entries = max_entries
+        self.key_function = key_function
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.prunes = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _store(self, key, depth):
+        entries = self.entries
+        entries[key] = depth
+        entries.move_to_end(key)
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def should_prune(self, cube_state, depth):
+        key = self.key_function(cube_state)
+        known_depth = self.entries.get(key)
+        if known_depth is None:
+            self.misses += 1
+            return False
+        self.hits += 1
+        self.entries.move_to_end(key)
+        if known_depth == self.DEAD or known_depth < depth:
+            self.prunes += 1
+            return True
+        return False
+
+    def record_expanded(self, cube_state, depth):
+        key = self.key_function(cube_state)
+        known_depth = self.entries.get(key)
+        if known_depth is None or (known_depth != self.DEAD and depth < known_depth):
+            self._store(key, depth)
+        else:
+            self.entries.move_to_end(key)
+
+    def mark_dead(self, cube_state):
+        self._store(self.key_function(cube_state), self.DEAD)
+
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "prunes": self.prunes, "evictions": self.evictions}